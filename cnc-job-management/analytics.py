@@ -0,0 +1,165 @@
+"""Columnar KPI engine over finished jobs
+
+History rows are loaded once into parallel NumPy arrays. Every report is then
+a few vectorised passes (np.unique + np.bincount) over those arrays instead of
+a round of Python per row. Durations and targets are read as the numeric
+duration_h/target_h columns stored with each row, so nothing is parsed.
+"""
+import numpy as np
+
+# Report dimensions accepted by HistoryFrame.report()
+DIMENSIONS = ('mesin', 'operator', 'model', 'day')
+
+# Hours a machine is available per calendar day, for utilisation
+HOURS_PER_DAY = 24
+
+def achievement_percent(duration_h, target_h):
+    """Vectorised achievement: 100% up to the target, then linear down to 0 (0 where not measurable)
+
+    Same rule as app.calculate_achievement(); NaN durations or targets, and
+    targets that are not positive, count as not measured.
+    """
+    duration_h = np.asarray(duration_h, dtype=float)
+    target_h = np.asarray(target_h, dtype=float)
+    measured = ~np.isnan(duration_h) & (target_h > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        achievement = 100.0 - np.maximum(duration_h - target_h, 0.0) / target_h * 100.0
+    return np.where(measured, np.maximum(achievement, 0.0), 0.0)
+
+class HistoryFrame:
+    """History rows held as NumPy arrays, plus the per-row KPIs derived from them"""
+
+    def __init__(self, mesin, operator, model, target_h, duration_h, finish_at):
+        self.mesin = np.asarray(mesin, dtype=str)
+        self.operator = np.asarray(operator, dtype=str)
+        self.model = np.asarray(model, dtype=str)
+        self.target_h = np.asarray(target_h, dtype=float)
+        self.duration_h = np.asarray(duration_h, dtype=float)
+        self.finish_at = np.asarray(finish_at, dtype='datetime64[s]')
+        self.day = self.finish_at.astype('datetime64[D]')
+        self._dimension_codes = {}
+
+        self.measured = ~np.isnan(self.duration_h) & (self.target_h > 0)
+        overrun = np.where(self.measured, self.duration_h - self.target_h, 0.0)
+        self.overrun_h = np.maximum(overrun, 0.0)
+        self.achievement = achievement_percent(self.duration_h, self.target_h)
+        self.on_target = self.measured & (overrun <= 0)
+
+    @classmethod
+    def from_batches(cls, batches):
+        """Build a frame from batches of (mesin, OPERATOR, MODEL, target_h, duration_h, finish_at) rows
+
+        Missing hours (None) become NaN.
+        """
+        columns = [[], [], [], [], [], []]
+        for rows in batches:
+            if not rows:
+                continue
+            mesin, operator, model, target_h, duration_h, finish_at = zip(*rows)
+            columns[0].append(np.array([value or '' for value in mesin], dtype=str))
+            columns[1].append(np.array([value or '' for value in operator], dtype=str))
+            columns[2].append(np.array([value or '' for value in model], dtype=str))
+            columns[3].append(np.array(target_h, dtype=float))
+            columns[4].append(np.array(duration_h, dtype=float))
+            columns[5].append(np.array(finish_at, dtype='datetime64[s]'))
+
+        if not columns[0]:
+            return cls([], [], [], np.empty(0), np.empty(0), np.empty(0, 'datetime64[s]'))
+        return cls(*[np.concatenate(parts) for parts in columns])
+
+    def __len__(self):
+        return len(self.mesin)
+
+    def window_days(self, date_from=None, date_to=None):
+        """Calendar days covered by a report (the requested range, else the data)"""
+        days = self.day[~np.isnat(self.day)]
+        first = np.datetime64(date_from, 'D') if date_from else (days.min() if days.size else None)
+        last = np.datetime64(date_to, 'D') if date_to else (days.max() if days.size else None)
+        if first is None or last is None or last < first:
+            return 0
+        return int((last - first) / np.timedelta64(1, 'D')) + 1
+
+    def _codes(self, dimension):
+        """(labels, code per row) for a dimension, computed once per frame"""
+        if dimension not in self._dimension_codes:
+            if dimension == 'day':
+                # Group on the integer day number; only the distinct days become strings
+                days, inverse = np.unique(self.day.astype(np.int64), return_inverse=True)
+                labels = days.astype('datetime64[D]').astype(str)
+            else:
+                labels, inverse = np.unique(getattr(self, dimension), return_inverse=True)
+            self._dimension_codes[dimension] = (labels, inverse)
+        return self._dimension_codes[dimension]
+
+    def report(self, by=('mesin',), date_from=None, date_to=None):
+        """KPIs per group; ``by`` is a tuple of DIMENSIONS (empty = one overall row)
+
+        Utilisation (busy hours / available hours) and OEE are only given when
+        grouping by machine and/or day, where available hours are defined.
+        Quality is not tracked, so OEE = utilisation x performance.
+        """
+        for dimension in by:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f'Unknown dimension: {dimension}')
+
+        rows = np.ones(len(self), dtype=bool)
+        if 'day' in by:
+            rows = ~np.isnat(self.day)
+
+        # Combine the per-dimension codes into one group code per row
+        code = np.zeros(int(rows.sum()), dtype=np.int64)
+        labels = []
+        for dimension in by:
+            unique, inverse = self._codes(dimension)
+            code = code * len(unique) + inverse[rows]
+            labels.append(unique)
+        groups, inverse = np.unique(code, return_inverse=True)
+        size = len(groups)
+
+        def total(values):
+            return np.bincount(inverse, weights=values[rows], minlength=size)
+
+        duration = np.nan_to_num(self.duration_h)
+        jobs = np.bincount(inverse, minlength=size)
+        measured = total(self.measured.astype(float))
+        busy = total(duration)
+        actual = total(np.where(self.measured, duration, 0.0))
+        target = total(np.where(self.measured, self.target_h, 0.0))
+        overrun = total(self.overrun_h)
+        on_target = total(self.on_target.astype(float))
+        achievement = total(self.achievement)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_achievement = np.where(jobs > 0, achievement / jobs, 0.0)
+            avg_duration = np.where(measured > 0, actual / measured, 0.0)
+            performance = np.where(actual > 0, np.minimum(target / actual, 1.0), 0.0)
+
+        columns = {
+            'jobs': jobs.tolist(),
+            'avg_achievement': avg_achievement.round(1).tolist(),
+            'on_target': on_target.astype(np.int64).tolist(),
+            'actual_hours': actual.round(2).tolist(),
+            'target_hours': target.round(2).tolist(),
+            'overrun_hours': overrun.round(2).tolist(),
+            'avg_duration_hours': avg_duration.round(2).tolist(),
+            'busy_hours': busy.round(2).tolist(),
+            'performance': performance.round(3).tolist(),
+        }
+        if set(by) <= {'mesin', 'day'}:
+            machines = 1 if 'mesin' in by else max(len(np.unique(self.mesin[rows])), 1)
+            days = 1 if 'day' in by else self.window_days(date_from, date_to)
+            available = machines * days * HOURS_PER_DAY
+            utilisation = busy / available if available else np.zeros(size)
+            columns['utilisation'] = utilisation.round(3).tolist()
+            columns['oee'] = (utilisation * performance).round(3).tolist()
+
+        # Split the combined code back into one label column per dimension
+        keys = {}
+        remainder = groups
+        for dimension, unique in reversed(list(zip(by, labels))):
+            remainder, index = np.divmod(remainder, len(unique))
+            keys[dimension] = unique[index].tolist()
+        columns = {**{dimension: keys[dimension] for dimension in by}, **columns}
+
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
@@ -1,20 +1,115 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Blueprint, current_app, render_template, request, jsonify, send_file, url_for, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-import json
+from sqlalchemy import update, delete, select, exists, event, func, cast, case, inspect, text, null, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timedelta
+from contextlib import ExitStack
+from collections import OrderedDict, namedtuple
+import gzip
+import heapq
+import itertools
 import os
-import xlwt
-import io
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+import click
+import numpy as np
 from werkzeug.exceptions import NotFound
+from markupsafe import Markup
+from config import Config
+from analytics import DIMENSIONS, HistoryFrame, achievement_percent
+from forecast import MAX_FACTOR, MIN_FACTOR, OverrunFactors, ShiftCalendar, project_queues, to_datetimes, to_seconds
+from events import broker
+from metrics import PROMETHEUS_CONTENT_TYPE, metrics, instrument_app
+from cache import create_cache
+from archive import HistoryArchive
+from assets import AssetManifest, folder_digest
+from parsing import parse_day_time, parse_hours, parse_hours_array, resolve_legacy_array
+from search import SEARCH_FIELDS, create_index, fts5_available, index_table, match_expression, rebuild_index, search_terms
+from serializer import COLUMNAR, FORMATS, RECORDS, dumps, loads, script_safe, serialize_rows
+from tasks import TaskRunner, task_log
+from spreadsheet import iter_csv, iter_xlsx, read_csv, read_xlsx
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///jobdata.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db = SQLAlchemy()
+bp = Blueprint('jobs', __name__, cli_group=None)
 
-db = SQLAlchemy(app)
+# Machines registered when the Machine table is first created
+DEFAULT_MACHINES = ['CNC1', 'CNC2', 'CNC3', 'CNC4', 'CNC5']
+
+# Page size limits for /history_data
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Export layout and rows fetched per database round trip
+EXPORT_HEADERS = ['ID', 'Mesin', 'Job Type', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH', 'ETC_H', 'OPERATOR', 'ACHIEVEMENT', 'REMARK']
+EXPORT_COLUMNS = ['id', 'mesin', 'job_type', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH', 'ETC_H', 'OPERATOR', 'ACHIEVEMENT', 'REMARK']
+EXPORT_CHUNK_SIZE = 1000
+
+# Indexes replaced by newer ones, dropped when upgrading an existing database
+OBSOLETE_INDEXES = ['ix_job_mesin_job_type_id']
+
+# Rows per batch when backfilling new columns
+BACKFILL_BATCH_SIZE = 5000
+
+# History rows moved to the archive per transaction
+ARCHIVE_BATCH_SIZE = 5000
+
+# History rows deleted per transaction by the clear_history task
+CLEAR_BATCH_SIZE = 5000
+
+# Tasks listed by GET /tasks
+TASK_LIST_SIZE = 50
+
+# Seconds browsers keep fingerprinted /assets/ files (they never change under one URL)
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Rendered pages smaller than this are sent uncompressed
+PAGE_GZIP_MIN_SIZE = 1024
+
+# Changes per /changes page (default and maximum)
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+# DataVersion row holding the highest seq deleted from the change log by prune_job_changes
+CHANGES_PRUNED = 'changes_pruned'
+
+# Results per /search page (default and maximum), and the accepted scopes and orders
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Newest matches of a search that are ordered by rank (older matches follow newest first)
+SEARCH_RANK_WINDOW = 2000
+SEARCH_SCOPES = ('history', 'jobs', 'all')
+SEARCH_SORTS = ('rank', 'recent')
+
+# Rows per batch when loading History into the analytics engine, and how many
+# loaded frames (one per filter combination) are kept per history version
+ANALYTICS_BATCH_SIZE = 10000
+ANALYTICS_CACHE_SIZE = 16
+
+# Achievement histogram of DailyStats: (column, lower bound in %)
+ACHIEVEMENT_BUCKETS = [('ach_lt50', 0), ('ach_50_75', 50), ('ach_75_90', 75), ('ach_90_100', 90), ('ach_100', 100)]
 
 # Database Models
-class Job(db.Model):
+class SerializedModel:
+    """to_dict() and column projection over the SERIALIZED_FIELDS of a model"""
+    SERIALIZED_FIELDS = ()
+
+    @classmethod
+    def serialized_columns(cls):
+        return [getattr(cls, name) for name in cls.SERIALIZED_FIELDS]
+
+    def to_dict(self):
+        data = {}
+        for name in self.SERIALIZED_FIELDS:
+            value = getattr(self, name)
+            data[name] = value.isoformat() if isinstance(value, datetime) else value
+        return data
+
+class Job(SerializedModel, db.Model):
+    __table_args__ = (
+        db.Index('ix_job_mesin_job_type_queue_pos', 'mesin', 'job_type', 'queue_pos', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     mesin = db.Column(db.String(50), nullable=False)
     job_type = db.Column(db.String(20), nullable=False)  # current / next
@@ -27,24 +122,25 @@ class Job(db.Model):
     OPERATOR = db.Column(db.String(50), nullable=False)
     ACHIEVEMENT = db.Column(db.Float, default=0.0)
     REMARK = db.Column(db.Text, nullable=True)
+    start_at = db.Column(db.DateTime, nullable=True)  # START with the year resolved
+    finish_at = db.Column(db.DateTime, nullable=True)  # FINISH with the year resolved
+    duration_h = db.Column(db.Float, nullable=True)  # finish_at - start_at in hours
+    target_h = db.Column(db.Float, nullable=True)  # ETC_H in hours
+    queue_pos = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))  # order in the machine queue (ties: id)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'mesin': self.mesin,
-            'job_type': self.job_type,
-            'MODEL': self.MODEL,
-            'PART': self.PART,
-            'SIZE': self.SIZE,
-            'START': self.START,
-            'FINISH': self.FINISH,
-            'ETC_H': self.ETC_H,
-            'OPERATOR': self.OPERATOR,
-            'ACHIEVEMENT': self.ACHIEVEMENT,
-            'REMARK': self.REMARK
-        }
+    SERIALIZED_FIELDS = (
+        'id', 'mesin', 'job_type', 'queue_pos', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH',
+        'ETC_H', 'OPERATOR', 'ACHIEVEMENT', 'REMARK', 'start_at', 'finish_at', 'duration_h', 'target_h',
+    )
+
+class History(SerializedModel, db.Model):
+    # Ids are never reused (AUTOINCREMENT on SQLite): archived and hot rows page together by id
+    __table_args__ = (
+        db.Index('ix_history_mesin_finish_at', 'mesin', 'finish_at'),
+        db.Index('ix_history_finish_at', 'finish_at'),
+        {'sqlite_autoincrement': True},
+    )
 
-class History(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     mesin = db.Column(db.String(50), nullable=False)
     job_type = db.Column(db.String(20), nullable=False)
@@ -57,123 +153,749 @@ class History(db.Model):
     OPERATOR = db.Column(db.String(50), nullable=False)
     ACHIEVEMENT = db.Column(db.Float, default=0.0)
     REMARK = db.Column(db.Text, nullable=True)
+    start_at = db.Column(db.DateTime, nullable=True)  # START with the year resolved
+    finish_at = db.Column(db.DateTime, nullable=True)  # FINISH with the year resolved
+    duration_h = db.Column(db.Float, nullable=True)  # finish_at - start_at in hours
+    target_h = db.Column(db.Float, nullable=True)  # ETC_H in hours
+
+    SERIALIZED_FIELDS = (
+        'id', 'mesin', 'job_type', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH',
+        'ETC_H', 'OPERATOR', 'ACHIEVEMENT', 'REMARK', 'start_at', 'finish_at', 'duration_h', 'target_h',
+    )
+
+class DataVersion(db.Model):
+    """Monotonic change counter per data set (used for ETags and caches)"""
+    name = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyStats(db.Model):
+    """Finished jobs rolled up per day (of finish_at), machine and operator
+    
+    Kept up to date in the same transaction as every move to History, so
+    reports scan days x machines x operators rows instead of every job.
+    """
+    date = db.Column(db.Date, primary_key=True)
+    mesin = db.Column(db.String(50), primary_key=True)
+    operator = db.Column(db.String(50), primary_key=True)
+    jobs = db.Column(db.Integer, nullable=False, default=0)
+    measured = db.Column(db.Integer, nullable=False, default=0)  # jobs with a known duration and target
+    on_target = db.Column(db.Integer, nullable=False, default=0)  # ACHIEVEMENT >= 100
+    achievement_sum = db.Column(db.Float, nullable=False, default=0.0)
+    actual_hours = db.Column(db.Float, nullable=False, default=0.0)  # of measured jobs
+    target_hours = db.Column(db.Float, nullable=False, default=0.0)  # ETC_H of all jobs
+    overrun_hours = db.Column(db.Float, nullable=False, default=0.0)
+    ach_lt50 = db.Column(db.Integer, nullable=False, default=0)
+    ach_50_75 = db.Column(db.Integer, nullable=False, default=0)
+    ach_75_90 = db.Column(db.Integer, nullable=False, default=0)
+    ach_90_100 = db.Column(db.Integer, nullable=False, default=0)
+    ach_100 = db.Column(db.Integer, nullable=False, default=0)
+
+class ArchiveSegment(db.Model):
+    """A month of archived History in HistoryArchive (by finish_at)
+    
+    ``size`` is the committed length of the segment file; bytes past it
+    belong to an archive run that did not commit and are ignored.
+    """
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    min_id = db.Column(db.Integer, nullable=True)
+    max_id = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+class Task(db.Model):
+    """Background admin operation (one of TASK_KINDS) and its progress"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued / running / done / failed
+    params = db.Column(db.Text, nullable=True)  # JSON
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': loads(self.params) if self.params else {},
+            'progress': self.progress,
+            'total': self.total,
+            'result': loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class JobChange(db.Model):
+    """Append-only log of job writes, read by /changes
+    
+    Written by log_job_changes() in the transaction of the write. ``seq``
+    only grows and is never reused (AUTOINCREMENT on SQLite), so a consumer
+    that keeps the last seq it applied reads only what changed since.
+    """
+    __table_args__ = (
+        db.Index('ix_job_change_job_id_seq', 'job_id', 'seq'),
+        {'sqlite_autoincrement': True},
+    )
+
+    seq = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # insert / update / promote / finish
+    changed_at = db.Column(db.DateTime, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON: the job after the change (finish: its History row)
+
+class Machine(db.Model):
+    """Registered machine, grouped by hall and production line"""
+    __table_args__ = (
+        db.Index('ix_machine_hall_line', 'hall', 'line'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)  # Job.mesin / History.mesin
+    hall = db.Column(db.String(50), nullable=True)
+    line = db.Column(db.String(50), nullable=True)
+    # Change counters of this machine's jobs and history, for the response cache
+    jobs_version = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
+    history_version = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
 
     def to_dict(self):
         return {
             'id': self.id,
-            'mesin': self.mesin,
-            'job_type': self.job_type,
-            'MODEL': self.MODEL,
-            'PART': self.PART,
-            'SIZE': self.SIZE,
-            'START': self.START,
-            'FINISH': self.FINISH,
-            'ETC_H': self.ETC_H,
-            'OPERATOR': self.OPERATOR,
-            'ACHIEVEMENT': self.ACHIEVEMENT,
-            'REMARK': self.REMARK
+            'name': self.name,
+            'hall': self.hall,
+            'line': self.line
         }
 
-def calculate_achievement(start_time, finish_time, etc_h):
-    """Calculate achievement percentage based on actual vs target time"""
-    if not start_time or not finish_time or not etc_h:
+# DailyStats columns that are summed when rows are merged
+DAILY_STATS_COUNTERS = [
+    'jobs', 'measured', 'on_target', 'achievement_sum', 'actual_hours', 'target_hours', 'overrun_hours'
+] + [column for column, _ in ACHIEVEMENT_BUCKETS]
+
+def get_version(name):
+    """Return the current version number of a data set"""
+    row = db.session.get(DataVersion, name)
+    return row.value if row else 0
+
+def get_versions(*names):
+    """Return {name: version} for several data sets in one query"""
+    rows = db.session.execute(select(DataVersion.name, DataVersion.value).where(DataVersion.name.in_(names)))
+    versions = dict.fromkeys(names, 0)
+    versions.update(rows.all())
+    return versions
+
+def bump_version(name):
+    """Increment the version of a data set inside the current transaction"""
+    result = db.session.execute(
+        update(DataVersion).where(DataVersion.name == name).values(value=DataVersion.value + 1)
+    )
+    if result.rowcount == 0:
+        db.session.add(DataVersion(name=name, value=1))
+
+def bump_machine_versions(column, machines=()):
+    """Increment a per-machine counter (Machine.jobs_version / history_version)
+    
+    Only for the named machines, or for every machine when none are given.
+    """
+    statement = update(Machine).values({column: column + 1})
+    if machines:
+        statement = statement.where(Machine.name.in_(set(machines)))
+    db.session.execute(statement.execution_options(synchronize_session=False))
+
+def bump_jobs_version(*machines):
+    """Mark the jobs of some machines (all without arguments) as changed"""
+    bump_version('jobs')
+    bump_machine_versions(Machine.jobs_version, machines)
+
+def bump_history_version(*machines):
+    """Mark the history of some machines (all without arguments) as changed"""
+    bump_version('history')
+    bump_machine_versions(Machine.history_version, machines)
+
+def log_job_changes(changes):
+    """Append (kind, job id, data) changes, in order, to the JobChange log
+    
+    Call after bump_jobs_version() in the same transaction: the 'jobs'
+    DataVersion row it updates stays locked until commit, so seq numbers are
+    handed out in commit order and /changes never shows N+1 while N can still
+    commit (SQLite has a single writer anyway).
+    """
+    now = datetime.now()
+    rows = [
+        {'job_id': job_id, 'kind': kind, 'changed_at': now, 'data': dumps(data).decode('utf-8')}
+        for kind, job_id, data in changes
+    ]
+    if rows:
+        db.session.execute(db.insert(JobChange), rows)
+
+def job_changes(kind, job_ids):
+    """Changes of jobs as they are now, for writes that bypass the ORM objects"""
+    rows = db.session.execute(select(*Job.serialized_columns()).where(Job.id.in_(job_ids)).order_by(Job.id))
+    return [(kind, row.id, dict(zip(Job.SERIALIZED_FIELDS, row))) for row in rows]
+
+def machine_registry():
+    """Registered machines as dicts ordered by hall, line and registration
+    
+    Cached per app and reloaded only when the 'machines' version changes.
+    """
+    version = get_version('machines')
+    cache = current_app.extensions.setdefault('machine_cache', {'version': None, 'machines': [], 'names': frozenset()})
+    if cache['version'] != version:
+        machines = [machine.to_dict() for machine in Machine.query.order_by(Machine.id)]
+        machines.sort(key=lambda machine: (machine['hall'] or '', machine['line'] or ''))
+        cache['machines'] = machines
+        cache['names'] = frozenset(machine['name'] for machine in machines)
+        cache['version'] = version
+    return cache['machines']
+
+def scoped_machines(hall=None, line=None):
+    """Registered machines of a hall and/or line (all machines without a scope)"""
+    return [
+        machine for machine in machine_registry()
+        if (not hall or machine['hall'] == hall) and (not line or machine['line'] == line)
+    ]
+
+def registered_machine_names():
+    """Frozen set of the registered machine names (read once per request by bulk validation)"""
+    machine_registry()
+    return current_app.extensions['machine_cache']['names']
+
+def registered_scope(hall=None, line=None):
+    """Whether a hall/line scope has registered machines (the whole board always has)
+    
+    Caches keyed by a scope from the request only keep registered scopes, so
+    made-up ?hall=/?line= values cannot grow them.
+    """
+    return not (hall or line) or bool(scoped_machines(hall, line))
+
+def unregistered_machine_error(mesin, names=None):
+    """Validation message for a machine name that is not in the registry, else None
+    
+    ``names`` is a registered_machine_names() set already read by the caller.
+    """
+    if names is None:
+        names = registered_machine_names()
+    if mesin and mesin not in names:
+        return f'Mesin {mesin} tidak terdaftar'
+    return None
+
+def machine_cache_scope(mesin, column):
+    """'<machine id>.<version>' of a registered machine, for cache keys (None if unregistered)
+    
+    ``column`` is Machine.jobs_version or Machine.history_version.
+    """
+    row = db.session.execute(select(Machine.id, column).where(Machine.name == mesin)).first()
+    return f'{row[0]}.{row[1]}' if row else None
+
+def cached_json(namespace, key, build):
+    """JSON response of build(), read through the response cache
+    
+    ``key`` must contain the versions the payload depends on, read before
+    build() runs; with key=None the response is built uncached.
+    """
+    cache = current_app.extensions['response_cache']
+    body = cache.get(namespace, key) if key is not None else None
+    if body is None:
+        body = dumps(build()) + b'\n'
+        if key is not None:
+            cache.set(namespace, key, body)
+    return Response(body, mimetype='application/json')
+
+def requested_format():
+    """?format= of a list view (records by default), None if unknown"""
+    fmt = request.args.get('format') or RECORDS
+    return fmt if fmt in FORMATS else None
+
+def format_error():
+    """400 response for an unknown ?format="""
+    return jsonify({'error': f"format tidak dikenal: {request.args.get('format')} (pilih {' / '.join(FORMATS)})"}), 400
+
+def project_rows(query, model):
+    """Row tuples of model.SERIALIZED_FIELDS for an ORM query
+    
+    Only those columns are selected and the statement runs on the Core
+    connection, so no ORM objects are built (datetimes stay datetime objects;
+    serializer.dumps writes them as ISO 8601).
+    """
+    result = db.session.connection().execute(query.with_entities(*model.serialized_columns()).statement)
+    return [tuple(row) for row in result]
+
+def parse_legacy_datetime(value, reference=None, past=False):
+    """Parse a "DD/MM - HH:MM" string, inferring the missing year
+    
+    The year is chosen so the result is nearest to ``reference`` (default: now),
+    or, with ``past=True``, the latest candidate not after ``reference``.
+    Returns None for empty or unparseable values.
+    """
+    parsed = parse_day_time(value)
+    if parsed is None:
+        return None
+    day, month, hour, minute = parsed
+    
+    reference = reference or datetime.now()
+    candidates = []
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidates.append(datetime(year, month, day, hour, minute))
+        except ValueError:
+            continue  # 29/02 outside a leap year
+    if not candidates:
+        return None
+    
+    if past:
+        earlier = [dt for dt in candidates if dt <= reference]
+        return max(earlier) if earlier else min(candidates)
+    return min(candidates, key=lambda dt: abs(dt - reference))
+
+def resolve_times(start, finish, reference=None):
+    """Resolve START/FINISH strings to (start_at, finish_at) datetimes"""
+    start_at = parse_legacy_datetime(start, reference)
+    finish_at = parse_legacy_datetime(finish, reference)
+    if start_at and finish_at and start_at > finish_at:
+        # A job cannot finish before it starts: the start belongs to an earlier year
+        start_at = parse_legacy_datetime(start, finish_at, past=True)
+    return start_at, finish_at
+
+def resolve_job_times(job, reference=None):
+    """Fill start_at/finish_at from the START/FINISH strings of a job"""
+    job.start_at, job.finish_at = resolve_times(job.START, job.FINISH, reference)
+
+def duration_hours(start_at, finish_at):
+    """Hours from start_at to finish_at, None if either is missing or the finish is earlier"""
+    if not start_at or not finish_at or finish_at < start_at:
+        return None
+    return (finish_at - start_at).total_seconds() / 3600
+
+def calculate_achievement(duration_h, target_h):
+    """Achievement percentage: 100 up to the target, then linear down to 0
+    
+    0.0 when the job cannot be measured (no duration, no positive target).
+    Same rule as analytics.achievement_percent().
+    """
+    if duration_h is None or target_h is None or target_h <= 0:
         return 0.0
+    if duration_h <= target_h:
+        return 100.0
+    return max(0.0, 100.0 - (duration_h - target_h) / target_h * 100)
+
+def job_hours(start_at, finish_at, etc_h):
+    """duration_h, target_h and ACHIEVEMENT of a job, from its resolved times and ETC_H"""
+    duration_h = duration_hours(start_at, finish_at)
+    target_h = parse_hours(etc_h)
+    return {'duration_h': duration_h, 'target_h': target_h, 'ACHIEVEMENT': calculate_achievement(duration_h, target_h)}
+
+def resolve_job_hours(job):
+    """Store duration_h, target_h and ACHIEVEMENT on a job (after resolve_job_times)"""
+    for name, value in job_hours(job.start_at, job.finish_at, job.ETC_H).items():
+        setattr(job, name, value)
+
+def daily_stats_row(history_job):
+    """DailyStats counters contributed by one History row (None without finish_at)"""
+    if not history_job.finish_at:
+        return None
     
-    try:
-        # Parse times (DD/MM - HH:MM format)
-        start_dt = datetime.strptime(start_time, "%d/%m - %H:%M")
-        finish_dt = datetime.strptime(finish_time, "%d/%m - %H:%M")
-        
-        # Calculate actual duration in hours
-        duration = (finish_dt - start_dt).total_seconds() / 3600
-        
-        # Extract target hours from ETC_H (e.g., "4 H" -> 4)
-        target_hours = float(etc_h.replace(' H', '').replace('H', ''))
-        
-        # Calculate achievement (reverse calculation)
-        if duration <= target_hours:
-            return 100.0
+    achievement = history_job.ACHIEVEMENT or 0.0
+    target = history_job.target_h
+    row = dict.fromkeys(DAILY_STATS_COUNTERS, 0)
+    row.update(
+        date=history_job.finish_at.date(),
+        mesin=history_job.mesin,
+        operator=history_job.OPERATOR,
+        jobs=1,
+        on_target=int(achievement >= 100),
+        achievement_sum=achievement,
+        target_hours=target or 0.0,
+    )
+    actual = history_job.duration_h
+    if target and actual is not None:
+        row.update(measured=1, actual_hours=actual, overrun_hours=max(0.0, actual - target))
+    
+    bucket = ACHIEVEMENT_BUCKETS[0][0]
+    for column, lower in ACHIEVEMENT_BUCKETS:
+        if achievement >= lower:
+            bucket = column
+    row[bucket] = 1
+    return row
+
+def merge_daily_stats(rows, totals=None):
+    """Sum DailyStats rows that share a (date, mesin, operator) key"""
+    totals = {} if totals is None else totals
+    for row in rows:
+        if row is None:
+            continue
+        key = (row['date'], row['mesin'], row['operator'])
+        if key in totals:
+            for name in DAILY_STATS_COUNTERS:
+                totals[key][name] += row[name]
         else:
-            return max(0.0, 100.0 - ((duration - target_hours) / target_hours * 100))
-    except:
-        return 0.0
+            totals[key] = row
+    return totals
+
+def add_daily_stats(history_jobs):
+    """Add History rows to the DailyStats rollup inside the current transaction"""
+    rows = list(merge_daily_stats(daily_stats_row(job) for job in history_jobs).values())
+    if not rows:
+        return
+    
+    table = DailyStats.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert(table) if dialect == 'sqlite' else postgresql.insert(table)
+        db.session.execute(
+            insert.on_conflict_do_update(
+                index_elements=list(table.primary_key.columns),
+                set_={name: table.c[name] + insert.excluded[name] for name in DAILY_STATS_COUNTERS},
+            ),
+            rows,
+        )
+        return
+    
+    for row in rows:
+        result = db.session.execute(
+            update(table)
+            .where(table.c.date == row['date'], table.c.mesin == row['mesin'], table.c.operator == row['operator'])
+            .values({name: table.c[name] + row[name] for name in DAILY_STATS_COUNTERS})
+        )
+        if result.rowcount == 0:
+            db.session.execute(table.insert(), row)
+
+def rebuild_daily_stats(batch_size=BACKFILL_BATCH_SIZE, progress=None):
+    """Recompute DailyStats from History (in id-ordered batches) and the archive; returns the rollup row count
+    
+    ``progress(rows read, total)`` is called after every batch.
+    """
+    totals = {}
+    last_id = 0
+    segments = archived_segments()
+    total = None
+    if progress:
+        total = db.session.scalar(select(func.count(History.id))) + sum(segment.rows for segment in segments)
+    
+    merge_daily_stats((daily_stats_row(row) for row in read_archived_history(segments)), totals)
+    read = sum(segment.rows for segment in segments)
+    
+    def history_rows(limit=None):
+        return db.session.execute(
+            select(History.id, History.mesin, History.OPERATOR, History.ACHIEVEMENT, History.finish_at,
+                   History.duration_h, History.target_h)
+            .where(History.id > last_id)
+            .order_by(History.id)
+            .limit(limit)
+        ).all()
+    
+    while True:
+        rows = history_rows(batch_size)
+        if not rows:
+            break
+        merge_daily_stats((daily_stats_row(row) for row in rows), totals)
+        last_id = rows[-1].id
+        read += len(rows)
+        if progress:
+            progress(read, total)
+    
+    # History summaries are read from the rollup. The version bump takes the
+    # write lock first, so jobs finished while reading are picked up below
+    bump_history_version()
+    merge_daily_stats((daily_stats_row(row) for row in history_rows()), totals)
+    db.session.execute(delete(DailyStats))
+    if totals:
+        db.session.execute(db.insert(DailyStats), list(totals.values()))
+    db.session.commit()
+    return len(totals)
+
+# Pages and static assets
+def static_assets():
+    """The asset manifest, re-scanned on every use while templates auto-reload (debug)"""
+    assets = current_app.extensions['assets']
+    if current_app.jinja_env.auto_reload:
+        assets.refresh()
+        current_app.extensions['page_version'] = folder_digest(current_app.template_folder) + assets.version
+    return assets
+
+@bp.app_template_global()
+def asset_url(filename):
+    """URL of a static file under its content hash (js/main.js -> /assets/js/main.<hash>.js)"""
+    return url_for('jobs.static_asset', filename=static_assets().hashed_name(filename))
+
+def render_page(template, version, context=None, key=None, cache=True):
+    """A rendered template, revalidated with an ETag and gzipped when accepted
+
+    The ETag covers the templates, the static assets and ``version`` (the
+    data the page embeds), so a reload of an unchanged page is a 304.
+    ``context`` returns the template variables; it is only called when the
+    page is rendered. ``key`` tells apart pages of one template and version
+    (e.g. the hall/line scope); with cache=False (a key taken from the
+    request that matches nothing known) the page is rendered uncached.
+    """
+    static_assets()
+    encoding = 'gzip' if request.accept_encodings['gzip'] else 'identity'
+    etag = f"page-{current_app.extensions['page_version']}-{version}-{encoding}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        # Rendered (and compressed) once per ETag, shared by every screen loading the page
+        pages = current_app.extensions.setdefault('page_cache', {})
+        cached = pages.get((template, key, encoding)) if cache else None
+        if cached is None or cached[0] != etag:
+            body = render_template(template, **(context() if context else {})).encode('utf-8')
+            compressed = encoding == 'gzip' and len(body) >= PAGE_GZIP_MIN_SIZE
+            if compressed:
+                body = gzip.compress(body, compresslevel=6)
+            cached = (etag, body, compressed)
+            if cache:
+                pages[(template, key, encoding)] = cached
+        response = current_app.response_class(cached[1], mimetype='text/html')
+        if cached[2]:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@bp.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Fingerprinted static file, precompressed (br / gzip), cached by browsers for a year"""
+    asset, current = static_assets().lookup(filename)
+    if asset is None:
+        raise NotFound()
+    encoding, body = asset.negotiate(request.accept_encodings)
+    etag = f'{asset.digest}-{encoding}'
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype=asset.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # An outdated hash gets the current file, which must not stay cached under the old URL
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable' if current else 'no-cache'
+    return response
 
 # Routes
-@app.route('/')
+@bp.route('/')
 def dashboard():
-    """Main dashboard page"""
-    return render_template('index.html')
+    """Main dashboard page, with the dashboard snapshot embedded for the first render"""
+    hall = request.args.get('hall') or None
+    line = request.args.get('line') or None
+    etag = dashboard_etag()
+    
+    def context():
+        # The quoted form, as /dashboard_data sends it in its ETag header
+        return {'initial_dashboard': Markup(script_safe(dashboard_body(etag, hall, line)).decode('utf-8')),
+                'dashboard_etag': f'"{etag}"'}
+    
+    return render_page('index.html', etag, context, key=(hall, line), cache=registered_scope(hall, line))
 
-@app.route('/add_job', methods=['POST'])
+@bp.route('/add_job', methods=['POST'])
 def add_job():
     """Add new job"""
     try:
         data = request.get_json()
         
-        # Calculate achievement if both start and finish are provided
-        achievement = 0.0
-        if data.get('START') and data.get('FINISH'):
-            achievement = calculate_achievement(data.get('START'), data.get('FINISH'), data.get('ETC_H'))
-        
-        new_job = Job(
-            mesin=data['mesin'],
-            job_type=data['job_type'],
-            MODEL=data['MODEL'],
-            PART=data['PART'],
-            SIZE=data['SIZE'],
-            START=data.get('START'),
-            FINISH=data.get('FINISH'),
-            ETC_H=data['ETC_H'],
-            OPERATOR=data['OPERATOR'],
-            ACHIEVEMENT=achievement,
-            REMARK=data.get('REMARK', '')
-        )
+        machine_error = unregistered_machine_error(data.get('mesin'))
+        if machine_error:
+            return jsonify({'success': False, 'message': machine_error})
         
-        db.session.add(new_job)
-        db.session.commit()
+        # A machine only gets a current job while it has none: check and insert under its lock
+        db.session.rollback()
+        with machine_locks(data['mesin']):
+            if data['job_type'] == 'current' and current_job_machines([data['mesin']]):
+                return jsonify({'success': False, 'message': f"Mesin {data['mesin']} sudah memiliki job current"})
+            
+            new_job = Job(
+                mesin=data['mesin'],
+                job_type=data['job_type'],
+                MODEL=data['MODEL'],
+                PART=data['PART'],
+                SIZE=data['SIZE'],
+                START=data.get('START'),
+                FINISH=data.get('FINISH'),
+                ETC_H=data['ETC_H'],
+                OPERATOR=data['OPERATOR'],
+                REMARK=data.get('REMARK', ''),
+                queue_pos=queue_tail_allocator()(data['mesin'])
+            )
+            resolve_job_times(new_job)
+            resolve_job_hours(new_job)
+            
+            db.session.add(new_job)
+            bump_jobs_version(new_job.mesin)
+            log_job_changes([('insert', new_job.id, new_job.to_dict())])
+            db.session.commit()
+            job_data = new_job.to_dict()
+        
+        broker.publish('job', job_data)
         
         return jsonify({'success': True, 'message': 'Job berhasil ditambahkan'})
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
-@app.route('/job_data/<int:job_id>')
+@bp.route('/job_data/<int:job_id>')
 def get_job_data(job_id):
     """Get job data for editing"""
     try:
-        job = Job.query.get_or_404(job_id)
-        return jsonify(job.to_dict())
+        scope = db.session.execute(
+            select(Machine.id, Machine.jobs_version).join(Job, Job.mesin == Machine.name).where(Job.id == job_id)
+        ).first()
+        key = f'{scope.id}.{scope.jobs_version}:{job_id}' if scope else None
+        return cached_json('job', key, lambda: Job.query.get_or_404(job_id).to_dict())
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/edit_job/<int:job_id>', methods=['POST'])
+@bp.route('/edit_job/<int:job_id>', methods=['POST'])
 def edit_job(job_id):
     """Edit existing job"""
     try:
-        job = Job.query.get_or_404(job_id)
+        old_mesin = Job.query.get_or_404(job_id).mesin
         data = request.get_json()
         
-        job.mesin = data['mesin']
-        job.job_type = data['job_type']
-        job.MODEL = data['MODEL']
-        job.PART = data['PART']
-        job.SIZE = data['SIZE']
-        job.START = data.get('START')
-        job.FINISH = data.get('FINISH')
-        job.ETC_H = data['ETC_H']
-        job.OPERATOR = data['OPERATOR']
-        job.REMARK = data.get('REMARK', '')
-        
-        # Recalculate achievement
-        if job.START and job.FINISH:
-            job.ACHIEVEMENT = calculate_achievement(job.START, job.FINISH, job.ETC_H)
+        machine_error = unregistered_machine_error(data.get('mesin'))
+        if machine_error:
+            return jsonify({'success': False, 'message': machine_error})
         
-        db.session.commit()
+        # Edit under the locks of both machines, so a concurrent finish or promote can't interleave
+        db.session.rollback()
+        with machine_locks(old_mesin, data['mesin']):
+            job = db.session.get(Job, job_id, populate_existing=True)
+            if job is None or job.mesin != old_mesin:
+                return jsonify({'success': False, 'message': 'Job sudah diselesaikan atau diubah dari terminal lain'})
+            if data['job_type'] == 'current' and current_job_machines([data['mesin']], ignore=[job_id]):
+                return jsonify({'success': False, 'message': f"Mesin {data['mesin']} sudah memiliki job current"})
+            
+            job.mesin = data['mesin']
+            job.job_type = data['job_type']
+            job.MODEL = data['MODEL']
+            job.PART = data['PART']
+            job.SIZE = data['SIZE']
+            job.START = data.get('START')
+            job.FINISH = data.get('FINISH')
+            job.ETC_H = data['ETC_H']
+            job.OPERATOR = data['OPERATOR']
+            job.REMARK = data.get('REMARK', '')
+            if job.mesin != old_mesin:
+                # Moved to another machine: join the end of its queue
+                job.queue_pos = queue_tail_allocator()(job.mesin)
+            resolve_job_times(job)
+            resolve_job_hours(job)
+            
+            bump_jobs_version(old_mesin, job.mesin)
+            log_job_changes([('update', job.id, job.to_dict())])
+            db.session.commit()
+            job_data = job.to_dict()
+        
+        if old_mesin != job_data['mesin']:
+            broker.publish('job_removed', {'id': job_id, 'mesin': old_mesin})
+        broker.publish('job', job_data)
         
         return jsonify({'success': True, 'message': 'Job berhasil diupdate'})
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
-@app.route('/finish_job/<int:job_id>', methods=['POST'])
+class JobConflict(Exception):
+    """A job was changed by another writer (e.g. finished from another terminal)"""
+
+# One lock per machine serializes finish-and-promote within this process
+_machine_locks = {}
+_machine_locks_guard = threading.Lock()
+
+def machine_locks(*machines):
+    """Hold the locks of the given machines (acquired in sorted order, no deadlocks)"""
+    stack = ExitStack()
+    with _machine_locks_guard:
+        locks = [_machine_locks.setdefault(machine, threading.Lock()) for machine in sorted(set(machines))]
+    for lock in locks:
+        stack.enter_context(lock)
+    return stack
+
+def current_job_machines(machines, ignore=()):
+    """Names of the given machines that already have a current job (other than the ignored job ids)"""
+    return set(db.session.execute(
+        select(Job.mesin).where(Job.job_type == 'current', Job.mesin.in_(set(machines)), Job.id.not_in(set(ignore)))
+    ).scalars())
+
+def promote_next_job(mesin):
+    """Promote the first queued job of a machine, unless it already has a current job
+    
+    The UPDATE is conditional, so concurrent finishes can never leave two
+    current jobs or promote twice. Returns the promoted job or None.
+    """
+    candidate_id = db.session.execute(
+        select(Job.id)
+        .where(Job.mesin == mesin, Job.job_type == 'next')
+        .order_by(Job.queue_pos, Job.id)
+        .limit(1)
+        .with_for_update()
+    ).scalar()
+    if candidate_id is None:
+        return None
+    
+    has_current = exists().where(Job.mesin == mesin, Job.job_type == 'current')
+    result = db.session.execute(
+        update(Job)
+        .where(Job.id == candidate_id, Job.job_type == 'next', ~has_current)
+        .values(job_type='current')
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    return db.session.get(Job, candidate_id, populate_existing=True)
+
+# Job columns copied to History when a job is finished
+HISTORY_COPY_FIELDS = (
+    'mesin', 'job_type', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH', 'ETC_H', 'OPERATOR', 'REMARK', 'start_at', 'finish_at',
+)
+
+def move_jobs_to_history(mesin, job_ids):
+    """Archive finished jobs of one machine and promote its next job if needed
+    
+    Runs inside the caller's transaction; callers should hold machine_locks()
+    for the machine. The jobs are removed with one DELETE ... RETURNING that
+    only matches rows still on this machine with a FINISH time, so a job
+    finished or changed concurrently elsewhere raises JobConflict instead of
+    being archived twice, and History is built from the rows as deleted.
+    The machine's next job is promoted once, if a current job was among them.
+    Callers add the History rows to DailyStats with one add_daily_stats()
+    per request. Returns (history_jobs in job_ids order, promoted_job).
+    """
+    deleted = {
+        row.id: row for row in db.session.execute(
+            delete(Job)
+            .where(Job.id.in_(job_ids), Job.mesin == mesin, Job.FINISH.isnot(None))
+            .returning(Job.id, *(getattr(Job, field) for field in HISTORY_COPY_FIELDS))
+        )
+    }
+    missing = [job_id for job_id in job_ids if job_id not in deleted]
+    if missing:
+        raise JobConflict(f"Job {', '.join(map(str, missing))} sudah diselesaikan atau diubah")
+    
+    history_jobs = []
+    for job_id in job_ids:
+        row = deleted[job_id]
+        history_job = History(**{field: getattr(row, field) for field in HISTORY_COPY_FIELDS})
+        if not history_job.finish_at:
+            resolve_job_times(history_job)
+        # Final achievement, from the resolved times (so a job across New Year is measured right)
+        resolve_job_hours(history_job)
+        history_jobs.append(history_job)
+    db.session.add_all(history_jobs)
+    db.session.flush()
+    
+    # If a current job was finished, promote the next job to current
+    next_job = None
+    if any(row.job_type == 'current' for row in deleted.values()):
+        next_job = promote_next_job(mesin)
+    
+    return history_jobs, next_job
+
+@bp.route('/finish_job/<int:job_id>', methods=['POST'])
 def finish_job(job_id):
     """Finish job and move to history"""
     try:
@@ -183,218 +905,2062 @@ def finish_job(job_id):
         if not job.FINISH:
             return jsonify({'success': False, 'message': 'FINISH time harus diisi sebelum menyelesaikan job'})
         
-        # Calculate final achievement
-        achievement = calculate_achievement(job.START, job.FINISH, job.ETC_H)
-        
-        # Move to history
-        history_job = History(
-            mesin=job.mesin,
-            job_type=job.job_type,
-            MODEL=job.MODEL,
-            PART=job.PART,
-            SIZE=job.SIZE,
-            START=job.START,
-            FINISH=job.FINISH,
-            ETC_H=job.ETC_H,
-            OPERATOR=job.OPERATOR,
-            ACHIEVEMENT=achievement,
-            REMARK=job.REMARK
-        )
-        
-        db.session.add(history_job)
-        db.session.delete(job)
+        mesin = job.mesin
+        # Don't hold a pooled connection while queueing for the machine lock
+        db.session.rollback()
+        with machine_locks(mesin):
+            [history_job], next_job = move_jobs_to_history(mesin, [job_id])
+            add_daily_stats([history_job])
+            bump_jobs_version(mesin)
+            bump_history_version(mesin)
+            log_job_changes([('finish', job_id, history_job.to_dict())]
+                            + ([('promote', next_job.id, next_job.to_dict())] if next_job else []))
+            db.session.commit()
+            next_job_data = next_job.to_dict() if next_job else None
         
-        # If this was a current job, promote next job to current
-        if job.job_type == 'current':
-            next_job = Job.query.filter_by(mesin=job.mesin, job_type='next').first()
-            if next_job:
-                next_job.job_type = 'current'
-        
-        db.session.commit()
+        broker.publish('job_removed', {'id': job_id, 'mesin': mesin})
+        if next_job_data:
+            broker.publish('job', next_job_data)
         
         return jsonify({'success': True, 'message': 'Job berhasil diselesaikan dan dipindah ke history'})
+    except JobConflict:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Job sudah diselesaikan atau diubah dari terminal lain'})
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
-@app.route('/navigate_job/<mesin>/<direction>')
+def queue_neighbour(mesin, job, direction):
+    """The next job after (or before, with direction='prev') ``job`` in a machine queue
+    
+    Keyset lookup on (queue_pos, id) through ix_job_mesin_job_type_queue_pos,
+    wrapping around at either end. ``job=None`` returns the first (last) job.
+    """
+    queue = Job.query.filter(Job.mesin == mesin, Job.job_type == 'next')
+    if direction == 'prev':
+        order = (Job.queue_pos.desc(), Job.id.desc())
+        beyond = lambda job: or_(Job.queue_pos < job.queue_pos, and_(Job.queue_pos == job.queue_pos, Job.id < job.id))
+    else:
+        order = (Job.queue_pos, Job.id)
+        beyond = lambda job: or_(Job.queue_pos > job.queue_pos, and_(Job.queue_pos == job.queue_pos, Job.id > job.id))
+    
+    neighbour = queue.filter(beyond(job)).order_by(*order).first() if job else None
+    return neighbour or queue.order_by(*order).first()
+
+@bp.route('/navigate_job/<mesin>/<direction>')
 def navigate_job(mesin, direction):
     """Navigate through next jobs for a machine with current job id"""
     try:
         current_job_id = request.args.get('current_job_id', type=int)
-        next_jobs = Job.query.filter_by(mesin=mesin, job_type='next').order_by(Job.id).all()
-        
-        if not next_jobs:
-            return jsonify({'job': None})
-        
-        # Find current index
-        current_index = 0
-        if current_job_id:
-            for idx, job in enumerate(next_jobs):
-                if job.id == current_job_id:
-                    current_index = idx
-                    break
-        
-        if direction == 'next':
-            new_index = current_index + 1
-            if new_index >= len(next_jobs):
-                new_index = 0  # loop back to first
-        elif direction == 'prev':
-            new_index = current_index - 1
-            if new_index < 0:
-                new_index = len(next_jobs) - 1  # loop back to last
-        else:
-            new_index = current_index
         
-        job = next_jobs[new_index]
-        return jsonify({'job': job.to_dict()})
+        def navigate():
+            anchor = db.session.get(Job, current_job_id) if current_job_id else None
+            if anchor is None or anchor.mesin != mesin or anchor.job_type != 'next':
+                # No (valid) position yet: start from the head of the queue
+                anchor = queue_neighbour(mesin, None, 'next')
+            
+            if anchor is None:
+                return {'job': None}
+            
+            if direction in ('next', 'prev'):
+                job = queue_neighbour(mesin, anchor, direction)
+            else:
+                job = anchor
+            return {'job': job.to_dict()}
+        
+        scope = machine_cache_scope(mesin, Machine.jobs_version)
+        key = f'{scope}:{current_job_id}:{direction}' if scope else None
+        return cached_json('navigate', key, navigate)
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/dashboard_data')
+def queue_tail_allocator():
+    """Return allocate(mesin) -> a queue position after every queued job of that machine
+    
+    The tail of each machine is read once, so a batch appends in order.
+    """
+    tails = {}
+    
+    def allocate(mesin):
+        if mesin not in tails:
+            # No autoflush: a pending edit of the job being moved must not count itself
+            with db.session.no_autoflush:
+                tails[mesin] = db.session.execute(
+                    select(func.max(Job.queue_pos)).where(Job.mesin == mesin, Job.job_type == 'next')
+                ).scalar() or 0
+        tails[mesin] += 1
+        return tails[mesin]
+    
+    return allocate
+
+def write_queue_order(mesin, job_ids):
+    """Store job_ids (all 'next' jobs of a machine) as queue positions 1..n
+    
+    Returns the ids of the jobs whose position changed.
+    """
+    current = dict(db.session.execute(
+        select(Job.id, Job.queue_pos).where(Job.mesin == mesin, Job.job_type == 'next')
+    ).all())
+    changes = [
+        {'id': job_id, 'queue_pos': position}
+        for position, job_id in enumerate(job_ids, 1)
+        if current.get(job_id) != position
+    ]
+    if changes:
+        db.session.execute(update(Job), changes)
+    return [change['id'] for change in changes]
+
+def queued_job_ids(mesin):
+    """Ids of a machine's 'next' jobs in queue order"""
+    return list(db.session.execute(
+        select(Job.id).where(Job.mesin == mesin, Job.job_type == 'next').order_by(Job.queue_pos, Job.id)
+    ).scalars())
+
+@bp.route('/jobs/<int:job_id>/move', methods=['POST'])
+def move_job(job_id):
+    """Move a next job within its machine queue
+    
+    Body: {"before": id}, {"after": id} or {"position": "first" | "last" | n}
+    (n is 1-based).
+    """
+    try:
+        job = Job.query.get_or_404(job_id)
+        data = request.get_json() or {}
+        if job.job_type != 'next':
+            return jsonify({'success': False, 'message': 'Hanya job next yang bisa dipindah'})
+        
+        mesin = job.mesin
+        db.session.rollback()
+        with machine_locks(mesin):
+            order = queued_job_ids(mesin)
+            if job_id not in order:
+                return jsonify({'success': False, 'message': 'Job sudah diselesaikan atau diubah dari terminal lain'})
+            order.remove(job_id)
+            
+            target = data.get('before', data.get('after'))
+            if target is not None:
+                if target not in order:
+                    return jsonify({'success': False, 'message': f'Job {target} tidak ada di antrian {mesin}'})
+                index = order.index(target) + (1 if 'after' in data and 'before' not in data else 0)
+            elif data.get('position') == 'first':
+                index = 0
+            elif data.get('position') == 'last':
+                index = len(order)
+            elif isinstance(data.get('position'), int) and data['position'] >= 1:
+                index = min(data['position'] - 1, len(order))
+            else:
+                return jsonify({'success': False, 'message': 'before, after atau position harus diisi'})
+            
+            order.insert(index, job_id)
+            moved = write_queue_order(mesin, order)
+            bump_jobs_version(mesin)
+            log_job_changes(job_changes('update', moved))
+            db.session.commit()
+        
+        broker.publish('reload', {})
+        return jsonify({'success': True, 'message': 'Urutan antrian berhasil diubah', 'position': index + 1})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/jobs/reorder', methods=['POST'])
+def reorder_jobs():
+    """Reorder the next jobs of a machine
+    
+    Body: {"mesin": ..., "order": [ids]}. The listed jobs are put in the given
+    order within the queue slots they already occupy; other jobs stay put.
+    """
+    try:
+        data = request.get_json() or {}
+        mesin = data.get('mesin')
+        ids = data.get('order') or []
+        if not mesin or not ids:
+            return jsonify({'success': False, 'message': 'mesin dan order harus diisi'})
+        if len(set(ids)) != len(ids):
+            return jsonify({'success': False, 'message': 'order berisi id ganda'})
+        
+        # Don't hold a pooled connection while queueing for the machine lock
+        db.session.rollback()
+        with machine_locks(mesin):
+            order = queued_job_ids(mesin)
+            queued = set(order)
+            missing = [job_id for job_id in ids if job_id not in queued]
+            if missing:
+                return jsonify({'success': False, 'message': f"Job {', '.join(map(str, missing))} tidak ada di antrian {mesin}"})
+            
+            listed = set(ids)
+            reordered = iter(ids)
+            order = [next(reordered) if job_id in listed else job_id for job_id in order]
+            moved = write_queue_order(mesin, order)
+            bump_jobs_version(mesin)
+            log_job_changes(job_changes('update', moved))
+            db.session.commit()
+        
+        broker.publish('reload', {})
+        return jsonify({'success': True, 'message': 'Urutan antrian berhasil diubah', 'written': len(moved)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+def build_dashboard_data(hall=None, line=None, fmt=None):
+    """Build the per-machine dashboard from a single query over Job
+    
+    With a hall and/or line only those machines are included, and only their
+    jobs are read (filtered in the same query through the Machine table).
+    Jobs are Job.SERIALIZED_FIELDS dicts, or row arrays with fmt=columnar,
+    in which case the machines are wrapped as {"columns": [...], "machines": {...}}.
+    """
+    dashboard_data = {
+        machine['name']: {'current': None, 'next_jobs': [], 'total_jobs': 0}
+        for machine in scoped_machines(hall, line)
+    }
+    query = Job.query.filter(Job.job_type.in_(['current', 'next']))
+    if hall or line:
+        machines = select(Machine.name)
+        if hall:
+            machines = machines.where(Machine.hall == hall)
+        if line:
+            machines = machines.where(Machine.line == line)
+        query = query.filter(Job.mesin.in_(machines))
+    rows = project_rows(query.order_by(Job.mesin, Job.queue_pos, Job.id), Job)
+    
+    columns = Job.SERIALIZED_FIELDS
+    mesin_index = columns.index('mesin')
+    job_type_index = columns.index('job_type')
+    for row in rows:
+        machine_data = dashboard_data.setdefault(
+            row[mesin_index], {'current': None, 'next_jobs': [], 'total_jobs': 0}
+        )
+        job = row if fmt == COLUMNAR else dict(zip(columns, row))
+        if row[job_type_index] == 'current':
+            # Keep the first current job in queue order
+            if machine_data['current'] is not None:
+                continue
+            machine_data['current'] = job
+        else:
+            machine_data['next_jobs'].append(job)
+        machine_data['total_jobs'] += 1
+    
+    if fmt == COLUMNAR:
+        return {'columns': list(columns), 'machines': dashboard_data}
+    return dashboard_data
+
+def dashboard_etag(fmt=RECORDS):
+    """ETag of the dashboard snapshot: changes with jobs, machines and the format"""
+    versions = get_versions('jobs', 'machines')
+    return f"dashboard-{versions['jobs']}-{versions['machines']}" + ('-columnar' if fmt == COLUMNAR else '')
+
+def dashboard_body(etag, hall=None, line=None, fmt=RECORDS):
+    """Serialized dashboard snapshot for a scope and format"""
+    # Reused until jobs or machines change (by /dashboard_data and the embedded page data)
+    cache = current_app.extensions.setdefault('dashboard_cache', {'version': None, 'bodies': {}})
+    if cache['version'] != etag:
+        cache['bodies'].clear()
+        cache['version'] = etag
+    body = cache['bodies'].get((hall, line, fmt))
+    if body is None:
+        body = dumps(build_dashboard_data(hall, line, fmt))
+        if registered_scope(hall, line):
+            cache['bodies'][(hall, line, fmt)] = body
+    return body
+
+@bp.route('/dashboard_data')
 def get_dashboard_data():
-    """Get all dashboard data"""
+    """Get all dashboard data (optionally scoped with ?hall=&line=, ?format=columnar)"""
+    try:
+        hall = request.args.get('hall') or None
+        line = request.args.get('line') or None
+        fmt = requested_format()
+        if fmt is None:
+            return format_error()
+        etag = dashboard_etag(fmt)
+        
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(dashboard_body(etag, hall, line, fmt), mimetype='application/json')
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+# Machine registry
+def validate_machine_data(data):
+    """Return a list of validation errors for a machine payload"""
+    errors = []
+    name = (data.get('name') or '').strip()
+    if not name:
+        errors.append('name harus diisi')
+    elif len(name) > 50:
+        errors.append('name maksimal 50 karakter')
+    for field in ('hall', 'line'):
+        if data.get(field) and len(str(data[field])) > 50:
+            errors.append(f'{field} maksimal 50 karakter')
+    return errors
+
+def machine_has_jobs(name):
+    return db.session.execute(select(exists().where(Job.mesin == name))).scalar()
+
+@bp.route('/machines')
+def list_machines():
+    """Registered machines (optionally scoped with ?hall=&line=)"""
+    try:
+        machines = scoped_machines(request.args.get('hall') or None, request.args.get('line') or None)
+        return jsonify({
+            'machines': machines,
+            'halls': sorted({machine['hall'] for machine in machine_registry() if machine['hall']}),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@bp.route('/machines', methods=['POST'])
+def add_machines():
+    """Register one machine (JSON object) or many (JSON array)"""
+    try:
+        data = request.get_json()
+        items = data if isinstance(data, list) else [data]
+        registered = {machine['name'] for machine in machine_registry()}
+        errors = []
+        
+        for index, item in enumerate(items):
+            row_errors = validate_machine_data(item)
+            name = (item.get('name') or '').strip()
+            if name in registered:
+                row_errors.append(f'Mesin {name} sudah terdaftar')
+            registered.add(name)
+            if row_errors:
+                errors.append({'row': index, 'errors': row_errors})
+        
+        if errors:
+            return bulk_error_response(errors)
+        
+        db.session.execute(db.insert(Machine), [
+            {'name': item['name'].strip(), 'hall': item.get('hall') or None, 'line': item.get('line') or None}
+            for item in items
+        ])
+        bump_version('machines')
+        db.session.commit()
+        broker.publish('reload', {})
+        
+        return jsonify({'success': True, 'message': f'{len(items)} mesin berhasil didaftarkan', 'written': len(items)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/machines/<int:machine_id>', methods=['POST'])
+def edit_machine(machine_id):
+    """Rename a machine or move it to another hall/line"""
+    try:
+        machine = Machine.query.get_or_404(machine_id)
+        data = request.get_json()
+        data.setdefault('name', machine.name)
+        
+        errors = validate_machine_data(data)
+        name = data['name'].strip()
+        if name != machine.name:
+            if Machine.query.filter_by(name=name).first():
+                errors.append(f'Mesin {name} sudah terdaftar')
+            elif machine_has_jobs(machine.name):
+                errors.append('Mesin yang masih memiliki job tidak bisa diganti nama')
+        if errors:
+            return jsonify({'success': False, 'message': '; '.join(errors)})
+        
+        if name != machine.name:
+            # Views cached under this machine were built for the old name
+            machine.jobs_version += 1
+            machine.history_version += 1
+        machine.name = name
+        machine.hall = data.get('hall', machine.hall) or None
+        machine.line = data.get('line', machine.line) or None
+        bump_version('machines')
+        db.session.commit()
+        broker.publish('reload', {})
+        
+        return jsonify({'success': True, 'message': 'Mesin berhasil diupdate'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/machines/<int:machine_id>', methods=['DELETE'])
+def delete_machine(machine_id):
+    """Remove a machine without jobs from the registry"""
     try:
-        machines = ['CNC1', 'CNC2', 'CNC3', 'CNC4', 'CNC5']
-        dashboard_data = {}
+        machine = Machine.query.get_or_404(machine_id)
+        if machine_has_jobs(machine.name):
+            return jsonify({'success': False, 'message': 'Mesin yang masih memiliki job tidak bisa dihapus'})
+        
+        db.session.delete(machine)
+        bump_version('machines')
+        db.session.commit()
+        broker.publish('reload', {})
         
-        for machine in machines:
-            current_job = Job.query.filter_by(mesin=machine, job_type='current').first()
-            next_jobs = Job.query.filter_by(mesin=machine, job_type='next').all()
+        return jsonify({'success': True, 'message': 'Mesin berhasil dihapus'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+# Bulk API
+JOB_REQUIRED_FIELDS = ['mesin', 'job_type', 'MODEL', 'PART', 'SIZE', 'ETC_H', 'OPERATOR']
+JOB_OPTIONAL_FIELDS = ['START', 'FINISH', 'REMARK']
+JOB_TYPES = ('current', 'next')
+
+def validate_job_data(data, machine_names):
+    """Return a list of validation errors for a job payload
+    
+    ``machine_names`` is the registered_machine_names() set, read once per request.
+    """
+    errors = [f'{field} harus diisi' for field in JOB_REQUIRED_FIELDS if not data.get(field)]
+    
+    machine_error = unregistered_machine_error(data.get('mesin'), machine_names)
+    if machine_error:
+        errors.append(machine_error)
+    if data.get('job_type') and data['job_type'] not in JOB_TYPES:
+        errors.append(f"job_type harus salah satu dari: {', '.join(JOB_TYPES)}")
+    for field in ('START', 'FINISH'):
+        if data.get(field) and parse_legacy_datetime(data[field]) is None:
+            errors.append(f'{field} harus berformat DD/MM - HH:MM')
+    if data.get('ETC_H') and parse_hours(str(data['ETC_H'])) is None:
+        errors.append('ETC_H harus berupa jumlah jam, mis. "4 H"')
+    
+    return errors
+
+def read_bulk_payload():
+    """Read bulk rows from a JSON array or an uploaded CSV/XLSX file
+    
+    File headers may be field names (MODEL, job_type, ...) or the export
+    headers (Mesin, Job Type, ...).
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        data = request.get_json()
+        return data.get('jobs', []) if isinstance(data, dict) else data
+    
+    reader = read_xlsx if upload.filename.lower().endswith('.xlsx') else read_csv
+    rows = reader(upload.stream)
+    header = next(rows, [])
+    
+    known = {name.lower(): name for name in EXPORT_COLUMNS}
+    known.update({label.lower(): name for label, name in zip(EXPORT_HEADERS, EXPORT_COLUMNS)})
+    fields = [known.get(label.strip().lower()) for label in header]
+    
+    payload = []
+    for row in rows:
+        if not any(row):
+            continue
+        item = {field: value.strip() for field, value in zip(fields, row) if field and value.strip()}
+        if 'id' in item:
+            item['id'] = int(float(item['id']))
+        payload.append(item)
+    return payload
+
+def bulk_error_response(errors, written=0):
+    return jsonify({
+        'success': False,
+        'message': f'{len(errors)} baris tidak valid',
+        'written': written,
+        'errors': errors
+    })
+
+@bp.route('/jobs/bulk', methods=['POST'])
+def bulk_create_jobs():
+    """Create many jobs in one transaction
+    
+    Body: a JSON array of job objects, {"jobs": [...]}, or a CSV/XLSX upload
+    in the "file" field. Nothing is written if any row is invalid, unless
+    ?partial=1 is given, in which case the valid rows are written.
+    """
+    try:
+        payload = read_bulk_payload()
+        partial = request.args.get('partial', type=int) == 1
+        # A machine only gets a current job while it has none: hold the locks of the machines given one
+        current_machines = {data.get('mesin') for data in payload
+                            if data.get('job_type') == 'current' and isinstance(data.get('mesin'), str)}
+        with machine_locks(*current_machines):
+            now = datetime.now()
+            allocate = queue_tail_allocator()
+            machine_names = registered_machine_names()
+            busy = current_job_machines(current_machines)
+            rows = []
+            errors = []
             
-            dashboard_data[machine] = {
-                'current': current_job.to_dict() if current_job else None,
-                'next_jobs': [job.to_dict() for job in next_jobs],
-                'total_jobs': len(next_jobs) + (1 if current_job else 0)
-            }
+            for index, data in enumerate(payload):
+                row_errors = validate_job_data(data, machine_names)
+                if not row_errors and data['job_type'] == 'current':
+                    # Against the machine's current job and the earlier rows of this batch
+                    if data['mesin'] in busy:
+                        row_errors.append(f"Mesin {data['mesin']} sudah memiliki job current")
+                    busy.add(data['mesin'])
+                if row_errors:
+                    errors.append({'row': index, 'errors': row_errors})
+                    continue
+                
+                start_at, finish_at = resolve_times(data.get('START'), data.get('FINISH'), now)
+                etc_h = str(data['ETC_H'])
+                rows.append({
+                    'mesin': data['mesin'],
+                    'job_type': data['job_type'],
+                    'MODEL': data['MODEL'],
+                    'PART': data['PART'],
+                    'SIZE': data['SIZE'],
+                    'START': data.get('START') or None,
+                    'FINISH': data.get('FINISH') or None,
+                    'ETC_H': etc_h,
+                    'OPERATOR': data['OPERATOR'],
+                    'REMARK': data.get('REMARK', ''),
+                    'start_at': start_at,
+                    'finish_at': finish_at,
+                    'queue_pos': allocate(data['mesin']),
+                    **job_hours(start_at, finish_at, etc_h),
+                })
+            
+            if errors and not partial:
+                return bulk_error_response(errors)
+            
+            if rows:
+                # (mesin, queue_pos) is unique within the batch and maps the returned ids back to
+                # their rows; sort_by_parameter_order would make SQLite insert one row at a time
+                returned = db.session.execute(db.insert(Job).returning(Job.id, Job.mesin, Job.queue_pos), rows)
+                slots = {(mesin, queue_pos): job_id for job_id, mesin, queue_pos in returned}
+                ids = [slots[row['mesin'], row['queue_pos']] for row in rows]
+                bump_jobs_version(*{row['mesin'] for row in rows})
+                log_job_changes([
+                    ('insert', job_id, {field: row.get(field) for field in Job.SERIALIZED_FIELDS} | {'id': job_id})
+                    for job_id, row in zip(ids, rows)
+                ])
+                db.session.commit()
+                broker.publish('reload', {})
+        
+        if errors:
+            return bulk_error_response(errors, written=len(rows))
+        return jsonify({'success': True, 'message': f'{len(rows)} job berhasil ditambahkan', 'written': len(rows)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/jobs/bulk/update', methods=['POST'])
+def bulk_update_jobs():
+    """Update many jobs in one transaction
+    
+    Each item needs an "id" plus the fields to change. Same body formats and
+    ?partial=1 behaviour as /jobs/bulk.
+    """
+    try:
+        payload = read_bulk_payload()
+        partial = request.args.get('partial', type=int) == 1
+        ids = [data.get('id') for data in payload if data.get('id') is not None]
+        # A machine only gets a current job while it has none: hold the locks of every machine touched
+        locked = set(db.session.execute(select(Job.mesin).where(Job.id.in_(ids))).scalars())
+        locked.update(data['mesin'] for data in payload if isinstance(data.get('mesin'), str))
+        db.session.rollback()
+        with machine_locks(*locked):
+            jobs = {job.id: job for job in Job.query.filter(Job.id.in_(ids)).populate_existing()}
+            editable = JOB_REQUIRED_FIELDS + JOB_OPTIONAL_FIELDS
+            now = datetime.now()
+            allocate = queue_tail_allocator()
+            machine_names = registered_machine_names()
+            # Current job ids by machine, as the earlier rows of this batch leave them
+            current = {}
+            for job_id, mesin in db.session.execute(
+                select(Job.id, Job.mesin).where(Job.job_type == 'current', Job.mesin.in_(locked))
+            ):
+                current.setdefault(mesin, set()).add(job_id)
+            updated = []
+            machines = set()
+            errors = []
+            
+            for index, data in enumerate(payload):
+                job = jobs.get(data.get('id'))
+                if job is None:
+                    errors.append({'row': index, 'id': data.get('id'), 'errors': ['Job tidak ditemukan']})
+                    continue
+                if job.mesin not in locked:
+                    errors.append({'row': index, 'id': job.id, 'errors': ['Job sudah diselesaikan atau diubah dari terminal lain']})
+                    continue
+                
+                merged = {field: getattr(job, field) for field in editable}
+                merged.update({field: data[field] for field in editable if field in data})
+                row_errors = validate_job_data(merged, machine_names)
+                if not row_errors and merged['job_type'] == 'current' and current.get(merged['mesin'], set()) - {job.id}:
+                    row_errors.append(f"Mesin {merged['mesin']} sudah memiliki job current")
+                if row_errors:
+                    errors.append({'row': index, 'id': job.id, 'errors': row_errors})
+                    continue
+                
+                current.get(job.mesin, set()).discard(job.id)
+                if merged['job_type'] == 'current':
+                    current.setdefault(merged['mesin'], set()).add(job.id)
+                machines.update((job.mesin, merged['mesin']))
+                if merged['mesin'] != job.mesin:
+                    job.queue_pos = allocate(merged['mesin'])
+                for field in editable:
+                    setattr(job, field, merged[field])
+                job.ETC_H = str(job.ETC_H)
+                resolve_job_times(job, now)
+                resolve_job_hours(job)
+                updated.append(job)
+            
+            if errors and not partial:
+                db.session.rollback()
+                return bulk_error_response(errors)
+            
+            if updated:
+                bump_jobs_version(*machines)
+                log_job_changes([('update', job.id, job.to_dict()) for job in updated])
+                db.session.commit()
+                broker.publish('reload', {})
+        
+        if errors:
+            return bulk_error_response(errors, written=len(updated))
+        return jsonify({'success': True, 'message': f'{len(updated)} job berhasil diupdate', 'written': len(updated)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/jobs/bulk/finish', methods=['POST'])
+def bulk_finish_jobs():
+    """Finish many jobs in one transaction
+    
+    Body: a JSON array of job ids (or objects with an "id"), or a CSV/XLSX
+    upload with an ID column. Same ?partial=1 behaviour as /jobs/bulk.
+    """
+    try:
+        payload = read_bulk_payload()
+        partial = request.args.get('partial', type=int) == 1
+        ids = [item['id'] if isinstance(item, dict) else item for item in payload]
+        jobs = {job.id: job for job in Job.query.filter(Job.id.in_(ids))}
+        finished = []
+        errors = []
+        
+        for index, job_id in enumerate(ids):
+            job = jobs.pop(job_id, None)
+            if job is None:
+                errors.append({'row': index, 'id': job_id, 'errors': ['Job tidak ditemukan']})
+            elif not job.FINISH:
+                errors.append({'row': index, 'id': job_id, 'errors': ['FINISH time harus diisi sebelum menyelesaikan job']})
+            else:
+                finished.append(job)
+        
+        if errors and not partial:
+            return bulk_error_response(errors)
+        
+        if finished:
+            by_machine = {}
+            for job in finished:
+                by_machine.setdefault(job.mesin, []).append(job.id)
+            db.session.rollback()
+            with machine_locks(*by_machine):
+                history_jobs = []
+                changes = []
+                for mesin, job_ids in by_machine.items():
+                    moved, next_job = move_jobs_to_history(mesin, job_ids)
+                    history_jobs += moved
+                    changes += [('finish', job_id, history_job.to_dict()) for job_id, history_job in zip(job_ids, moved)]
+                    if next_job:
+                        changes.append(('promote', next_job.id, next_job.to_dict()))
+                # One upsert per (day, machine, operator), not per job
+                add_daily_stats(history_jobs)
+                bump_jobs_version(*by_machine)
+                bump_history_version(*by_machine)
+                log_job_changes(changes)
+                db.session.commit()
+            broker.publish('reload', {})
+        
+        if errors:
+            return bulk_error_response(errors, written=len(finished))
+        return jsonify({'success': True, 'message': f'{len(finished)} job berhasil diselesaikan', 'written': len(finished)})
+    except JobConflict as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/changes')
+def get_changes():
+    """Job changes after a sequence number, oldest first
+    
+    Query parameters: since (the last seq the caller applied, default 0),
+    limit and job_id. Each change carries the whole job after it (finish:
+    the History row it became), so applying one twice is harmless: a new
+    consumer reads last_seq, then a snapshot of the jobs, then the changes
+    since that seq. Read on with since=next_since while has_more. A since
+    behind the pruned part of the log answers 410 (resync from a snapshot).
+    """
+    try:
+        since = request.args.get('since', 0, type=int)
+        limit = request.args.get('limit', CHANGES_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, CHANGES_MAX_PAGE_SIZE))
+        job_id = request.args.get('job_id', type=int)
+        
+        pruned = get_version(CHANGES_PRUNED)
+        last_seq = db.session.execute(select(func.max(JobChange.seq))).scalar() or pruned
+        if since < pruned:
+            return jsonify({'error': f'Perubahan sampai seq {pruned} sudah dihapus, sinkronkan ulang',
+                            'pruned_seq': pruned, 'last_seq': last_seq}), 410
+        
+        query = select(JobChange.seq, JobChange.job_id, JobChange.kind, JobChange.changed_at, JobChange.data)
+        query = query.where(JobChange.seq > since)
+        if job_id is not None:
+            query = query.where(JobChange.job_id == job_id)
+        rows = db.session.execute(query.order_by(JobChange.seq).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        return jsonify(dashboard_data)
+        return Response(dumps({
+            'changes': [
+                {'seq': seq, 'job_id': row_job_id, 'kind': kind, 'changed_at': changed_at, 'data': loads(data)}
+                for seq, row_job_id, kind, changed_at, data in rows
+            ],
+            'next_since': rows[-1].seq if rows else since,
+            'has_more': has_more,
+            'last_seq': max(last_seq, rows[-1].seq if rows else 0),
+        }), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/history')
+def prune_job_changes(days, batch_size=CLEAR_BATCH_SIZE):
+    """Delete JobChange rows older than ``days``, in seq-ordered batches
+    
+    The highest deleted seq is kept as the CHANGES_PRUNED version, so
+    /changes can tell a consumer that fell behind it to resync. Returns the
+    number of rows deleted.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    horizon = db.session.execute(select(func.max(JobChange.seq)).where(JobChange.changed_at < cutoff)).scalar()
+    pruned = get_version(CHANGES_PRUNED)
+    deleted = 0
+    
+    while horizon is not None and pruned < horizon:
+        upto = db.session.execute(
+            select(JobChange.seq).where(JobChange.seq > pruned, JobChange.seq <= horizon)
+            .order_by(JobChange.seq).offset(batch_size - 1).limit(1)
+        ).scalar() or horizon
+        deleted += db.session.execute(delete(JobChange).where(JobChange.seq <= upto)).rowcount
+        db.session.merge(DataVersion(name=CHANGES_PRUNED, value=upto))
+        db.session.commit()
+        pruned = upto
+    return deleted
+
+def reset_job_changes():
+    """Empty the change log and mark all of it pruned
+    
+    For writes the log has no kind for (generate_dummy deleting every job):
+    every consumer then gets 410 from /changes and resyncs from a snapshot.
+    Call after bump_jobs_version() in the same transaction, as
+    log_job_changes().
+    """
+    # A placeholder takes the next seq, so the horizon is past every seq a consumer has read
+    log_job_changes([('reset', 0, {})])
+    horizon = db.session.execute(select(func.max(JobChange.seq))).scalar()
+    db.session.execute(delete(JobChange))
+    db.session.merge(DataVersion(name=CHANGES_PRUNED, value=horizon))
+
+@bp.route('/events')
+def events():
+    """Server-Sent Events stream of per-job dashboard deltas"""
+    subscriber = broker.subscribe()
+    response = Response(broker.stream(subscriber), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/history')
 def history_page():
     """History page"""
-    return render_template('history.html')
+    return render_page('history.html', 'history')
+
+def parse_date_arg(name, args=None):
+    """Parse an optional YYYY-MM-DD query parameter (of ``args``, default the request's)"""
+    value = (request.args if args is None else args).get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def filter_history(query, args=None):
+    """Apply the /history_data filters from the query string (or ``args``) to a History query"""
+    args = request.args if args is None else args
+    mesin = args.get('mesin')
+    operator = args.get('operator')
+    model = args.get('model')
+    part = args.get('part')
+    date_from = parse_date_arg('date_from', args)
+    date_to = parse_date_arg('date_to', args)
+    
+    if mesin:
+        query = query.filter(History.mesin == mesin)
+    if operator:
+        query = query.filter(History.OPERATOR == operator)
+    if model:
+        query = query.filter(History.MODEL.ilike(f'%{model}%'))
+    if part:
+        query = query.filter(History.PART.ilike(f'%{part}%'))
+    
+    if date_from:
+        query = query.filter(History.finish_at >= date_from)
+    if date_to:
+        query = query.filter(History.finish_at < date_to + timedelta(days=1))
+    
+    return query
+
+def history_totals(query):
+    """(count, achievement sum, on-target count, target hours) of a History query, in SQL"""
+    total, achievement_sum, on_target, total_target_hours = query.with_entities(
+        func.count(History.id),
+        func.sum(History.ACHIEVEMENT),
+        func.sum(case((History.ACHIEVEMENT >= 100, 1), else_=0)),
+        func.sum(History.target_h),
+    ).one()
+    return total, achievement_sum or 0.0, on_target or 0, total_target_hours or 0.0
+
+def format_summary(total, achievement_sum, on_target, total_target_hours):
+    return {
+        'total': total,
+        'avg_achievement': round(achievement_sum / total, 1) if total else 0.0,
+        'on_target': on_target,
+        'total_target_hours': round(total_target_hours, 1),
+    }
 
-@app.route('/history_data')
+def history_summary(query, segments=()):
+    """Totals and averages for a filtered History query (computed in SQL), plus archived segments"""
+    totals = history_totals(query)
+    if segments:
+        archived = archived_totals(filter_archived_history(read_archived_history(segments)))
+        totals = [a + b for a, b in zip(totals, archived)]
+    return format_summary(*totals)
+
+def filter_daily_stats(query):
+    """Apply the mesin/operator/date filters from the query string to a DailyStats query"""
+    mesin = request.args.get('mesin')
+    operator = request.args.get('operator')
+    date_from = parse_date_arg('date_from')
+    date_to = parse_date_arg('date_to')
+    
+    if mesin:
+        query = query.filter(DailyStats.mesin == mesin)
+    if operator:
+        query = query.filter(DailyStats.operator == operator)
+    if date_from:
+        query = query.filter(DailyStats.date >= date_from.date())
+    if date_to:
+        query = query.filter(DailyStats.date <= date_to.date())
+    
+    return query
+
+def daily_stats_summary():
+    """The /history_data summary read from DailyStats, or None if the filters need History
+    
+    MODEL and PART are not rolled up. Rows without finish_at are not in the
+    rollup either, so when no date range is given they are added from History.
+    """
+    if request.args.get('model') or request.args.get('part'):
+        return None
+    
+    total, achievement_sum, on_target, total_target_hours = filter_daily_stats(DailyStats.query).with_entities(
+        func.coalesce(func.sum(DailyStats.jobs), 0),
+        func.coalesce(func.sum(DailyStats.achievement_sum), 0.0),
+        func.coalesce(func.sum(DailyStats.on_target), 0),
+        func.coalesce(func.sum(DailyStats.target_hours), 0.0),
+    ).one()
+    
+    if not request.args.get('date_from') and not request.args.get('date_to'):
+        undated = history_totals(filter_history(History.query).filter(History.finish_at.is_(None)))
+        total += undated[0]
+        achievement_sum += undated[1]
+        on_target += undated[2]
+        total_target_hours += undated[3]
+    
+    return format_summary(total, achievement_sum, on_target, total_target_hours)
+
+# History archive
+def history_archive():
+    return current_app.extensions['history_archive']
+
+def batched(rows, size):
+    """Lists of up to ``size`` items of an iterable"""
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+def archive_cutoff(months, now=None):
+    """First day of the month ``months`` months before now: older history is archived"""
+    now = now or datetime.now()
+    index = now.year * 12 + now.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def archive_history(months, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    """Move History rows finished before archive_cutoff(months) to the archive
+    
+    Works in id-ordered batches, one transaction each: the rows are appended
+    to their month's segment, the segment's committed size is updated and the
+    rows are deleted, so the hot table shrinks without long write locks.
+    DailyStats is kept, so summaries and /daily_stats still cover archived
+    days. Rows without finish_at are never archived. Returns the row count;
+    ``progress(rows archived, total)`` is called after every batch.
+    """
+    archive = history_archive()
+    cutoff = archive_cutoff(months)
+    archived = 0
+    total = db.session.scalar(select(func.count(History.id)).where(History.finish_at < cutoff)) if progress else None
+    
+    while True:
+        # Taken first: the lock on the version row serializes concurrent archive runs
+        bump_version('history')
+        rows = db.session.execute(
+            select(*History.serialized_columns())
+            .where(History.finish_at < cutoff)
+            .order_by(History.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            db.session.rollback()
+            break
+        
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row.finish_at.strftime('%Y-%m'), []).append(row)
+        try:
+            for month, month_rows in by_month.items():
+                segment = db.session.get(ArchiveSegment, month) or ArchiveSegment(month=month, rows=0, size=0)
+                segment.size = archive.append(month, segment.size, [row._asdict() for row in month_rows])
+                segment.rows += len(month_rows)
+                first, last = month_rows[0].id, month_rows[-1].id
+                segment.min_id = first if segment.min_id is None else min(segment.min_id, first)
+                segment.max_id = last if segment.max_id is None else max(segment.max_id, last)
+                segment.updated_at = datetime.now()
+                db.session.add(segment)
+            
+            db.session.execute(delete(History).where(History.id.in_([row.id for row in rows])))
+            bump_machine_versions(Machine.history_version, {row.mesin for row in rows})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        archived += len(rows)
+        if progress:
+            progress(archived, total)
+        yield_write_lock()
+    
+    return archived
+
+def archived_segments(date_from=None, date_to=None):
+    """ArchiveSegments whose month overlaps a finish_at range (all without one)"""
+    query = ArchiveSegment.query.filter(ArchiveSegment.size > 0)
+    if date_from:
+        query = query.filter(ArchiveSegment.month >= date_from.strftime('%Y-%m'))
+    if date_to:
+        query = query.filter(ArchiveSegment.month <= date_to.strftime('%Y-%m'))
+    return query.order_by(ArchiveSegment.month).all()
+
+def requested_archived_segments(args=None):
+    """ArchiveSegments that the /history_data date filters reach into"""
+    return archived_segments(parse_date_arg('date_from', args), parse_date_arg('date_to', args))
+
+def read_archived_history(segments):
+    """Archived rows (namedtuples of History.SERIALIZED_FIELDS) of some segments
+    
+    Rows archived before duration_h/target_h existed get them (and their
+    ACHIEVEMENT) computed here.
+    """
+    archive = history_archive()
+    for segment in segments:
+        for row in archive.read(segment.month, segment.size):
+            if row.target_h is None and row.ETC_H:
+                row = row._replace(**job_hours(row.start_at, row.finish_at, row.ETC_H))
+            yield row
+
+def filter_archived_history(rows, args=None):
+    """Apply the /history_data filters to archived rows (as filter_history does)"""
+    args = request.args if args is None else args
+    mesin = args.get('mesin')
+    operator = args.get('operator')
+    model = (args.get('model') or '').lower()
+    part = (args.get('part') or '').lower()
+    date_from = parse_date_arg('date_from', args)
+    date_to = parse_date_arg('date_to', args)
+    date_to = date_to + timedelta(days=1) if date_to else None
+    
+    for row in rows:
+        if mesin and row.mesin != mesin:
+            continue
+        if operator and row.OPERATOR != operator:
+            continue
+        if model and model not in (row.MODEL or '').lower():
+            continue
+        if part and part not in (row.PART or '').lower():
+            continue
+        if date_from and row.finish_at < date_from:
+            continue
+        if date_to and row.finish_at >= date_to:
+            continue
+        yield row
+
+def archived_totals(rows):
+    """history_totals() of archived rows"""
+    total = on_target = 0
+    achievement_sum = target_hours = 0.0
+    for row in rows:
+        achievement = row.ACHIEVEMENT or 0.0
+        total += 1
+        achievement_sum += achievement
+        on_target += achievement >= 100
+        target_hours += row.target_h or 0.0
+    return total, achievement_sum, on_target, target_hours
+
+def merge_archived_page(rows, segments, cursor, limit):
+    """Merge archived rows into a /history_data page of History rows (id descending, limit + 1)
+    
+    Archived rows with an id below the last row of a full page cannot be on
+    it, so segments entirely below it are not read.
+    """
+    floor = rows[-1][0] if len(rows) > limit else 0
+    segments = [
+        segment for segment in segments
+        if segment.max_id > floor and (not cursor or segment.min_id < cursor)
+    ]
+    if not segments:
+        return rows
+    archived = (
+        tuple(row) for row in filter_archived_history(read_archived_history(segments))
+        if row.id > floor and (not cursor or row.id < cursor)
+    )
+    return heapq.nlargest(limit + 1, itertools.chain(rows, archived), key=lambda row: row[0])
+
+def clear_archive():
+    """Delete every ArchiveSegment row; returns the months whose files to remove after the commit"""
+    months = db.session.execute(select(ArchiveSegment.month)).scalars().all()
+    db.session.execute(delete(ArchiveSegment))
+    return months
+
+def remove_archive_files(months):
+    archive = history_archive()
+    for month in months:
+        archive.remove(month)
+
+@bp.route('/history_data')
 def get_history_data():
-    """Get all history data"""
+    """Get a page of history data, newest first
+    
+    Query parameters: limit, cursor (id of the last row of the previous page),
+    mesin, operator, model, part, date_from and date_to (YYYY-MM-DD), and
+    format=columnar to get the jobs as {"columns": [...], "rows": [[...]]}.
+    Archived history is included where the date range reaches into it.
+    The summary is only computed for the first page.
+    """
     try:
-        history_jobs = History.query.all()
-        return jsonify([job.to_dict() for job in history_jobs])
+        limit = request.args.get('limit', HISTORY_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        cursor = request.args.get('cursor', type=int)
+        
+        fmt = requested_format()
+        if fmt is None:
+            return format_error()
+        
+        def page():
+            query = filter_history(History.query)
+            
+            page_query = query
+            if cursor:
+                page_query = page_query.filter(History.id < cursor)
+            rows = project_rows(page_query.order_by(History.id.desc()).limit(limit + 1), History)
+            # Archived months the date range reaches into continue the list
+            segments = requested_archived_segments()
+            if segments:
+                rows = merge_archived_page(rows, segments, cursor, limit)
+            
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            return {
+                'jobs': serialize_rows(History.SERIALIZED_FIELDS, rows, fmt),
+                'next_cursor': rows[-1][0] if has_more else None,  # id
+                'summary': None if cursor else (daily_stats_summary() or history_summary(query, segments)),
+            }
+        
+        # A machine filter only depends on that machine's history
+        mesin = request.args.get('mesin')
+        scope = machine_cache_scope(mesin, Machine.history_version) if mesin else f"all.{get_version('history')}"
+        key = f'{scope}:{urlencode(sorted(request.args.items(multi=True)))}' if scope else None
+        return cached_json('history', key, page)
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/clear_history', methods=['DELETE'])
-def clear_history():
-    """Clear all history"""
+def load_history_frame(query, segments=()):
+    """Load the rows of a filtered History query (plus archived segments) into a HistoryFrame, in batches"""
+    # Hours are the stored numeric columns; finish_at is read as ISO text (NumPy parses
+    # that far faster than datetime objects) and the statement runs on the Core
+    # connection, skipping ORM row processing
+    rows = db.session.connection().execute(
+        query.with_entities(History.mesin, History.OPERATOR, History.MODEL, History.target_h,
+                            History.duration_h, cast(History.finish_at, db.String))
+        .statement.execution_options(yield_per=ANALYTICS_BATCH_SIZE)
+    )
+    archived = (
+        (row.mesin, row.OPERATOR, row.MODEL, row.target_h, row.duration_h, row.finish_at)
+        for row in filter_archived_history(read_archived_history(segments))
+    )
+    return HistoryFrame.from_batches(itertools.chain(rows.partitions(), batched(archived, ANALYTICS_BATCH_SIZE)))
+
+def cached_history_frame():
+    """HistoryFrame for the current /history_data filters, reused until history changes"""
+    version = get_version('history')
+    cache = current_app.extensions.setdefault('analytics_cache', {'version': None, 'frames': OrderedDict()})
+    if cache['version'] != version:
+        cache['frames'].clear()
+        cache['version'] = version
+
+    key = tuple(request.args.get(name) for name in ('mesin', 'operator', 'model', 'part', 'date_from', 'date_to'))
+    frame = cache['frames'].get(key)
+    if frame is None:
+        frame = load_history_frame(filter_history(History.query), requested_archived_segments())
+        cache['frames'][key] = frame
+        if len(cache['frames']) > ANALYTICS_CACHE_SIZE:
+            cache['frames'].popitem(last=False)
+    else:
+        cache['frames'].move_to_end(key)
+    return version, frame
+
+@bp.route('/analytics')
+def get_analytics():
+    """Achievement, duration, overrun and utilisation KPIs over history
+
+    Query parameters: group_by (comma separated: mesin, operator, model, day;
+    default mesin) plus the /history_data filters.
+    """
     try:
-        History.query.delete()
+        group_by = tuple(name for name in request.args.get('group_by', 'mesin').split(',') if name)
+        unknown = [name for name in group_by if name not in DIMENSIONS]
+        if unknown:
+            return jsonify({'error': f"group_by tidak dikenal: {', '.join(unknown)}"}), 400
+
+        version, frame = cached_history_frame()
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        summary = frame.report((), date_from, date_to)
+
+        return jsonify({
+            'version': version,
+            'group_by': list(group_by),
+            'summary': summary[0] if summary else None,
+            'groups': frame.report(group_by, date_from, date_to),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+# Grouping columns accepted by /daily_stats
+DAILY_STATS_DIMENSIONS = ('date', 'mesin', 'operator')
+
+@bp.route('/daily_stats')
+def get_daily_stats():
+    """KPIs from the DailyStats rollup
+    
+    Query parameters: group_by (comma separated: date, mesin, operator;
+    default date), mesin, operator, date_from and date_to (YYYY-MM-DD).
+    """
+    try:
+        group_by = [name for name in request.args.get('group_by', 'date').split(',') if name]
+        unknown = [name for name in group_by if name not in DAILY_STATS_DIMENSIONS]
+        if unknown:
+            return jsonify({'error': f"group_by tidak dikenal: {', '.join(unknown)}"}), 400
+        
+        keys = [getattr(DailyStats, name) for name in group_by]
+        sums = [func.sum(getattr(DailyStats, name)).label(name) for name in DAILY_STATS_COUNTERS]
+        rows = filter_daily_stats(db.session.query(*keys, *sums)).group_by(*keys).order_by(*keys).all()
+        
+        stats = []
+        for row in rows:
+            item = {name: getattr(row, name) for name in group_by}
+            if 'date' in item:
+                item['date'] = item['date'].isoformat()
+            item.update({
+                'jobs': int(row.jobs),
+                'avg_achievement': round(row.achievement_sum / row.jobs, 1) if row.jobs else 0.0,
+                'on_target': int(row.on_target),
+                'measured': int(row.measured),
+                'actual_hours': round(row.actual_hours, 2),
+                'target_hours': round(row.target_hours, 2),
+                'overrun_hours': round(row.overrun_hours, 2),
+                'histogram': {column: int(getattr(row, column)) for column, _ in ACHIEVEMENT_BUCKETS},
+            })
+            stats.append(item)
+        
+        return jsonify({'group_by': group_by, 'stats': stats})
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+# Queued job columns read for /forecast, and the job fields it returns
+FORECAST_JOB_COLUMNS = ('id', 'job_type', 'MODEL', 'PART', 'OPERATOR', 'ETC_H', 'target_h', 'start_at')
+FORECAST_FIELDS = (
+    'id', 'job_type', 'MODEL', 'PART', 'OPERATOR', 'ETC_H', 'target_h',
+    'factor', 'expected_h', 'start', 'finish', 'remaining_h', 'overdue',
+)
+QueuedJob = namedtuple('QueuedJob', FORECAST_JOB_COLUMNS)
+
+def overrun_rows(after_id=0):
+    """OverrunFactors sums per (MODEL, PART, OPERATOR) of History rows past an id, and the highest id read"""
+    timed = and_(History.duration_h.isnot(None), History.duration_h >= 0)
+    measured = and_(timed, History.target_h > 0)
+    # Actual hours clamped to MIN_FACTOR..MAX_FACTOR x target, per job
+    actual = case(
+        (History.duration_h > History.target_h * MAX_FACTOR, History.target_h * MAX_FACTOR),
+        (History.duration_h < History.target_h * MIN_FACTOR, History.target_h * MIN_FACTOR),
+        else_=History.duration_h,
+    )
+    rows = db.session.execute(
+        select(History.MODEL, History.PART, History.OPERATOR,
+               func.sum(case((measured, 1), else_=0)),
+               func.sum(case((measured, actual), else_=0.0)),
+               func.sum(case((measured, History.target_h), else_=0.0)),
+               func.sum(case((timed, 1), else_=0)),
+               func.sum(case((timed, History.duration_h), else_=0.0)),
+               func.max(History.id))
+        .where(History.id > after_id)
+        .group_by(History.MODEL, History.PART, History.OPERATOR)
+    ).all()
+    return [tuple(row[:8]) for row in rows], max((row[8] for row in rows), default=after_id)
+
+def overrun_factors():
+    """(generation, OverrunFactors) over History, kept per app
+    
+    History rows finished since the last call (a higher id) are added as
+    they come; once FORECAST_FACTORS_TTL seconds have passed, a change is
+    answered with a full re-read instead, which also drops cleared, archived
+    and recomputed rows. ``generation`` changes with the factors.
+    """
+    version = get_version('history')
+    cache = current_app.extensions.setdefault('forecast_factors', {
+        'lock': threading.Lock(), 'version': None, 'factors': None, 'max_id': 0, 'built_at': 0.0, 'generation': 0,
+    })
+    with cache['lock']:
+        if cache['version'] != version:
+            if cache['factors'] is None or time.monotonic() - cache['built_at'] >= current_app.config['FORECAST_FACTORS_TTL']:
+                rows, cache['max_id'] = overrun_rows()
+                factors = OverrunFactors()
+                factors.add(rows)
+                cache['factors'] = factors
+                cache['built_at'] = time.monotonic()
+                cache['generation'] += 1
+            else:
+                rows, cache['max_id'] = overrun_rows(cache['max_id'])
+                if rows:
+                    # Readers may still hold the old object
+                    factors = cache['factors'].copy()
+                    factors.add(rows)
+                    cache['factors'] = factors
+                    cache['generation'] += 1
+            cache['version'] = version
+        return cache['generation'], cache['factors']
+
+def queue_plans(names):
+    """Queued jobs of some machines (current job first), as {name: plan}
+    
+    Plans are kept per app and re-read only for the machines whose
+    Machine.jobs_version changed, in one query.
+    """
+    # The registry is small: reading all of it beats binding hundreds of names
+    versions = dict(db.session.execute(select(Machine.name, Machine.jobs_version)).all())
+    cache = current_app.extensions.setdefault('forecast_plans', {})
+    stale = [name for name in names if name not in cache or cache[name]['version'] != versions.get(name)]
+    if stale:
+        jobs = {name: [] for name in stale}
+        rows = db.session.execute(
+            select(Job.mesin, *[getattr(Job, column) for column in FORECAST_JOB_COLUMNS])
+            .where(Job.mesin.in_(stale), Job.job_type.in_(['current', 'next']))
+            .order_by(Job.mesin, Job.queue_pos, Job.id)
+        )
+        for mesin, *values in rows:
+            queue = jobs[mesin]
+            row = QueuedJob._make(values)
+            if row.job_type == 'next':
+                queue.append(row)
+            elif not queue or queue[0].job_type != 'current':
+                # Only the first current job runs, as on the dashboard
+                queue.insert(0, row)
+        for name in stale:
+            queue = jobs[name]
+            cache[name] = {
+                'version': versions.get(name),
+                'jobs': queue,
+                'current': np.array([row.job_type == 'current' for row in queue], dtype=bool),
+                'started': to_seconds([row.start_at if row.job_type == 'current' else None for row in queue]),
+                'generation': None,
+            }
+    return {name: cache[name] for name in names}
+
+def build_forecast(names, now, fmt=None):
+    """Projected start and finish of the queued jobs of some machines (see /forecast)"""
+    generation, factors = overrun_factors()
+    plans = queue_plans(names)
+    for plan in plans.values():
+        if plan['generation'] != generation:
+            expected = [factors.expected(row.MODEL, row.PART, row.OPERATOR, row.target_h) for row in plan['jobs']]
+            plan['hours'] = np.array([np.nan if hours is None else hours for hours, _ in expected], dtype=float)
+            # The fields that only change with the queue or the factors, as plain Python values
+            plan['fields'] = [
+                (row.id, row.job_type, row.MODEL, row.PART, row.OPERATOR, row.ETC_H, row.target_h,
+                 None if factor is None else round(factor, 3), None if hours is None else round(hours, 2))
+                for row, (hours, factor) in zip(plan['jobs'], expected)
+            ]
+            plan['generation'] = generation
+    
+    counts = [len(plan['jobs']) for plan in plans.values()]
+    start, finish, remaining, overdue = project_queues(
+        current_app.extensions['shift_calendar'],
+        to_seconds([now])[0],
+        np.repeat(np.arange(len(counts)), counts),
+        np.concatenate([plan['current'] for plan in plans.values()] or [np.empty(0, dtype=bool)]),
+        np.concatenate([plan['started'] for plan in plans.values()] or [np.empty(0)]),
+        np.concatenate([plan['hours'] for plan in plans.values()] or [np.empty(0)]),
+    )
+    start, finish = to_datetimes(start), to_datetimes(finish)
+    remaining = np.round(remaining, 2).tolist()
+    overdue = overdue.tolist()
+    
+    machines = {}
+    offset = 0
+    for (name, plan), count in zip(plans.items(), counts):
+        end = offset + count
+        rows = [
+            fields + projected
+            for fields, projected in zip(plan['fields'], zip(start[offset:end], finish[offset:end],
+                                                             remaining[offset:end], overdue[offset:end]))
+        ]
+        machines[name] = {
+            'finish': finish[end - 1] if count else None,
+            'remaining_h': remaining[end - 1] if count else 0.0,
+            'jobs': rows if fmt == COLUMNAR else [dict(zip(FORECAST_FIELDS, row)) for row in rows],
+        }
+        offset = end
+    
+    forecast = {
+        'generated_at': now.replace(microsecond=0),
+        'calendar': current_app.extensions['shift_calendar'].to_dict(),
+        'history_jobs': factors.jobs,
+        'machines': machines,
+    }
+    if fmt == COLUMNAR:
+        forecast['columns'] = list(FORECAST_FIELDS)
+    return forecast
+
+@bp.route('/forecast')
+def get_forecast():
+    """Projected start and finish of every queued job
+    
+    Query parameters: hall, line or mesin (default every machine) and
+    format (records / columnar). Expected hours are ETC_H times the overrun
+    factor of the job's MODEL/PART and operator, laid onto the shift
+    calendar (FORECAST_SHIFTS / FORECAST_WORKDAYS).
+    """
+    try:
+        fmt = requested_format()
+        if fmt is None:
+            return format_error()
+        mesin = request.args.get('mesin')
+        if mesin:
+            machine_error = unregistered_machine_error(mesin)
+            if machine_error:
+                return jsonify({'error': machine_error}), 400
+            names = [mesin]
+        else:
+            names = [machine['name'] for machine in scoped_machines(request.args.get('hall'), request.args.get('line'))]
+        
+        return Response(dumps(build_forecast(names, datetime.now(), fmt)), mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+def search_index_enabled():
+    """Whether /search runs on the FTS5 indexes (set up by init_db)"""
+    return current_app.extensions.get('search_index', False)
+
+def search_query(model, terms, field=None, args=None):
+    """ORM query over the rows of model matching all terms, with its key and rank columns
+    
+    History is also narrowed by the /history_data filters, jobs by mesin. The
+    key is the row id (the FTS rowid, so newest-first runs in index order);
+    the rank is bm25, lower is a better match (None without FTS5, where terms
+    are matched with ILIKE).
+    """
+    args = request.args if args is None else args
+    if model is History:
+        query = filter_history(History.query, args)
+    else:
+        query = Job.query
+        if args.get('mesin'):
+            query = query.filter(Job.mesin == args.get('mesin'))
+    
+    if search_index_enabled():
+        index = index_table(model.__tablename__)
+        query = query.join(index, index.c.rowid == model.id).filter(
+            index.c[index.name].op('MATCH')(match_expression(terms, field))
+        )
+        return query, index.c.rowid, index.c.rank
+    
+    # Every term must occur in one of the searched columns
+    fields = [field] if field else SEARCH_FIELDS
+    for term in terms:
+        query = query.filter(or_(*[getattr(model, name).ilike(f'%{term}%') for name in fields]))
+    return query, model.id, null()
+
+def search_results(model, terms, field, sort, limit):
+    """The first ``limit`` matches of a model as result dicts (with source and rank)
+    
+    sort=rank orders the newest SEARCH_RANK_WINDOW matches by rank and goes on
+    with the older matches newest first (with rank None): ranking every match
+    of a common term costs time in proportion to the number of matches.
+    """
+    query, key, rank = search_query(model, terms, field)
+    connection = db.session.connection()
+    if sort == 'recent' or not search_index_enabled():
+        # bm25 counts the matches of every term, so it is only computed when ranking
+        newest = query.with_entities(key, null()).order_by(key.desc())
+        hits = connection.execute(newest.limit(limit).statement).all()
+    else:
+        newest = query.with_entities(key, rank).order_by(key.desc())
+        window = connection.execute(newest.limit(SEARCH_RANK_WINDOW).statement).all()
+        hits = sorted(window, key=lambda hit: (hit[1], -hit[0]))[:limit]
+        if len(hits) < limit and len(window) == SEARCH_RANK_WINDOW:
+            older = query.with_entities(key, null()).filter(key < window[-1][0]).order_by(key.desc())
+            hits += connection.execute(older.limit(limit - len(hits)).statement).all()
+    
+    # Only the rows of the page are read from the table
+    rows = connection.execute(select(*model.serialized_columns()).where(model.id.in_([hit[0] for hit in hits])))
+    rows = {row[0]: row for row in rows}  # id
+    source = model.__tablename__
+    results = []
+    for row_id, row_rank in hits:
+        if row_id not in rows:
+            continue  # deleted since the index was read
+        result = dict(zip(model.SERIALIZED_FIELDS, rows[row_id]))
+        result['source'] = source
+        result['rank'] = row_rank
+        results.append(result)
+    return results
+
+@bp.route('/search')
+def search():
+    """Full-text search over REMARK, MODEL, PART and OPERATOR
+    
+    Query parameters: q (all terms must match, the last one as a prefix), scope
+    (history, jobs or all; default history), field (remark, model, part or
+    operator to search a single column), sort (rank or recent), limit and
+    offset, plus the /history_data filters for history. Results carry their
+    source table and, for sort=rank, their bm25 rank (null past the ranked window). Archived history is not
+    searched.
+    """
+    try:
+        terms = search_terms(request.args.get('q'))
+        if not terms:
+            return jsonify({'error': 'q wajib diisi'}), 400
+        scope = request.args.get('scope', 'history')
+        sort = request.args.get('sort', 'rank')
+        field = (request.args.get('field') or '').upper() or None
+        if scope not in SEARCH_SCOPES:
+            return jsonify({'error': f"scope tidak dikenal: {scope} (pilih {' / '.join(SEARCH_SCOPES)})"}), 400
+        if sort not in SEARCH_SORTS:
+            return jsonify({'error': f"sort tidak dikenal: {sort} (pilih {' / '.join(SEARCH_SORTS)})"}), 400
+        if field and field not in SEARCH_FIELDS:
+            return jsonify({'error': f"field tidak dikenal: {field.lower()} (pilih {' / '.join(SEARCH_FIELDS).lower()})"}), 400
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), SEARCH_MAX_PAGE_SIZE))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        
+        def page():
+            models = {'history': [History], 'jobs': [Job], 'all': [Job, History]}[scope]
+            # One extra row tells whether there is a next page
+            per_model = [search_results(model, terms, field, sort, offset + limit + 1) for model in models]
+            if sort == 'recent':
+                # Queued jobs come before the (finished) history
+                results = list(itertools.chain(*per_model))
+            else:
+                # Ranked matches of both tables by rank, then the unranked ones (stable: jobs first)
+                results = sorted(itertools.chain(*per_model),
+                                 key=lambda result: (result['rank'] is None, result['rank'] or 0))
+            results = results[offset:offset + limit + 1]
+            return {
+                'results': results[:limit],
+                'next_offset': offset + limit if len(results) > limit else None,
+            }
+        
+        versions = get_versions('jobs', 'history')
+        key = f"{versions['jobs']}.{versions['history']}:{urlencode(sorted(request.args.items(multi=True)))}"
+        return cached_json('search', key, page)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+def clear_history_chunked(batch_size=CLEAR_BATCH_SIZE, progress=None):
+    """Delete all History, its rollup and the archive; returns the History rows deleted
+    
+    Rows are deleted in id-ordered chunks of one transaction each, pausing
+    between chunks so finish_job and other writers get the lock. Only rows
+    that exist when it starts are deleted: jobs finished meanwhile stay,
+    together with their rollup rows.
+    """
+    # The version bump takes the write lock first, so nothing is finished between these statements
+    bump_history_version()
+    last_id, total = db.session.execute(select(func.max(History.id), func.count(History.id))).one()
+    db.session.execute(delete(DailyStats))
+    months = clear_archive()
+    db.session.commit()
+    remove_archive_files(months)
+    
+    deleted = 0
+    while last_id:
+        bump_history_version()
+        upper = db.session.scalar(
+            select(History.id).where(History.id <= last_id).order_by(History.id).offset(batch_size - 1).limit(1)
+        ) or last_id
+        deleted += db.session.execute(delete(History).where(History.id <= upper)).rowcount
         db.session.commit()
-        return jsonify({'success': True, 'message': 'History berhasil dihapus'})
+        if progress:
+            progress(deleted, total)
+        if upper == last_id:
+            break
+        yield_write_lock()
+    return deleted
+
+@bp.route('/clear_history', methods=['DELETE'])
+def clear_history():
+    """Clear all history, archived history included, as a background task"""
+    try:
+        task = start_task('clear_history')
+        if task['status'] == 'failed':
+            return jsonify({'success': False, 'message': f"Error: {task['error']}", 'task': task})
+        if task['status'] == 'done':
+            return jsonify({'success': True, 'message': 'History berhasil dihapus', 'task': task})
+        return jsonify({'success': True, 'message': 'Penghapusan history berjalan di latar belakang', 'task': task}), 202
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
-@app.route('/export_excel/jobs')
+def export_rows(model, query, segments=(), args=None):
+    """EXPORT_COLUMNS rows of a Job/History query, after those of archived segments (filtered by ``args``)"""
+    rows = (
+        query.with_entities(*[getattr(model, name) for name in EXPORT_COLUMNS])
+        .order_by(model.id)
+        .yield_per(EXPORT_CHUNK_SIZE)
+    )
+    if segments:
+        archived = (
+            [getattr(row, name) for name in EXPORT_COLUMNS]
+            for row in filter_archived_history(read_archived_history(segments), args)
+        )
+        rows = itertools.chain(archived, rows)
+    return rows
+
+def export_body(model, rows, fmt):
+    """(encoded chunks, mimetype) of export rows as CSV or XLSX"""
+    if fmt == 'csv':
+        return iter_csv(EXPORT_HEADERS, rows), 'text/csv'
+    return (iter_xlsx(EXPORT_HEADERS, rows, sheet_name=model.__name__),
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+def export_response(model, query, fmt, filename, segments=()):
+    """Stream the rows of a Job/History query (after those of archived segments) as CSV or XLSX"""
+    body, mimetype = export_body(model, export_rows(model, query, segments), fmt)
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
+
+@bp.route('/export_excel/jobs')
 def export_jobs_excel():
     """Export jobs to Excel"""
     try:
-        jobs = Job.query.all()
-        
-        # Create workbook
-        wb = xlwt.Workbook()
-        ws = wb.add_sheet('Jobs')
-        
-        # Headers
-        headers = ['ID', 'Mesin', 'Job Type', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH', 'ETC_H', 'OPERATOR', 'ACHIEVEMENT', 'REMARK']
-        for col, header in enumerate(headers):
-            ws.write(0, col, header)
-        
-        # Data
-        for row, job in enumerate(jobs, 1):
-            ws.write(row, 0, job.id)
-            ws.write(row, 1, job.mesin)
-            ws.write(row, 2, job.job_type)
-            ws.write(row, 3, job.MODEL)
-            ws.write(row, 4, job.PART)
-            ws.write(row, 5, job.SIZE)
-            ws.write(row, 6, job.START or '')
-            ws.write(row, 7, job.FINISH or '')
-            ws.write(row, 8, job.ETC_H)
-            ws.write(row, 9, job.OPERATOR)
-            ws.write(row, 10, job.ACHIEVEMENT)
-            ws.write(row, 11, job.REMARK or '')
-        
-        # Save to memory
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.ms-excel',
-            as_attachment=True,
-            download_name='cnc_jobs.xls'
-        )
+        return export_response(Job, Job.query, 'xlsx', 'cnc_jobs')
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/export_excel/history')
+@bp.route('/export_excel/history')
 def export_history_excel():
-    """Export history to Excel"""
+    """Export history to Excel (accepts the /history_data filters, includes archived history)"""
     try:
-        history_jobs = History.query.all()
-        
-        # Create workbook
-        wb = xlwt.Workbook()
-        ws = wb.add_sheet('History')
-        
-        # Headers
-        headers = ['ID', 'Mesin', 'Job Type', 'MODEL', 'PART', 'SIZE', 'START', 'FINISH', 'ETC_H', 'OPERATOR', 'ACHIEVEMENT', 'REMARK']
-        for col, header in enumerate(headers):
-            ws.write(0, col, header)
-        
-        # Data
-        for row, job in enumerate(history_jobs, 1):
-            ws.write(row, 0, job.id)
-            ws.write(row, 1, job.mesin)
-            ws.write(row, 2, job.job_type)
-            ws.write(row, 3, job.MODEL)
-            ws.write(row, 4, job.PART)
-            ws.write(row, 5, job.SIZE)
-            ws.write(row, 6, job.START or '')
-            ws.write(row, 7, job.FINISH or '')
-            ws.write(row, 8, job.ETC_H)
-            ws.write(row, 9, job.OPERATOR)
-            ws.write(row, 10, job.ACHIEVEMENT)
-            ws.write(row, 11, job.REMARK or '')
-        
-        # Save to memory
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.ms-excel',
-            as_attachment=True,
-            download_name='cnc_history.xls'
-        )
+        return export_response(History, filter_history(History.query), 'xlsx', 'cnc_history', requested_archived_segments())
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@bp.route('/export_csv/jobs')
+def export_jobs_csv():
+    """Export jobs to CSV"""
+    try:
+        return export_response(Job, Job.query, 'csv', 'cnc_jobs')
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@bp.route('/export_csv/history')
+def export_history_csv():
+    """Export history to CSV (accepts the /history_data filters, includes archived history)"""
+    try:
+        return export_response(History, filter_history(History.query), 'csv', 'cnc_history', requested_archived_segments())
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+# Background tasks
+def yield_write_lock():
+    """Pause between the chunks of a write task so waiting writers get the database lock"""
+    time.sleep(current_app.config['TASK_PAUSE_MS'] / 1000)
+
+def task_params(task):
+    return loads(task.params) if task.params else {}
+
+def export_path(task_id, fmt):
+    return os.path.join(current_app.config['EXPORT_DIR'], f'history-task-{task_id}.{fmt}')
+
+def clear_history_task(task, progress):
+    return {'deleted': clear_history_chunked(progress=progress)}
+
+def archive_history_task(task, progress):
+    params = task_params(task)
+    months = int(params.get('months', current_app.config['ARCHIVE_AFTER_MONTHS']))
+    return {'archived': archive_history(months, int(params.get('batch_size', ARCHIVE_BATCH_SIZE)), progress)}
+
+def rebuild_rollups_task(task, progress):
+    return {'rollup_rows': rebuild_daily_stats(progress=progress)}
+
+def export_history_task(task, progress):
+    """Write a history export (params: format csv/xlsx, filters as for /history_data) to EXPORT_DIR"""
+    params = task_params(task)
+    fmt = params.get('format', 'csv')
+    if fmt not in ('csv', 'xlsx'):
+        raise ValueError(f'format tidak dikenal: {fmt}')
+    filters = params.get('filters') or {}
+    rows = export_rows(History, filter_history(History.query, filters), requested_archived_segments(filters), filters)
+    written = 0
+    
+    def counted(rows):
+        nonlocal written
+        for written, row in enumerate(rows, 1):
+            if written % EXPORT_CHUNK_SIZE == 0:
+                progress(written)
+            yield row
+    
+    body, _ = export_body(History, counted(rows), fmt)
+    path = export_path(task.id, fmt)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as output:
+        for chunk in body:
+            output.write(chunk)
+    progress(written, written)
+    return {'rows': written, 'format': fmt}
+
+# Operations that POST /tasks can start: kind -> function(task, progress) returning a result dict
+TASK_KINDS = {
+    'clear_history': clear_history_task,
+    'archive_history': archive_history_task,
+    'rebuild_rollups': rebuild_rollups_task,
+    'export_history': export_history_task,
+}
+
+def update_task(task_id, **values):
+    """Write task status on its own connection, outside the task's transactions"""
+    with db.engine.begin() as conn:
+        conn.execute(update(Task).where(Task.id == task_id).values(**values))
+
+def run_task(task_id):
+    """Run a queued task, recording its status, progress and result"""
+    task = db.session.get(Task, task_id)
+    update_task(task_id, status='running', started_at=datetime.now())
+    
+    def progress(done, total=None):
+        update_task(task_id, progress=done, total=total)
+    
+    try:
+        result = TASK_KINDS[task.kind](task, progress)
+    except Exception as e:
+        db.session.rollback()
+        task_log.exception('Task %s (%s) failed', task_id, task.kind)
+        update_task(task_id, status='failed', error=str(e), finished_at=datetime.now())
+    else:
+        update_task(task_id, status='done', result=dumps(result).decode('utf-8'), finished_at=datetime.now())
+
+def start_task(kind, params=None):
+    """Queue a task on this process's TaskRunner; returns it as a dict"""
+    task = Task(kind=kind, params=dumps(params or {}).decode('utf-8'), status='queued', created_at=datetime.now())
+    db.session.add(task)
+    db.session.commit()
+    task_id = task.id
+    current_app.extensions['task_runner'].submit(run_task, task_id)
+    return db.session.get(Task, task_id, populate_existing=True).to_dict()
+
+@bp.route('/tasks', methods=['POST'])
+def create_task():
+    """Start a background task: {"kind": ..., "params": {...}}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        kind = data.get('kind')
+        if kind not in TASK_KINDS:
+            return jsonify({'success': False, 'message': f"kind harus salah satu dari: {', '.join(TASK_KINDS)}"}), 400
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            return jsonify({'success': False, 'message': 'params harus berupa object'}), 400
+        return jsonify({'success': True, 'task': start_task(kind, params)}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@bp.route('/tasks')
+def list_tasks():
+    """Most recent background tasks, newest first"""
+    try:
+        tasks = Task.query.order_by(Task.id.desc()).limit(TASK_LIST_SIZE).all()
+        return jsonify({'tasks': [task.to_dict() for task in tasks]})
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@bp.route('/tasks/<int:task_id>')
+def get_task(task_id):
+    """Status and progress of a background task"""
+    return jsonify(Task.query.get_or_404(task_id).to_dict())
+
+@bp.route('/tasks/<int:task_id>/download')
+def download_task_export(task_id):
+    """File written by a finished export_history task"""
+    task = Task.query.get_or_404(task_id)
+    if task.kind != 'export_history' or task.status != 'done':
+        return jsonify({'error': 'Export belum selesai'}), 409
+    fmt = loads(task.result)['format']
+    path = os.path.abspath(export_path(task_id, fmt))
+    if not os.path.exists(path):
+        return jsonify({'error': 'File export tidak ditemukan'}), 404
+    return send_file(path, as_attachment=True, download_name=f'cnc_history.{fmt}')
+
+@bp.route('/metrics')
+def get_metrics():
+    """Request latency, SQL, slow-query and cache metrics in Prometheus text format"""
+    cache_stats = current_app.extensions['response_cache'].stats()
+    cache_counters = [(
+        'cnc_cache_requests_total', 'Response cache lookups by cache and result (this process)',
+        [({'cache': namespace, 'result': result}, stats[field])
+         for namespace, stats in cache_stats.items() for result, field in (('hit', 'hits'), ('miss', 'misses'))],
+    )]
+    return Response(metrics.render(cache_counters), mimetype=PROMETHEUS_CONTENT_TYPE)
+
 # Error handlers
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
-# Initialize database
-with app.app_context():
+def upgrade_schema():
+    """Add columns and indexes introduced after a table was created
+    
+    ``db.create_all()`` only creates missing tables, so existing databases are
+    upgraded in place here (the history table is rebuilt once for
+    AUTOINCREMENT ids). Returns the list of added columns.
+    """
+    inspector = inspect(db.engine)
+    added = []
+    
+    for model in (Job, History, Machine):
+        table = model.__table__
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}'
+            if column.server_default is not None:
+                # Existing rows take the default, so NOT NULL can be kept
+                ddl += f' DEFAULT {column.server_default.arg.text}'
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+        
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    with db.engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    
+    upgrade_history_ids()
+    return added
+
+def upgrade_history_ids():
+    """Rebuild an SQLite history table created without AUTOINCREMENT
+    
+    Without it SQLite hands out max(id) + 1, so once every hot row is archived
+    new rows reuse archived ids. The rebuilt table's sequence starts past the
+    highest archived id too. The search triggers go with the old table;
+    setup_search() recreates them and rebuilds the index. Returns True if the
+    table was rebuilt.
+    """
+    table = History.__table__
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                           {'name': table.name}).scalar()
+        if 'AUTOINCREMENT' in ddl.upper():
+            return False
+        
+        columns = ', '.join(column.name for column in table.columns)
+        conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {table.name}_old'))
+        for index in table.indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        table.create(conn)
+        conn.execute(text(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {table.name}_old'))
+        conn.execute(text(f'DROP TABLE {table.name}_old'))
+        
+        archived = conn.execute(select(func.max(ArchiveSegment.max_id))).scalar()
+        if archived is not None:
+            seeded = conn.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :seq) WHERE name = :name"),
+                                  {'seq': archived, 'name': table.name}).rowcount
+            if not seeded:
+                conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                             {'seq': archived, 'name': table.name})
+    return True
+
+def backfill_datetimes(model, batch_size=BACKFILL_BATCH_SIZE):
+    """Fill start_at/finish_at from the legacy strings, in id-ordered batches"""
+    # History rows are finished jobs, so their times are never in the future
+    past = model is History
+    now = datetime.now()
+    last_id = 0
+    updated = 0
+    
+    while True:
+        rows = db.session.execute(
+            db.select(model.id, model.START, model.FINISH)
+            .where(model.id > last_id)
+            .where(db.or_(
+                db.and_(model.START.isnot(None), model.start_at.is_(None)),
+                db.and_(model.FINISH.isnot(None), model.finish_at.is_(None)),
+            ))
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        
+        # One vectorised pass per batch: the finish first, then the start relative to it
+        ids, starts, finishes = zip(*rows)
+        finish_at = resolve_legacy_array(finishes, now, past=past)
+        finished = ~np.isnat(finish_at)
+        start_at = resolve_legacy_array(starts, np.where(finished, finish_at, np.datetime64(now, 'us')),
+                                        past=past | finished)
+        params = [
+            {'id': row_id, 'start_at': start, 'finish_at': finish}
+            for row_id, start, finish in zip(ids, start_at.tolist(), finish_at.tolist())
+        ]
+        
+        db.session.execute(update(model), params)
+        if model is Job:
+            # to_dict() includes start_at/finish_at: each batch is a logged job write
+            bump_jobs_version()
+            log_job_changes(job_changes('update', [param['id'] for param in params]))
+        db.session.commit()
+        updated += len(params)
+        last_id = rows[-1].id
+    
+    if updated and model is History:
+        # to_dict() includes start_at/finish_at, so cached views are outdated
+        bump_history_version()
+        db.session.commit()
+    return updated
+
+def recompute_job_hours(model, batch_size=BACKFILL_BATCH_SIZE):
+    """Recompute duration_h, target_h and ACHIEVEMENT from start_at/finish_at and ETC_H
+    
+    Runs in id-ordered batches and only writes rows whose stored values
+    differ: rows from before the columns existed, and achievements computed
+    from the year-less strings (wrong for jobs across New Year). Returns the
+    number of rows updated.
+    """
+    last_id = 0
+    updated = 0
+    machines = set()
+    
+    while True:
+        rows = db.session.execute(
+            db.select(model.id, model.mesin, model.ETC_H, model.start_at, model.finish_at,
+                      model.duration_h, model.target_h, model.ACHIEVEMENT)
+            .where(model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        
+        ids, mesin, etc_h, start_at, finish_at, *stored = zip(*rows)
+        start_at = np.array(start_at, dtype='datetime64[us]')
+        finish_at = np.array(finish_at, dtype='datetime64[us]')
+        duration_h = (finish_at - start_at) / np.timedelta64(1, 'h')
+        duration_h[np.isnat(start_at) | np.isnat(finish_at) | (duration_h < 0)] = np.nan
+        target_h = parse_hours_array(etc_h)
+        computed = np.array([duration_h, target_h, achievement_percent(duration_h, target_h)])
+        stored = np.array(stored, dtype=float)  # None -> NaN
+        changed = ~np.isclose(stored, computed, rtol=1e-9, atol=1e-9, equal_nan=True).all(axis=0)
+        
+        params = [
+            dict(zip(('id', 'duration_h', 'target_h', 'ACHIEVEMENT'),
+                     [ids[i]] + [None if np.isnan(value) else float(value) for value in computed[:, i]]))
+            for i in np.flatnonzero(changed)
+        ]
+        if params:
+            db.session.execute(update(model), params)
+            machines.update(mesin[i] for i in np.flatnonzero(changed))
+            if model is Job:
+                bump_jobs_version(*machines)
+                log_job_changes(job_changes('update', [param['id'] for param in params]))
+                machines.clear()
+        db.session.commit()
+        updated += len(params)
+        last_id = rows[-1].id
+    
+    if updated and model is History:
+        bump_history_version(*machines)
+        db.session.commit()
+    return updated
+
+@bp.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Upgrade the schema, backfill start_at/finish_at and the hours, and rebuild the rollup"""
+    added = upgrade_schema()
+    print(f"✅ Added columns: {', '.join(added) or 'none'}")
+    for model in (Job, History):
+        print(f"✅ Backfilled {backfill_datetimes(model)} {model.__tablename__} rows")
+        print(f"✅ Recomputed hours of {recompute_job_hours(model)} {model.__tablename__} rows")
+    print(f"✅ Rebuilt {rebuild_daily_stats()} daily stats rows")
+
+@bp.cli.command('recompute-hours')
+@click.option('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='rows read per transaction')
+def recompute_hours_command(batch_size):
+    """Recompute duration_h, target_h and ACHIEVEMENT of every job and history row"""
+    recomputed = 0
+    for model in (Job, History):
+        count = recompute_job_hours(model, batch_size)
+        print(f"✅ Recomputed hours of {count} {model.__tablename__} rows")
+        recomputed += count if model is History else 0
+    if recomputed:
+        # The rollup sums ACHIEVEMENT and the hours of History
+        print(f"✅ Rebuilt {rebuild_daily_stats()} daily stats rows")
+
+@bp.cli.command('archive-history')
+@click.option('--months', type=int, default=None, help='archive history finished before this many months ago '
+                                                         '(default ARCHIVE_AFTER_MONTHS)')
+@click.option('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='rows moved per transaction')
+def archive_history_command(months, batch_size):
+    """Move old History rows to compressed monthly segments in ARCHIVE_DIR"""
+    months = current_app.config['ARCHIVE_AFTER_MONTHS'] if months is None else months
+    print(f"📦 Archiving history finished before {archive_cutoff(months):%Y-%m-%d}...")
+    print(f"✅ Archived {archive_history(months, batch_size)} history rows to {current_app.config['ARCHIVE_DIR']}")
+
+@bp.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the DailyStats rollup from History and the archive"""
+    print(f"✅ Rebuilt {rebuild_daily_stats()} daily stats rows")
+
+@bp.cli.command('prune-changes')
+@click.option('--days', type=int, default=None, help='delete changes older than this many days '
+                                                       '(default CHANGE_LOG_RETENTION_DAYS)')
+def prune_changes_command(days):
+    """Delete old rows of the job change log behind /changes"""
+    days = current_app.config['CHANGE_LOG_RETENTION_DAYS'] if days is None else days
+    print(f"✅ Deleted {prune_job_changes(days)} job changes older than {days} days")
+
+@bp.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Rebuild the full-text search indexes from the Job and History tables"""
+    if not search_index_enabled():
+        print("⚠️ SQLite FTS5 is not available: /search matches with ILIKE, there is no index to rebuild")
+        return
+    with db.engine.begin() as conn:
+        for model in (Job, History):
+            rebuild_index(conn, model.__tablename__)
+            print(f"✅ Rebuilt {model.__tablename__}_fts")
+
+def setup_search():
+    """Create the FTS5 indexes of Job and History where missing (SQLite with FTS5 only)
+    
+    Returns whether /search can use them.
+    """
+    with db.engine.begin() as conn:
+        if not fts5_available(conn):
+            return False
+        for model in (Job, History):
+            create_index(conn, model.__tablename__)
+    return True
+
+def seed_machines():
+    """Register the default machines plus every machine that already has jobs or history"""
+    names = list(DEFAULT_MACHINES)
+    for model in (Job, History):
+        names += db.session.execute(select(model.mesin).distinct().order_by(model.mesin)).scalars()
+    names = list(dict.fromkeys(names))
+    db.session.execute(db.insert(Machine), [{'name': name} for name in names])
+    bump_version('machines')
+    db.session.commit()
+
+def init_db():
+    """Create missing tables and upgrade existing ones"""
+    inspector = inspect(db.engine)
+    # New registry/rollup tables on an existing database are filled from its data
+    new_registry = not inspector.has_table(Machine.__tablename__)
+    new_rollup = not inspector.has_table(DailyStats.__tablename__)
     db.create_all()
+    if new_registry:
+        seed_machines()
+    upgraded = upgrade_schema()
+    if upgraded:
+        for model in (Job, History):
+            backfill_datetimes(model)
+            recompute_job_hours(model)
+    if upgraded or new_rollup:
+        rebuild_daily_stats()
+    current_app.extensions['search_index'] = setup_search()
+
+def configure_sqlite(engine, busy_timeout_ms):
+    """Apply SQLite pragmas to every new connection of an engine"""
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers run alongside the single writer; busy_timeout makes writers queue
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+        cursor.close()
+
+def create_app(config=None):
+    """Application factory
+    
+    Settings come from ``Config`` (environment variables), optionally
+    overridden by the ``config`` mapping.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri):
+        # In-memory SQLite uses a single static connection: no pool to tune
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+    
+    db.init_app(app)
+    app.register_blueprint(bp)
+    app.extensions['response_cache'] = create_cache(app.config)
+    app.extensions['history_archive'] = HistoryArchive(app.config['ARCHIVE_DIR'], History.SERIALIZED_FIELDS)
+    app.extensions['task_runner'] = TaskRunner(app, app.config['TASK_WORKERS'])
+    app.extensions['assets'] = AssetManifest(app.static_folder)
+    app.extensions['shift_calendar'] = ShiftCalendar.parse(app.config['FORECAST_SHIFTS'], app.config['FORECAST_WORKDAYS'])
+    app.extensions['page_version'] = folder_digest(app.template_folder) + app.extensions['assets'].version
+    
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            configure_sqlite(db.engine, app.config['SQLITE_BUSY_TIMEOUT_MS'])
+        init_db()
+        instrument_app(app, db.engine)
+    
+    if app.config['EVENT_SYNC_INTERVAL'] > 0:
+        def jobs_version():
+            with app.app_context():
+                return get_version('jobs')
+        broker.watch(jobs_version, app.config['EVENT_SYNC_INTERVAL'])
+    
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
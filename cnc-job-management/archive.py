@@ -0,0 +1,85 @@
+"""Monthly gzip JSON-lines segments for archived History rows
+
+Each month of archived history (by finish_at) is one append-only file,
+<ARCHIVE_DIR>/history-YYYY-MM.jsonl.gz, with one JSON object per row. Every
+archive batch is appended as its own gzip member (concatenated members are
+still a valid gzip file). The committed size of each segment is stored in the
+database together with the delete of the archived rows: readers never look
+past it, and an append first truncates whatever a failed run left behind.
+"""
+import gzip
+import io
+import os
+from collections import namedtuple
+from datetime import datetime
+
+from serializer import dumps, loads
+
+# Row fields written as ISO 8601 text and read back as datetimes
+DATETIME_FIELDS = ('start_at', 'finish_at')
+
+class CommittedPart(io.RawIOBase):
+    """The first ``size`` bytes of an open file, as a readable stream"""
+
+    def __init__(self, file, size):
+        self.file = file
+        self.left = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.file.read(min(len(buffer), self.left))
+        buffer[:len(data)] = data
+        self.left -= len(data)
+        return len(data)
+
+class HistoryArchive:
+    """Segment files of one archive directory
+
+    Rows are read back as namedtuples of ``fields``; fields missing from an
+    older segment are None. Segments are streamed, never held in memory: the
+    segment metadata (committed size, id range) is what the database keeps.
+    """
+
+    def __init__(self, directory, fields):
+        self.directory = directory
+        self.Row = namedtuple('ArchivedRow', fields)
+
+    def path(self, month):
+        return os.path.join(self.directory, f'history-{month}.jsonl.gz')
+
+    def append(self, month, committed_size, records):
+        """Append records (dicts) to a month's segment; returns the new size
+
+        Bytes past ``committed_size`` (from a run whose commit failed) are
+        dropped first. The data is fsynced before returning.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        body = gzip.compress(b''.join(dumps(record) + b'\n' for record in records))
+        path = self.path(month)
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as segment:
+            segment.truncate(committed_size)
+            segment.seek(committed_size)
+            segment.write(body)
+            segment.flush()
+            os.fsync(segment.fileno())
+        return committed_size + len(body)
+
+    def read(self, month, size):
+        """Rows of the committed part (``size`` bytes) of a month's segment, streamed"""
+        with open(self.path(month), 'rb') as segment, \
+                gzip.GzipFile(fileobj=io.BufferedReader(CommittedPart(segment, size))) as lines:
+            for line in lines:
+                record = loads(line)
+                for name in DATETIME_FIELDS:
+                    if record.get(name):
+                        record[name] = datetime.fromisoformat(record[name])
+                yield self.Row(*[record.get(name) for name in self.Row._fields])
+
+    def remove(self, month):
+        """Delete a month's segment file (if present)"""
+        try:
+            os.remove(self.path(month))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,125 @@
+"""Content-hashed static assets, compressed once when the app starts
+
+Every file under the static folder is read once, fingerprinted with its
+content hash (js/main.js -> js/main.3f2a9c41d0b7.js) and compressed with gzip
+and, when it is installed (pip install brotli), brotli. Pages link the hashed
+names, so a browser can keep an asset for a year without revalidating it:
+changing the file changes its URL. The compressed bodies are kept in memory
+and served as they are, with no per-request compression.
+
+A deploy restarts the workers, which picks up the new hashes; refresh()
+re-reads changed files (the app calls it on every use in debug).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Hex digits of the content hash put into asset file names
+DIGEST_LENGTH = 12
+
+# Compressed variants are kept only when they save at least this share of the size
+MIN_COMPRESSION_SAVING = 0.1
+
+# Files already compressed, or not worth compressing
+INCOMPRESSIBLE_SUFFIXES = ('.gz', '.br', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.woff', '.woff2', '.zip')
+
+# "js/main.3f2a9c41d0b7.js" -> ("js/main", "3f2a9c41d0b7", ".js")
+_HASHED_NAME = re.compile(rf'^(.*)\.([0-9a-f]{{{DIGEST_LENGTH}}})(\.[^./]+)?$')
+
+class Asset:
+    """One static file: its hashed name, body and compressed variants"""
+
+    def __init__(self, name, body, mtime):
+        self.name = name
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()[:DIGEST_LENGTH]
+        root, extension = os.path.splitext(name)
+        self.hashed_name = f'{root}.{self.digest}{extension}'
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.bodies = {'identity': body}
+        if not name.endswith(INCOMPRESSIBLE_SUFFIXES):
+            variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=11)
+            for encoding, compressed in variants.items():
+                if len(compressed) <= len(body) * (1 - MIN_COMPRESSION_SAVING):
+                    self.bodies[encoding] = compressed
+
+    def negotiate(self, accept_encodings):
+        """(encoding, body) of the smallest variant the client accepts"""
+        accepted = [encoding for encoding in self.bodies if encoding == 'identity' or accept_encodings[encoding]]
+        encoding = min(accepted, key=lambda encoding: len(self.bodies[encoding]))
+        return encoding, self.bodies[encoding]
+
+class AssetManifest:
+    """Hashed names of the files in a static folder"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._assets = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the files that were added or changed since the last scan"""
+        found = {}
+        if self.folder and os.path.isdir(self.folder):
+            for directory, _, files in os.walk(self.folder):
+                for filename in files:
+                    path = os.path.join(directory, filename)
+                    name = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                    mtime = os.stat(path).st_mtime_ns
+                    asset = self._assets.get(name)
+                    if asset is None or asset.mtime != mtime:
+                        with open(path, 'rb') as source:
+                            asset = Asset(name, source.read(), mtime)
+                    found[name] = asset
+        with self._lock:
+            self._assets = found
+            self._hashed = {asset.hashed_name: asset for asset in found.values()}
+            self.version = hashlib.sha256(
+                ''.join(f'{name}:{found[name].digest};' for name in sorted(found)).encode()
+            ).hexdigest()[:DIGEST_LENGTH]
+
+    def hashed_name(self, name):
+        """Fingerprinted name of a static file (the name itself if there is no such file)"""
+        asset = self._assets.get(name)
+        return asset.hashed_name if asset else name
+
+    def lookup(self, hashed_name):
+        """(asset, current) for a requested name, or (None, False)
+
+        A name with an outdated hash (a page rendered before a deploy) still
+        gets the current file, with ``current`` False so it is not cached as
+        immutable under the old name.
+        """
+        asset = self._hashed.get(hashed_name)
+        if asset is not None:
+            return asset, True
+        match = _HASHED_NAME.match(hashed_name)
+        if match:
+            asset = self._assets.get(match.group(1) + (match.group(3) or ''))
+            if asset is not None:
+                return asset, False
+        return None, False
+
+def folder_digest(folder):
+    """Short hash of every file name and content under a folder (e.g. the templates)"""
+    digest = hashlib.sha256()
+    if folder and os.path.isdir(folder):
+        for directory, dirs, files in os.walk(folder):
+            dirs.sort()
+            for filename in sorted(files):
+                path = os.path.join(directory, filename)
+                digest.update(os.path.relpath(path, folder).encode())
+                with open(path, 'rb') as source:
+                    digest.update(source.read())
+    return digest.hexdigest()[:DIGEST_LENGTH]
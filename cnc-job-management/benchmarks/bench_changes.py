@@ -0,0 +1,83 @@
+"""Cost of a downstream sync: polling the whole jobs table vs reading /changes
+
+Fills a throwaway database with generate_dummy (seeded), edits a few jobs
+between polls and times what a consumer (MES, reporting) reads to catch up:
+
+    full table   GET /export_csv/jobs, then diff against the previous copy
+    changes      GET /changes?since=<last seq applied>
+
+    python benchmarks/bench_changes.py --machines 500 --queue-depth 20 --edits 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import func, select
+
+from app import create_app, db, Job
+from generate_dummy import generate_dummy_jobs
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--machines', type=int, default=500)
+    parser.add_argument('--queue-depth', type=int, default=20)
+    parser.add_argument('--edits', type=int, default=10, help='jobs edited between two polls')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'changes.db')}",
+                          'EVENT_SYNC_INTERVAL': 0, 'METRICS_ENABLED': False})
+        client = app.test_client()
+        with app.app_context():
+            print("🔄 Generating benchmark data...")
+            generate_dummy_jobs(seed=args.seed, machines=args.machines, halls=1, lines=1,
+                                queue_depth=args.queue_depth, days=1)
+            jobs = db.session.scalar(select(func.count()).select_from(Job))
+            queued = db.session.execute(select(Job.id, Job.mesin).where(Job.job_type == 'next')).all()
+
+        edits = iter(queued)
+        def edit_some():
+            for _ in range(args.edits):
+                job_id, mesin = next(edits)
+                client.post(f'/edit_job/{job_id}', json={'mesin': mesin, 'job_type': 'next', 'MODEL': 'BENCH', 'PART': 'P',
+                                                         'SIZE': '1', 'ETC_H': '3 H', 'OPERATOR': 'BENCH'})
+
+        since = client.get('/changes').get_json()['last_seq']
+        previous = set(client.get('/export_csv/jobs').data.splitlines())
+        full, incremental = [], []
+        for _ in range(args.repeat):
+            edit_some()
+
+            started = time.perf_counter()
+            response = client.get('/export_csv/jobs')
+            rows = set(response.data.splitlines())
+            changed = rows - previous
+            full.append(((time.perf_counter() - started) * 1000, len(response.data), len(changed)))
+            previous = rows
+
+            started = time.perf_counter()
+            response = client.get(f'/changes?since={since}')
+            page = response.get_json()
+            incremental.append(((time.perf_counter() - started) * 1000, len(response.data), len(page['changes'])))
+            since = page['next_since']
+
+        with app.app_context():
+            db.engine.dispose()
+
+    print(f"\n📊 RESULTS ({jobs:,} jobs, {args.edits} edited between polls, median per poll):")
+    for name, polls in (('full table', full), ('changes', incremental)):
+        elapsed = statistics.median(poll[0] for poll in polls)
+        size = statistics.median(poll[1] for poll in polls)
+        found = statistics.median(poll[2] for poll in polls)
+        print(f"   • {name:<11} {elapsed:9.2f} ms  {size / 1024:9.1f} KiB  {found:g} changed jobs found")
+
+if __name__ == '__main__':
+    main()
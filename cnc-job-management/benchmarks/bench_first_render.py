@@ -0,0 +1,126 @@
+"""Estimated time to first render of the dashboard, before and after embedding its data
+
+Fills a throwaway database with generate_dummy (seeded) and replays the
+requests a browser makes before it can draw the machine cards, once for a
+cold cache and once for a reload of an open screen:
+
+    before   GET /                   uncompressed HTML, no validator
+             GET /static/js/main.js  unhashed, revalidated on every reload
+             GET /dashboard_data     uncompressed JSON (304 on reload)
+    after    GET /                   gzipped HTML with the dashboard embedded (304 on reload)
+             GET /assets/js/main.<hash>.js
+                                     precompressed, immutable: not requested on reload
+
+The requests go through the Flask test client, which gives the server time and
+the bytes on the wire of each. The page is drawn after the last of them, and
+they run one after the other (the script is only found in the HTML, the data
+only requested by the script), so the estimate is the sum over the chain of
+round trip + server time + transfer time at the given bandwidth. Only the
+server times and sizes are measured: the network is modelled and no browser
+parses or paints anything, so the totals are estimates, not a measured first
+render. TCP/TLS setup and the CDN stylesheet are left out: they are the same
+on both sides.
+
+    python benchmarks/bench_first_render.py --machines 100 --rtt-ms 30 --bandwidth-mbps 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import render_template
+
+from app import create_app, asset_url, db
+from generate_dummy import generate_dummy_jobs
+
+# Headers of a browser fetch
+ACCEPT_ENCODING = {'Accept-Encoding': 'gzip, deflate, br'}
+
+def timed(function, repeat):
+    """(median ms, last result) of function()"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def fetch(client, url, repeat, headers=None):
+    """(server ms, wire bytes, response) of a GET through the test client"""
+    elapsed, response = timed(lambda: client.get(url, headers=headers or {}), repeat)
+    return elapsed, len(response.data), response
+
+def legacy_page(app, repeat):
+    """(server ms, bytes) of the page as it was rendered before: no embedded data, no compression"""
+    with app.test_request_context('/'):
+        elapsed, html = timed(lambda: render_template('index.html'), repeat)
+    return elapsed, len(html.encode('utf-8'))
+
+def chains(app, repeat):
+    """{(variant, load): [(request, server ms, bytes), ...]} for the request chains above"""
+    client = app.test_client()
+    with app.test_request_context('/'):
+        script = asset_url('js/main.js')
+
+    page_ms, page_bytes = legacy_page(app, repeat)
+    static_ms, static_bytes, static = fetch(client, '/static/js/main.js', repeat)
+    revalidate = {'If-None-Match': static.headers['ETag']}
+    static_304_ms, static_304_bytes, _ = fetch(client, '/static/js/main.js', repeat, revalidate)
+    data_ms, data_bytes, data = fetch(client, '/dashboard_data', repeat)
+    data_304_ms, data_304_bytes, _ = fetch(client, '/dashboard_data', repeat, {'If-None-Match': data.headers['ETag']})
+
+    embedded_ms, embedded_bytes, embedded = fetch(client, '/', repeat, ACCEPT_ENCODING)
+    embedded_304_ms, embedded_304_bytes, _ = fetch(client, '/', repeat,
+                                                    dict(ACCEPT_ENCODING, **{'If-None-Match': embedded.headers['ETag']}))
+    asset_ms, asset_bytes, _ = fetch(client, script, repeat, ACCEPT_ENCODING)
+
+    return {
+        ('before', 'cold'): [('GET /', page_ms, page_bytes), ('main.js', static_ms, static_bytes),
+                             ('GET /dashboard_data', data_ms, data_bytes)],
+        ('before', 'reload'): [('GET /', page_ms, page_bytes), ('main.js 304', static_304_ms, static_304_bytes),
+                               ('GET /dashboard_data 304', data_304_ms, data_304_bytes)],
+        ('after', 'cold'): [('GET / (gzip)', embedded_ms, embedded_bytes), ('main.<hash>.js', asset_ms, asset_bytes)],
+        ('after', 'reload'): [('GET / 304', embedded_304_ms, embedded_304_bytes)],
+    }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--machines', type=int, default=100)
+    parser.add_argument('--queue-depth', type=int, default=5)
+    parser.add_argument('--rtt-ms', type=float, default=30, help='network round trip of the screens')
+    parser.add_argument('--bandwidth-mbps', type=float, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'render.db')}",
+                          'EVENT_SYNC_INTERVAL': 0, 'METRICS_ENABLED': False})
+        with app.app_context():
+            print("🔄 Generating benchmark data...")
+            generate_dummy_jobs(seed=args.seed, machines=args.machines, halls=1, lines=1,
+                                queue_depth=args.queue_depth, days=1)
+        results = chains(app, args.repeat)
+        with app.app_context():
+            db.engine.dispose()
+
+    bytes_per_ms = args.bandwidth_mbps * 1e6 / 8 / 1000
+    print(f"\n📊 ESTIMATED first render ({args.machines} machines, modelled RTT {args.rtt_ms:g} ms, "
+          f"{args.bandwidth_mbps:g} Mbit/s; server times and sizes measured, network modelled):")
+    for load in ('cold', 'reload'):
+        totals = {}
+        for variant in ('before', 'after'):
+            chain = results[(variant, load)]
+            total = sum(args.rtt_ms + server + size / bytes_per_ms for _, server, size in chain)
+            totals[variant] = total
+            steps = ' → '.join(f'{name} ({size / 1024:.1f} KiB, {server:.1f} ms)' for name, server, size in chain)
+            print(f"   • {load:<6} {variant:<6} ~{total:7.1f} ms (est.)  {steps}")
+        print(f"     estimated first render {totals['before'] / totals['after']:.1f}x sooner")
+
+if __name__ == '__main__':
+    main()
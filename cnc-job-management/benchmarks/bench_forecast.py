@@ -0,0 +1,124 @@
+"""Latency of /forecast for many machines
+
+Fills a throwaway database with generate_dummy (seeded) and times:
+
+    cold            first /forecast: overrun factors read from all History,
+                    every machine queue loaded
+    unchanged       nothing written since the last call
+    one job edited  one machine's queue is re-read
+    one job moved   a finish: one queue re-read, the new History row added
+                    to the factors
+    projection      forecast.project_queues alone, over every queued job
+
+    python benchmarks/bench_forecast.py --machines 500 --queue-depth 10 --days 60
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app import create_app, db, Job, History
+from forecast import ShiftCalendar, project_queues, to_seconds
+from generate_dummy import generate_dummy_jobs
+
+def measure(function, repeat):
+    """Median ms of function()"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def measure_after(change, function, repeat):
+    """Median ms of function() right after each change() (the change itself not timed)"""
+    timings = []
+    for _ in range(repeat):
+        change()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--machines', type=int, default=500)
+    parser.add_argument('--queue-depth', type=int, default=10)
+    parser.add_argument('--days', type=float, default=60)
+    parser.add_argument('--jobs-per-day', type=float, default=3)
+    parser.add_argument('--shifts', default='07:00-15:00,15:00-23:00')
+    parser.add_argument('--workdays', default='mon-sat')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'forecast.db')}",
+                          'EVENT_SYNC_INTERVAL': 0, 'METRICS_ENABLED': False,
+                          'FORECAST_SHIFTS': args.shifts, 'FORECAST_WORKDAYS': args.workdays})
+        client = app.test_client()
+        with app.app_context():
+            print("🔄 Generating benchmark data...")
+            generate_dummy_jobs(seed=args.seed, machines=args.machines, halls=1, lines=1,
+                                queue_depth=args.queue_depth, days=args.days, jobs_per_day=args.jobs_per_day)
+            jobs = db.session.scalar(select(func.count()).select_from(Job))
+            history = db.session.scalar(select(func.count()).select_from(History))
+            queued = db.session.execute(select(Job.id, Job.mesin).where(Job.job_type == 'next')).all()
+            current = db.session.execute(select(Job.id).where(Job.job_type == 'current')).scalars().all()
+
+        def forecast():
+            response = client.get('/forecast')
+            assert response.status_code == 200
+            return response
+
+        started = time.perf_counter()
+        response = forecast()
+        cold = (time.perf_counter() - started) * 1000
+        assert 'error' not in response.json, response.json
+        unchanged = measure(forecast, args.repeat)
+
+        edits = iter(queued)
+        def edit_one():
+            job_id, mesin = next(edits)
+            client.post(f'/edit_job/{job_id}', json={'mesin': mesin, 'job_type': 'next', 'MODEL': 'BENCH', 'PART': 'P',
+                                                     'SIZE': '1', 'ETC_H': '3 H', 'OPERATOR': 'BENCH'})
+        edited = measure_after(edit_one, forecast, args.repeat)
+
+        finishes = iter(current)
+        def finish_one():
+            job_id = next(finishes)
+            client.post(f'/edit_job/{job_id}', json=dict(client.get(f'/job_data/{job_id}').json, FINISH=datetime.now().strftime('%d/%m - %H:%M')))
+            client.post(f'/finish_job/{job_id}', json={})
+        moved = measure_after(finish_one, forecast, args.repeat)
+
+        with app.app_context():
+            rows = db.session.execute(select(Job.mesin, Job.job_type, Job.start_at, Job.target_h)
+                                      .where(Job.job_type.in_(['current', 'next']))
+                                      .order_by(Job.mesin, Job.job_type, Job.queue_pos)).all()
+            db.engine.dispose()
+        calendar = ShiftCalendar.parse(args.shifts, args.workdays)
+        machine = np.unique([row.mesin for row in rows], return_inverse=True)[1]
+        is_current = np.array([row.job_type == 'current' for row in rows])
+        started_at = to_seconds([row.start_at if row.job_type == 'current' else None for row in rows])
+        hours = np.array([row.target_h or np.nan for row in rows], dtype=float)
+        now = to_seconds([datetime.now()])[0]
+        projection = measure(lambda: project_queues(calendar, now, machine, is_current, started_at, hours), args.repeat)
+
+    print(f"\n📊 RESULTS ({args.machines} machines, {jobs:,} jobs, {history:,} history rows, median ms per /forecast):")
+    print(f"   • cold            {cold:9.2f} ms")
+    print(f"   • unchanged       {unchanged:9.2f} ms")
+    print(f"   • one job edited  {edited:9.2f} ms")
+    print(f"   • one job moved   {moved:9.2f} ms")
+    print(f"   • projection      {projection:9.2f} ms  ({len(rows):,} queued jobs, engine only)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Query timings before and after the Job/History composite indexes
+
+Builds a throwaway SQLite database with N history rows (default 1M), runs the
+hot per-machine and date-range queries without indexes, adds the indexes
+declared on the models and runs them again.
+
+    python benchmarks/bench_indexes.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, text
+
+from app import Job, History, LEGACY_DATETIME_FORMAT
+
+MACHINES = [f'CNC{i}' for i in range(1, 51)]
+OPERATORS = ['JONI', 'DONI', 'NANI', 'SARI', 'BUDI', 'ANDI', 'RINI', 'TONO']
+
+QUERIES = {
+    'machine + date range (history)': (
+        "SELECT id, FINISH FROM history WHERE mesin = :mesin "
+        "AND finish_at >= :date_from AND finish_at < :date_to ORDER BY finish_at LIMIT 100"
+    ),
+    'date range count (history)': (
+        "SELECT count(*) FROM history WHERE finish_at >= :date_from AND finish_at < :date_to"
+    ),
+    'next job for machine (job)': (
+        "SELECT id FROM job WHERE mesin = :mesin AND job_type = 'next' ORDER BY queue_pos, id LIMIT 1"
+    ),
+}
+
+def populate(engine, rows):
+    """Create unindexed tables and fill them with random rows"""
+    Job.__table__.create(engine)
+    History.__table__.create(engine)
+    with engine.begin() as conn:
+        for table in (Job.__table__, History.__table__):
+            for index in table.indexes:
+                conn.execute(text(f'DROP INDEX {index.name}'))
+
+    end = datetime.now()
+    chunk = 50000
+    with engine.begin() as conn:
+        for offset in range(0, rows, chunk):
+            batch = []
+            for _ in range(min(chunk, rows - offset)):
+                finish_at = end - timedelta(minutes=random.randint(0, 3 * 365 * 24 * 60))
+                start_at = finish_at - timedelta(hours=random.randint(2, 10))
+                batch.append({
+                    'mesin': random.choice(MACHINES), 'job_type': 'current',
+                    'MODEL': 'MODEL-A1', 'PART': 'SHAFT', 'SIZE': '10x20',
+                    'START': start_at.strftime(LEGACY_DATETIME_FORMAT),
+                    'FINISH': finish_at.strftime(LEGACY_DATETIME_FORMAT),
+                    'ETC_H': '4 H', 'OPERATOR': random.choice(OPERATORS),
+                    'ACHIEVEMENT': 100.0, 'REMARK': '',
+                    'start_at': start_at, 'finish_at': finish_at,
+                })
+            conn.execute(History.__table__.insert(), batch)
+
+        conn.execute(Job.__table__.insert(), [
+            {'mesin': machine, 'job_type': 'next', 'MODEL': 'MODEL-A1', 'PART': 'SHAFT',
+             'SIZE': '10x20', 'ETC_H': '4 H', 'OPERATOR': 'JONI', 'ACHIEVEMENT': 0.0}
+            for machine in MACHINES for _ in range(20)
+        ])
+
+def time_queries(engine, repeat):
+    """Median time in ms of each benchmark query"""
+    params = {
+        'mesin': 'CNC7',
+        'date_from': datetime.now() - timedelta(days=14),
+        'date_to': datetime.now() - timedelta(days=7),
+    }
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            plan = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params).all()
+            results[name] = (statistics.median(timings), ' / '.join(row[-1] for row in plan))
+    return results
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        print(f"🔄 Generating {args.rows:,} history rows...")
+        started = time.perf_counter()
+        populate(engine, args.rows)
+        print(f"   done in {time.perf_counter() - started:.1f}s")
+
+        before = time_queries(engine, args.repeat)
+
+        print("🔧 Creating indexes...")
+        for table in (Job.__table__, History.__table__):
+            for index in table.indexes:
+                index.create(engine)
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+
+        after = time_queries(engine, args.repeat)
+        engine.dispose()
+
+    print("\n📊 RESULTS (median ms):")
+    for name in QUERIES:
+        print(f"   • {name}: {before[name][0]:.2f} → {after[name][0]:.2f}")
+        print(f"       before: {before[name][1]}")
+        print(f"       after:  {after[name][1]}")
+
+if __name__ == '__main__':
+    main()
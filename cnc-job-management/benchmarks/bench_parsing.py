@@ -0,0 +1,72 @@
+"""CPU time of the legacy START/FINISH and ETC_H parsers
+
+Generates seeded "DD/MM - HH:MM" and "N H" strings and times each parser on
+the same list:
+
+    strptime          datetime.strptime per string (what calculate_achievement
+                      and the backfill did before)
+    scalar            parsing.parse_day_time per string, cache bypassed
+    array             parsing.parse_day_time_array on the whole list
+    resolve scalar    app.parse_legacy_datetime per string (year inference)
+    resolve array     parsing.resolve_legacy_array on the whole list
+    hours scalar      float(ETC_H.replace(...)) per string
+    hours array       parsing.parse_hours_array on the whole list
+
+    python benchmarks/bench_parsing.py --rows 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from app import parse_legacy_datetime
+from parsing import (LEGACY_DATETIME_FORMAT, parse_day_time, parse_day_time_array, parse_hours_array,
+                     resolve_legacy_array)
+
+def measure(function, repeat):
+    """Median ms of function()"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    base = datetime(2025, 1, 1)
+    stamps = [base + timedelta(minutes=rng.randint(0, 365 * 24 * 60)) for _ in range(args.rows)]
+    values = [stamp.strftime(LEGACY_DATETIME_FORMAT) for stamp in stamps]
+    hours = [rng.choice(['2 H', '3 H', '4 H', '6H', '8 H', '1.5 H']) for _ in range(args.rows)]
+    reference = datetime(2026, 1, 1)
+
+    variants = [
+        ('strptime', lambda: [datetime.strptime(value, LEGACY_DATETIME_FORMAT) for value in values]),
+        ('scalar', lambda: [parse_day_time.__wrapped__(value) for value in values]),
+        ('array', lambda: parse_day_time_array(values)),
+        ('resolve scalar', lambda: [parse_legacy_datetime(value, reference, True) for value in values]),
+        ('resolve array', lambda: resolve_legacy_array(values, np.datetime64(reference, 'us'), True)),
+        ('hours scalar', lambda: [float(value.replace(' H', '').replace('H', '')) for value in hours]),
+        ('hours array', lambda: parse_hours_array(hours)),
+    ]
+    print(f"📊 RESULTS ({args.rows:,} strings, median ms):")
+    for name, function in variants:
+        parse_day_time.cache_clear()
+        print(f"   • {name:<15} {measure(function, args.repeat):9.2f} ms")
+
+if __name__ == '__main__':
+    main()
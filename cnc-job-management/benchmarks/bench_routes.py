@@ -0,0 +1,294 @@
+"""Latency and memory of every route, recorded as JSON for comparing runs
+
+Fills a throwaway database with generate_dummy (seeded, so two runs see the
+same data set), then drives each route of app.py through the Flask test
+client: the dashboard (fresh snapshot, cached, 304, one hall), history pages,
+analytics, navigation, exports and the write routes (add, edit, move,
+reorder, finish, bulk, machines, clear history). For every case it records
+p50/p99/mean/max latency over --repeat requests and the peak Python memory
+(tracemalloc) of one extra request. /events is left out: it never ends.
+
+    python benchmarks/bench_routes.py --output before.json
+    python benchmarks/bench_routes.py --output after.json --compare before.json
+    python benchmarks/bench_routes.py --machines 500 --queue-depth 20 --years 3 --jobs-per-day 4
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import func, select, update
+
+from app import create_app, db, Job, History, Machine, bump_version
+from generate_dummy import generate_dummy_jobs
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def failed(response):
+    """True for error statuses and {"success": false} / {"error": ...} bodies"""
+    if response.status_code not in (200, 304):
+        return True
+    if response.is_json:
+        body = response.get_json()
+        return isinstance(body, dict) and (body.get('success') is False or 'error' in body)
+    return False
+
+class Harness:
+    """Runs the benchmark cases against one app and collects their results"""
+
+    def __init__(self, app, repeat):
+        self.app = app
+        self.client = app.test_client()
+        self.repeat = repeat
+        self.results = {}
+
+    def query(self, statement):
+        with self.app.app_context():
+            return db.session.execute(statement).all()
+
+    def write(self, *statements, bump=('jobs',)):
+        """Change the database outside of a request (setup, not timed)"""
+        with self.app.app_context():
+            for statement in statements:
+                db.session.execute(statement)
+            for name in bump:
+                bump_version(name)
+            db.session.commit()
+
+    def call(self, request):
+        """Send one request and read the whole body (exports stream)"""
+        method, url, kwargs = request
+        response = self.client.open(url, method=method, **kwargs)
+        response.get_data()
+        return response
+
+    def run(self, name, make_request, repeat=None, setup=None):
+        """Time `repeat` requests; make_request() returns (method, url, kwargs)"""
+        repeat = repeat or self.repeat
+        samples = []
+        errors = 0
+        for _ in range(repeat + 1):
+            if setup:
+                setup()
+            request = make_request()
+            if len(samples) == repeat:
+                # One more request under tracemalloc for the memory peak
+                tracemalloc.start()
+                response = self.call(request)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                started = time.perf_counter()
+                response = self.call(request)
+                samples.append((time.perf_counter() - started) * 1000)
+            errors += failed(response)
+
+        self.results[name] = {
+            'n': repeat,
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'mean_ms': round(statistics.mean(samples), 3),
+            'max_ms': round(max(samples), 3),
+            'peak_kb': round(peak / 1024, 1),
+            'errors': errors,
+        }
+        flag = f"  ❌ {errors} errors" if errors else ""
+        print(f"   • {name}: p50 {self.results[name]['p50_ms']:.2f} ms, "
+              f"p99 {self.results[name]['p99_ms']:.2f} ms, peak {self.results[name]['peak_kb']:,.0f} KB{flag}")
+
+def get(url, **kwargs):
+    return lambda: ('GET', url, kwargs)
+
+def post(url, payload):
+    return lambda: ('POST', url, {'json': payload})
+
+def run_cases(bench, export_repeat):
+    """Every route of app.py, reads first, then writes, clear_history last"""
+    machines = [row.name for row in bench.query(select(Machine.name).order_by(Machine.id))]
+    mesin = machines[0]
+    hall = next((row.hall for row in bench.query(select(Machine.hall).where(Machine.hall.is_not(None)).limit(1))), None)
+    queued = [row.id for row in bench.query(
+        select(Job.id).where(Job.mesin == mesin, Job.job_type == 'next').order_by(Job.queue_pos, Job.id)
+    )]
+    newest = bench.query(select(func.max(History.id)))[0][0] or 0
+    operator, model = (bench.query(select(History.OPERATOR, History.MODEL).limit(1)) or [('JONI', 'MODEL-A1')])[0]
+    job = {'mesin': mesin, 'job_type': 'next', 'MODEL': 'MODEL-A1', 'PART': 'SHAFT', 'SIZE': '10x20',
+           'ETC_H': '4 H', 'OPERATOR': 'JONI', 'START': '01/02 - 08:00', 'FINISH': '01/02 - 12:00'}
+
+    print("\n📖 Read routes:")
+    bench.run('GET /', get('/'))
+    bench.run('GET /history', get('/history'))
+    bench.run('GET /dashboard_data (fresh)', get('/dashboard_data'),
+              setup=lambda: bench.write(bump=('jobs',)))
+    bench.run('GET /dashboard_data (cached)', get('/dashboard_data'))
+    etag = bench.client.get('/dashboard_data').headers.get('ETag', '')
+    bench.run('GET /dashboard_data (304)', get('/dashboard_data', headers={'If-None-Match': etag}))
+    if hall:
+        bench.run('GET /dashboard_data?hall (fresh)', get(f'/dashboard_data?hall={hall}'),
+                  setup=lambda: bench.write(bump=('jobs',)))
+    bench.run('GET /machines', get('/machines'))
+    if queued:
+        bench.run('GET /job_data', get(f'/job_data/{queued[0]}'))
+        bench.run('GET /navigate_job next', get(f'/navigate_job/{mesin}/next?current_job_id={queued[len(queued) // 2]}'))
+        bench.run('GET /navigate_job prev', get(f'/navigate_job/{mesin}/prev?current_job_id={queued[0]}'))
+    bench.run('GET /history_data (first page)', get('/history_data'))
+    bench.run('GET /history_data (cursor)', get(f'/history_data?cursor={newest // 2}'))
+    bench.run('GET /history_data?mesin', get(f'/history_data?mesin={mesin}'))
+    bench.run('GET /history_data?operator&model', get(f'/history_data?operator={operator}&model={model}'))
+    bench.run('GET /analytics (fresh)', get('/analytics'),
+              repeat=export_repeat, setup=lambda: bench.write(bump=('history',)))
+    bench.run('GET /analytics (cached)', get('/analytics'))
+    bench.run('GET /analytics?group_by=mesin,day', get('/analytics?group_by=mesin,day'))
+    bench.run('GET /daily_stats', get('/daily_stats'))
+    bench.run('GET /daily_stats?group_by=mesin,operator', get('/daily_stats?group_by=mesin,operator'))
+    bench.run('GET /export_csv/jobs', get('/export_csv/jobs'), repeat=export_repeat)
+    bench.run('GET /export_excel/jobs', get('/export_excel/jobs'), repeat=export_repeat)
+    bench.run('GET /export_csv/history', get('/export_csv/history'), repeat=export_repeat)
+    bench.run('GET /export_excel/history', get('/export_excel/history'), repeat=export_repeat)
+
+    print("\n✏️  Write routes:")
+    bench.run('POST /add_job', post('/add_job', job))
+    if queued:
+        bench.run('POST /edit_job', post(f'/edit_job/{queued[-1]}', dict(job, REMARK='bench')))
+        bench.run('POST /jobs/<id>/move', post(f'/jobs/{queued[-1]}/move', {'position': 'first'}))
+        bench.run('POST /jobs/reorder', post('/jobs/reorder', {'mesin': mesin, 'order': queued[::-1]}))
+    bench.run('POST /jobs/bulk (100 jobs)', post('/jobs/bulk', [job] * 100))
+    bench.run('POST /jobs/bulk/update (100 jobs)',
+              lambda: ('POST', '/jobs/bulk/update', {'json': [
+                  {'id': row.id, 'REMARK': 'bench'}
+                  for row in bench.query(select(Job.id).where(Job.job_type == 'next').limit(100))
+              ]}))
+
+    def finishable(limit):
+        """Current jobs with a FINISH time (set untimed where missing)"""
+        ids = [row.id for row in bench.query(
+            select(Job.id).where(Job.job_type == 'current').order_by(Job.id).limit(limit)
+        )]
+        bench.write(update(Job).where(Job.id.in_(ids), Job.FINISH.is_(None))
+                    .values(START='01/02 - 08:00', FINISH='01/02 - 12:00'))
+        return ids
+
+    bench.run('POST /finish_job', lambda: ('POST', f'/finish_job/{finishable(1)[0]}', {}))
+    bench.run('POST /jobs/bulk/finish (20 jobs)', lambda: ('POST', '/jobs/bulk/finish', {'json': finishable(20)}))
+
+    created = []
+
+    def new_machine():
+        name = f'BENCH{len(created) + 1}'
+        created.append(name)
+        return ('POST', '/machines', {'json': {'name': name, 'hall': 'BENCH'}})
+
+    def machine_id(name):
+        return bench.query(select(Machine.id).where(Machine.name == name))[0][0]
+
+    def delete_machine():
+        return ('DELETE', f'/machines/{machine_id(created.pop())}', {})
+
+    bench.run('POST /machines', new_machine)
+    bench.run('POST /machines/<id>', lambda: ('POST', f'/machines/{machine_id(created[-1])}', {'json': {'line': 'L1'}}))
+    bench.run('DELETE /machines/<id>', delete_machine)
+    bench.run('DELETE /clear_history', lambda: ('DELETE', '/clear_history', {}), repeat=1)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(previous, current):
+    """Print p50/p99 of this run against an earlier JSON result"""
+    print(f"\n🔍 COMPARED WITH {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+    for name, result in current['routes'].items():
+        before = previous['routes'].get(name)
+        if not before:
+            print(f"   • {name}: new")
+            continue
+        changes = []
+        for key in ('p50_ms', 'p99_ms', 'peak_kb'):
+            change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            changes.append(f"{key} {before[key]:,.2f} → {result[key]:,.2f} ({change:+.0f}%)")
+        print(f"   • {name}: " + ', '.join(changes))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--machines', type=int, default=100)
+    parser.add_argument('--halls', type=int, default=4)
+    parser.add_argument('--lines', type=int, default=5, help='lines per hall')
+    parser.add_argument('--queue-depth', type=int, default=20)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--jobs-per-day', type=float, default=3)
+    parser.add_argument('--repeat', type=int, default=30, help='requests per case')
+    parser.add_argument('--export-repeat', type=int, default=3, help='requests per export/fresh-analytics case')
+    parser.add_argument('--database-url', help='benchmark an existing database instead of generating one '
+                                               '(write routes change it)')
+    parser.add_argument('--output', default='bench_routes.json')
+    parser.add_argument('--compare', help='earlier JSON result to compare against')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    url = args.database_url or f"sqlite:///{os.path.join(tmp, 'routes.db')}"
+    # Tasks run inline so DELETE /clear_history is timed with its work
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'EVENT_SYNC_INTERVAL': 0, 'TASK_WORKERS': 0})
+
+    if not args.database_url:
+        print("🔄 Generating benchmark data...")
+        with app.app_context():
+            generate_dummy_jobs(seed=args.seed, machines=args.machines, halls=args.halls, lines=args.lines,
+                                queue_depth=args.queue_depth, days=args.years * 365,
+                                jobs_per_day=args.jobs_per_day)
+    with app.app_context():
+        rows = {
+            'machines': db.session.scalar(select(func.count()).select_from(Machine)),
+            'jobs': db.session.scalar(select(func.count()).select_from(Job)),
+            'history': db.session.scalar(select(func.count()).select_from(History)),
+        }
+
+    bench = Harness(app, args.repeat)
+    run_cases(bench, args.export_repeat)
+
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': url.split(':', 1)[0],
+            'rows': rows,
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        'routes': bench.results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+    errors = sum(route['errors'] for route in bench.results.values())
+    if errors:
+        print(f"❌ {errors} requests failed")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
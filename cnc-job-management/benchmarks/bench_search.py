@@ -0,0 +1,95 @@
+"""Latency of /search: FTS5 index against an ILIKE scan
+
+Fills a throwaway database with generate_dummy (seeded), gives a few random
+History rows a rare remark (a customer part number, the needle supervisors
+look for) and times the first result page of some searches three ways:
+
+    fts rank      FTS5 MATCH, best bm25 rank first (sort=rank, the default)
+    fts recent    FTS5 MATCH, newest first (sort=recent)
+    ilike         every term matched with ILIKE over the four columns, newest
+                  first (what /search does without FTS5)
+
+The response cache is bypassed: every timing runs the query.
+
+    python benchmarks/bench_search.py --machines 200 --days 500 --jobs-per-day 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import func, select, update
+
+from app import create_app, db, search_results, History
+from generate_dummy import generate_dummy_jobs
+from search import search_terms
+
+# Remark given to --needles random History rows
+NEEDLE_REMARK = 'Customer PN-48213 rework'
+
+# Searches timed, as (label, q, field)
+SEARCHES = [
+    ('part number', 'pn-48213', None),
+    ('remark phrase', 'tool wear', None),
+    ('prefix in PART', 'sha', 'PART'),
+    ('operator + remark', 'budi rush', None),
+]
+
+def measure(app, q, field, sort, limit, repeat):
+    """(median ms, results) of the first page of a search"""
+    timings = []
+    with app.test_request_context('/search', query_string={'q': q}):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = search_results(History, search_terms(q), field, sort, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(results)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--machines', type=int, default=200)
+    parser.add_argument('--days', type=float, default=500)
+    parser.add_argument('--jobs-per-day', type=float, default=10)
+    parser.add_argument('--needles', type=int, default=20, help='history rows given the part number remark')
+    parser.add_argument('--limit', type=int, default=20, help='results per page')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'search.db')}",
+                          'EVENT_SYNC_INTERVAL': 0, 'METRICS_ENABLED': False})
+        with app.app_context():
+            print("🔄 Generating benchmark data...")
+            generate_dummy_jobs(seed=args.seed, machines=args.machines, halls=1, lines=1, queue_depth=3,
+                                days=args.days, jobs_per_day=args.jobs_per_day)
+            rows = db.session.scalar(select(func.count()).select_from(History))
+            needles = random.Random(args.seed).sample(range(1, rows + 1), min(args.needles, rows))
+            db.session.execute(update(History).where(History.id.in_(needles)).values(REMARK=NEEDLE_REMARK))
+            db.session.commit()
+            if not app.extensions['search_index']:
+                print("⚠️ SQLite FTS5 is not available: only the ILIKE scan can be measured")
+
+            print(f"\n📊 RESULTS ({rows:,} history rows, median ms for the first {args.limit} results):")
+            for label, q, field in SEARCHES:
+                print(f"   • {label}: q={q!r}{f' field={field.lower()}' if field else ''}")
+                variants = [('ilike', 'recent', False)]
+                if app.extensions['search_index']:
+                    variants = [('fts rank', 'rank', True), ('fts recent', 'recent', True)] + variants
+                for name, sort, indexed in variants:
+                    saved, app.extensions['search_index'] = app.extensions['search_index'], indexed
+                    try:
+                        elapsed, found = measure(app, q, field, sort, args.limit, args.repeat)
+                    finally:
+                        app.extensions['search_index'] = saved
+                    print(f"       {name:<11} {elapsed:9.2f} ms  {found:>3} results")
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Payload size and CPU time of the job/history serializers
+
+Fills a throwaway database with generate_dummy (seeded) and encodes the same
+payloads four ways:
+
+    orm + to_dict     ORM objects, one to_dict() per row, Flask's JSON provider
+                      (the path /history_data and /dashboard_data used before)
+    records (json)    column projection, {column: value} rows, json module
+    records           column projection, {column: value} rows, serializer.dumps
+    columnar          column projection, {"columns", "rows"}, serializer.dumps
+
+For each it reports the median CPU time per payload (query + encoding), the
+body size and its gzip size.
+
+    python benchmarks/bench_serializer.py --page-size 500 --queue-depth 20
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import serializer
+from app import create_app, build_dashboard_data, db, project_rows, Job, History
+from generate_dummy import generate_dummy_jobs
+from serializer import COLUMNAR, RECORDS, dumps, serialize_rows
+
+def history_page(fmt, limit):
+    """One /history_data page of jobs through the projection serializer"""
+    query = History.query.order_by(History.id.desc()).limit(limit)
+    return dumps({'jobs': serialize_rows(History.SERIALIZED_FIELDS, project_rows(query, History), fmt)})
+
+def history_page_orm(app, limit):
+    """One /history_data page of jobs through ORM objects and to_dict()"""
+    jobs = History.query.order_by(History.id.desc()).limit(limit).all()
+    return app.json.dumps({'jobs': [job.to_dict() for job in jobs]}).encode('utf-8')
+
+def dashboard_orm(app):
+    """The whole dashboard through ORM objects and to_dict()"""
+    dashboard = {}
+    for job in Job.query.filter(Job.job_type.in_(['current', 'next'])).order_by(Job.mesin, Job.queue_pos, Job.id):
+        machine = dashboard.setdefault(job.mesin, {'current': None, 'next_jobs': [], 'total_jobs': 0})
+        if job.job_type == 'current':
+            if machine['current'] is not None:
+                continue
+            machine['current'] = job.to_dict()
+        else:
+            machine['next_jobs'].append(job.to_dict())
+        machine['total_jobs'] += 1
+    return app.json.dumps(dashboard).encode('utf-8')
+
+def stdlib_json(build):
+    """build() with serializer.dumps falling back to the json module"""
+    def run():
+        saved, serializer.orjson = serializer.orjson, None
+        try:
+            return build()
+        finally:
+            serializer.orjson = saved
+    return run
+
+def measure(build, repeat):
+    """(median CPU ms, body bytes, gzip bytes) of a payload builder"""
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        body = build()
+        timings.append((time.process_time() - started) * 1000)
+    return statistics.median(timings), len(body), len(gzip.compress(body))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--machines', type=int, default=100)
+    parser.add_argument('--queue-depth', type=int, default=20)
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--jobs-per-day', type=float, default=3)
+    parser.add_argument('--page-size', type=int, default=500, help='history rows per payload')
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'serializer.db')}",
+                          'EVENT_SYNC_INTERVAL': 0, 'METRICS_ENABLED': False})
+        with app.app_context():
+            print("🔄 Generating benchmark data...")
+            generate_dummy_jobs(seed=args.seed, machines=args.machines, halls=1, lines=1,
+                                queue_depth=args.queue_depth, days=args.days,
+                                jobs_per_day=args.jobs_per_day)
+
+            payloads = {
+                f'history page ({args.page_size} rows)': {
+                    'orm + to_dict': lambda: history_page_orm(app, args.page_size),
+                    'records (json)': stdlib_json(lambda: history_page(RECORDS, args.page_size)),
+                    'records': lambda: history_page(RECORDS, args.page_size),
+                    'columnar': lambda: history_page(COLUMNAR, args.page_size),
+                },
+                f'dashboard ({args.machines} machines)': {
+                    'orm + to_dict': lambda: dashboard_orm(app),
+                    'records (json)': stdlib_json(lambda: dumps(build_dashboard_data())),
+                    'records': lambda: dumps(build_dashboard_data()),
+                    'columnar': lambda: dumps(build_dashboard_data(fmt=COLUMNAR)),
+                },
+            }
+
+            encoder = 'orjson' if serializer.orjson else 'json (orjson not installed)'
+            print(f"\n📊 RESULTS (median CPU ms, bytes, gzip bytes; serializer.dumps = {encoder}):")
+            for payload, variants in payloads.items():
+                print(f"   • {payload}")
+                baseline = None
+                for name, build in variants.items():
+                    cpu_ms, size, gzipped = measure(build, args.repeat)
+                    if baseline is None:
+                        baseline = (cpu_ms, size, gzipped)
+                        change = ''
+                    else:
+                        change = (f"  ({cpu_ms / baseline[0]:.2f}x CPU, {size / baseline[1]:.0%} bytes, "
+                                  f"{gzipped / baseline[2]:.0%} gzip)")
+                    print(f"       {name:<15} {cpu_ms:8.2f} ms {size:>10,} B {gzipped:>9,} B{change}")
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
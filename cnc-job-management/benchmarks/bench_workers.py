@@ -0,0 +1,131 @@
+"""Requests/sec as gunicorn workers scale from 1 to N
+
+Seeds a throwaway database, starts `gunicorn wsgi:app` with 1, 2, ... N
+workers and drives a fixed mix of read and write requests from a pool of
+client threads for a few seconds per step.
+
+    pip install gunicorn
+    python benchmarks/bench_workers.py --max-workers 4 --duration 10
+    DATABASE_URL=postgresql://... python benchmarks/bench_workers.py
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def seed(env, jobs):
+    """Create the schema and some jobs/history in the benchmark database"""
+    script = (
+        "from app import create_app, db, Job, History\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    row = dict(job_type='next', MODEL='MODEL-A1', PART='SHAFT', SIZE='10x20', ETC_H='4 H',\n"
+        "               OPERATOR='JONI', START='01/02 - 08:00', FINISH='01/02 - 12:00', ACHIEVEMENT=100.0)\n"
+        f"    db.session.execute(db.insert(Job), [dict(row, mesin=f'CNC{{i % 5 + 1}}') for i in range({jobs})])\n"
+        f"    db.session.execute(db.insert(History), [dict(row, mesin=f'CNC{{i % 5 + 1}}') for i in range({jobs * 10})])\n"
+        "    db.session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, check=True)
+
+def wait_ready(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn did not start')
+
+def drive(port, duration, clients, write_ratio):
+    """Run the request mix for `duration` seconds and return requests/sec"""
+    counts = []
+    deadline = time.time() + duration
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        done = 0
+        while time.time() < deadline:
+            if random.random() < write_ratio:
+                body = json.dumps({
+                    'mesin': f'CNC{random.randint(1, 5)}', 'job_type': 'next', 'MODEL': 'MODEL-B2',
+                    'PART': 'GEAR', 'SIZE': '15x30', 'ETC_H': '3 H', 'OPERATOR': 'DONI',
+                })
+                conn.request('POST', '/add_job', body, {'Content-Type': 'application/json'})
+            elif random.random() < 0.5:
+                conn.request('GET', '/dashboard_data')
+            else:
+                conn.request('GET', '/history_data?limit=50')
+            conn.getresponse().read()
+            done += 1
+        counts.append(done)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / duration
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument('--jobs', type=int, default=200)
+    args = parser.parse_args()
+
+    if not shutil.which('gunicorn'):
+        raise SystemExit('gunicorn is not installed: pip install gunicorn')
+
+    env = dict(os.environ, WEB_THREADS='4')
+    tmp = None
+    if 'DATABASE_URL' not in env:
+        tmp = tempfile.mkdtemp()
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    seed(env, args.jobs)
+
+    print(f"🏁 {args.clients} clients, {args.write_ratio:.0%} writes, {args.duration:.0f}s per step")
+    results = {}
+    for workers in range(1, args.max_workers + 1):
+        port = free_port()
+        server = subprocess.Popen(
+            ['gunicorn', '-c', 'gunicorn.conf.py', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+             '--access-logfile', '/dev/null', 'wsgi:app'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port)
+            results[workers] = drive(port, args.duration, args.clients, args.write_ratio)
+            print(f"   • {workers} worker(s): {results[workers]:,.0f} req/s")
+        finally:
+            server.terminate()
+            server.wait()
+
+    if tmp:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    base = results[1]
+    print("\n📊 SCALING:")
+    for workers, rate in results.items():
+        print(f"   • {workers}: {rate / base:.2f}x")
+
+if __name__ == '__main__':
+    main()
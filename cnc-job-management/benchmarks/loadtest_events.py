@@ -0,0 +1,112 @@
+"""Fan-out latency load test for the /events stream
+
+Opens N concurrent SSE connections against an in-process server, publishes
+events through the broker and reports how long each takes to reach every
+client.
+
+    python benchmarks/loadtest_events.py --clients 500 --events 20
+    python benchmarks/loadtest_events.py --clients 500 --events 20 --gevent
+"""
+import argparse
+import os
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.05, help='seconds between events')
+    parser.add_argument('--gevent', action='store_true', help='serve and connect with gevent')
+    return parser.parse_args()
+
+args = parse_args()
+
+if args.gevent:
+    from gevent import monkey
+    monkey.patch_all()
+
+import http.client
+import json
+import logging
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+from events import broker
+
+app = create_app()
+
+def start_server():
+    """Start the app on a free local port and return the port"""
+    if args.gevent:
+        from gevent.pywsgi import WSGIServer
+        server = WSGIServer(('127.0.0.1', 0), app, log=None)
+        server.start()
+        return server.server_port
+
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.port
+
+def client(port, latencies, ready, expected):
+    """Read the stream and record the delivery latency of each test event"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', '/events')
+    response = conn.getresponse()
+    ready.release()
+
+    received = 0
+    event = None
+    while received < expected:
+        line = response.fp.readline().decode().rstrip('\n')
+        if line.startswith('event: '):
+            event = line[7:]
+        elif line.startswith('data: ') and event == 'loadtest':
+            latencies.append(time.perf_counter() - json.loads(line[6:])['sent'])
+            received += 1
+    conn.close()
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    """Main function"""
+    port = start_server()
+    latencies = []
+    ready = threading.Semaphore(0)
+
+    print(f"🔌 Opening {args.clients} SSE connections ({'gevent' if args.gevent else 'threads'})...")
+    workers = [
+        threading.Thread(target=client, args=(port, latencies, ready, args.events), daemon=True)
+        for _ in range(args.clients)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+    while broker.subscriber_count < args.clients:
+        time.sleep(0.01)
+
+    print(f"📣 Publishing {args.events} events...")
+    for _ in range(args.events):
+        broker.publish('loadtest', {'sent': time.perf_counter()})
+        time.sleep(args.interval)
+
+    for worker in workers:
+        worker.join(timeout=30)
+
+    expected = args.clients * args.events
+    print("\n📊 FAN-OUT LATENCY:")
+    print(f"   • Delivered: {len(latencies)}/{expected}")
+    if latencies:
+        print(f"   • p50: {percentile(latencies, 50) * 1000:.2f} ms")
+        print(f"   • p99: {percentile(latencies, 99) * 1000:.2f} ms")
+        print(f"   • max: {max(latencies) * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
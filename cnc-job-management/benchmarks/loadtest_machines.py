@@ -0,0 +1,111 @@
+"""Dashboard load test with a large machine registry
+
+Registers N machines spread over halls and lines, queues M jobs on each and
+measures /dashboard_data for the whole board and for a single hall: SQL
+statements per request, time to build a fresh snapshot, time to serve the
+cached snapshot and time for a 304 revalidation.
+
+    python benchmarks/loadtest_machines.py --machines 500 --jobs 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def timed(client, url, repeat, headers=None, before=None):
+    """Median milliseconds of `repeat` GETs (calling before() ahead of each one)"""
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = client.get(url, headers=headers or {})
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code in (200, 304), response.status_code
+    return statistics.median(samples), response
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--machines', type=int, default=500)
+    parser.add_argument('--jobs', type=int, default=20, help='queued jobs per machine')
+    parser.add_argument('--halls', type=int, default=5)
+    parser.add_argument('--lines', type=int, default=10, help='lines per hall')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'machines.db')}"
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from app import create_app, db, Job, Machine, bump_version
+    from sqlalchemy import event
+
+    app = create_app()
+    client = app.test_client()
+
+    print(f"🏭 Registering {args.machines} machines in {args.halls} halls...")
+    with app.app_context():
+        Machine.query.delete()
+        db.session.commit()
+    machines = [
+        {'name': f'CNC{i + 1:04d}', 'hall': f'HALL-{i % args.halls + 1}',
+         'line': f'L{i // args.halls % args.lines + 1}'}
+        for i in range(args.machines)
+    ]
+    result = client.post('/machines', json=machines).get_json()
+    assert result['success'], result
+
+    print(f"📦 Queueing {args.jobs} jobs per machine...")
+    with app.app_context():
+        db.session.execute(db.insert(Job), [
+            {'mesin': machine['name'], 'job_type': 'current' if position == 0 else 'next',
+             'MODEL': 'MODEL-A1', 'PART': 'SHAFT', 'SIZE': '10x20', 'START': '01/02 - 08:00',
+             'FINISH': '01/02 - 12:00', 'ETC_H': '4 H', 'OPERATOR': 'JONI', 'ACHIEVEMENT': 0.0}
+            for machine in machines for position in range(args.jobs)
+        ])
+        bump_version('jobs')
+        db.session.commit()
+        engine = db.engine
+
+    statements = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    fresh_statements = []
+
+    def invalidate():
+        # A write elsewhere: the next request has to rebuild its snapshot
+        if statements:
+            fresh_statements.append(len(statements))
+        with app.app_context():
+            bump_version('jobs')
+            db.session.commit()
+        statements.clear()
+
+    results = {}
+    for label, url in (('whole board', '/dashboard_data'), ('one hall', '/dashboard_data?hall=HALL-1')):
+        statements.clear()
+        fresh_statements.clear()
+        cold, response = timed(client, url, args.repeat, before=invalidate)
+        fresh_statements.append(len(statements))
+        board = response.get_json()
+        statements.clear()
+        warm, response = timed(client, url, args.repeat)
+        queries = len(statements) / args.repeat
+        etag = response.headers['ETag']
+        revalidate, _ = timed(client, url, args.repeat, headers={'If-None-Match': etag})
+        results[label] = (len(board), sum(m['total_jobs'] for m in board.values()),
+                          max(fresh_statements), queries, cold, warm, revalidate)
+
+    print(f"\n📊 RESULTS (median of {args.repeat} requests):")
+    for label, (machine_count, job_count, fresh, queries, cold, warm, revalidate) in results.items():
+        print(f"   • {label}: {machine_count} machines, {job_count} jobs")
+        print(f"       SQL statements per request: {fresh} fresh, {queries:.0f} cached")
+        print(f"       fresh snapshot: {cold:.1f} ms | cached: {warm:.1f} ms | 304: {revalidate:.1f} ms")
+
+if __name__ == '__main__':
+    main()
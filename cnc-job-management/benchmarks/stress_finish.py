@@ -0,0 +1,158 @@
+"""Concurrent finish_job stress test
+
+Seeds a throwaway SQLite database, then lets N threads finish jobs at the
+same time (many of them racing for the same current job) and checks that
+every machine still has exactly one current job while it has any jobs, that
+no job was archived twice, and that /changes replays in seq order: one
+finish per archived job, never two current jobs on a machine, ending in the
+same jobs as the table.
+
+    python benchmarks/stress_finish.py --writers 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=50)
+    parser.add_argument('--machines', type=int, default=5)
+    parser.add_argument('--queue-depth', type=int, default=40)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from app import create_app, db, Job, History, JobChange
+
+    app = create_app()
+
+    machines = [f'CNC{i}' for i in range(1, args.machines + 1)]
+    with app.app_context():
+        db.session.execute(db.insert(Job), [
+            {'mesin': machine, 'job_type': 'current' if position == 0 else 'next',
+             'MODEL': 'MODEL-A1', 'PART': 'SHAFT', 'SIZE': '10x20',
+             'START': '01/02 - 08:00', 'FINISH': '01/02 - 12:00', 'ETC_H': '4 H',
+             'OPERATOR': 'JONI', 'ACHIEVEMENT': 0.0}
+            for machine in machines for position in range(args.queue_depth)
+        ])
+        db.session.commit()
+        total_jobs = Job.query.count()
+
+    results = {'finished': 0, 'rejected': 0, 'errors': []}
+    lock = threading.Lock()
+
+    def writer():
+        client = app.test_client()
+        while True:
+            machine = random.choice(machines)
+            with app.app_context():
+                # Mostly race for the current job, sometimes finish a queued one
+                job_type = 'current' if random.random() < 0.8 else 'next'
+                job = Job.query.filter_by(mesin=machine, job_type=job_type).first()
+                if job is None and not Job.query.count():
+                    return
+                job_id = job.id if job else None
+            if job_id is None:
+                continue
+
+            result = client.post(f'/finish_job/{job_id}').get_json()
+            with lock:
+                if result['success']:
+                    results['finished'] += 1
+                elif 'sudah diselesaikan' in result['message'] or '404' in result['message']:
+                    results['rejected'] += 1
+                else:
+                    results['errors'].append(result['message'])
+
+    violations = []
+    done = threading.Event()
+
+    def monitor():
+        # Every committed state must have exactly one current job per busy machine
+        while not done.is_set():
+            with app.app_context():
+                counts = db.session.execute(
+                    db.select(Job.mesin, Job.job_type, db.func.count()).group_by(Job.mesin, Job.job_type)
+                ).all()
+            per_machine = {}
+            for machine, job_type, count in counts:
+                per_machine.setdefault(machine, {})[job_type] = count
+            for machine, types in per_machine.items():
+                if types.get('current', 0) != 1:
+                    violations.append((machine, types))
+            time.sleep(0.01)
+
+    print(f"🔥 {args.writers} writers finishing {total_jobs} jobs on {len(machines)} machines...")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    checker = threading.Thread(target=monitor)
+    checker.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    checker.join()
+
+    with app.app_context():
+        history_count = History.query.count()
+        remaining = Job.query.count()
+        finish_changes = JobChange.query.filter_by(kind='finish').count()
+        job_types = dict(db.session.execute(db.select(Job.id, Job.job_type)).all())
+
+    # The seeded rows were inserted directly: start from them and apply the log
+    replayed = {job_id: 'current' if (job_id - 1) % args.queue_depth == 0 else 'next' for job_id in range(1, total_jobs + 1)}
+    mesin = {job_id: machines[(job_id - 1) // args.queue_depth] for job_id in replayed}
+    replay_errors = []
+    since, has_more = 0, True
+    client = app.test_client()
+    while has_more:
+        page = client.get(f'/changes?since={since}').get_json()
+        for change in page['changes']:
+            job_id = change['job_id']
+            if change['kind'] == 'finish':
+                if replayed.pop(job_id, None) is None:
+                    replay_errors.append(f"seq {change['seq']}: job {job_id} finished twice")
+                continue
+            replayed[job_id] = change['data']['job_type']
+            if change['data']['job_type'] == 'current':
+                current = [other for other, job_type in replayed.items()
+                           if job_type == 'current' and mesin[other] == mesin[job_id]]
+                if len(current) > 1:
+                    replay_errors.append(f"seq {change['seq']}: current jobs {current}")
+        since, has_more = page['next_since'], page['has_more']
+
+    print("\n📊 RESULTS:")
+    print(f"   • Finished: {results['finished']} in {elapsed:.1f}s ({results['finished'] / elapsed:.0f}/s)")
+    print(f"   • Rejected as already finished/changed: {results['rejected']}")
+    print(f"   • Errors: {len(results['errors'])} {results['errors'][:3]}")
+
+    print(f"   • Snapshots without exactly one current job: {len(violations)} {violations[:3]}")
+    print(f"   • Change log replay errors: {len(replay_errors)} {replay_errors[:3]}")
+
+    failures = []
+    if violations:
+        failures.append('machine without exactly one current job')
+    if results['errors']:
+        failures.append('unexpected errors')
+    if history_count != results['finished']:
+        failures.append(f'{history_count} history rows for {results["finished"]} finishes')
+    if history_count + remaining != total_jobs:
+        failures.append('jobs lost or duplicated')
+    if finish_changes != history_count:
+        failures.append(f'{finish_changes} finish changes for {history_count} history rows')
+    if replay_errors or replayed != job_types:
+        failures.append('change log does not replay to the jobs')
+
+    print("\n✅ Invariants hold" if not failures else f"\n❌ Invariants violated: {', '.join(failures)}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
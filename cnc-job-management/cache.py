@@ -0,0 +1,101 @@
+"""Read-through cache for JSON response bodies
+
+Backends share one small interface (get / set). MemoryCache, an in-process
+LRU with a TTL, is the default and the local stand-in for RedisCache, which
+shares entries between workers when CACHE_URL points at a Redis server.
+
+Entries are never invalidated in place: callers build keys from the data
+versions a body depends on, so a write makes the old entries unreachable and
+they age out of the LRU (or expire after the TTL).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Prefix of every key, bumped when the cached payloads change shape
+KEY_PREFIX = 'cnc:v1'
+
+class MemoryCache:
+    """Thread-safe in-process LRU whose entries expire after `ttl` seconds"""
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisCache:
+    """Entries shared by every worker through Redis (pip install redis)"""
+
+    def __init__(self, url, ttl=300):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_URL needs the redis package: pip install redis')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value):
+        self.client.set(key, value, ex=self.ttl)
+
+class ResponseCache:
+    """Named caches (job, navigation, history, ...) over one backend, with hit/miss counters"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        value = self.backend.get(f'{KEY_PREFIX}:{namespace}:{key}')
+        with self._lock:
+            counters = self.misses if value is None else self.hits
+            counters[namespace] = counters.get(namespace, 0) + 1
+        return value
+
+    def set(self, namespace, key, value):
+        self.backend.set(f'{KEY_PREFIX}:{namespace}:{key}', value)
+
+    def stats(self):
+        """{namespace: {'hits', 'misses', 'hit_rate'}} of this process"""
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            stats = {}
+            for namespace in namespaces:
+                hits = self.hits.get(namespace, 0)
+                misses = self.misses.get(namespace, 0)
+                stats[namespace] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 3)}
+            return stats
+
+def create_cache(config):
+    """ResponseCache for an app config (CACHE_URL, CACHE_TTL, CACHE_MAX_ENTRIES)"""
+    url = config.get('CACHE_URL')
+    if url and not url.startswith('memory://'):
+        return ResponseCache(RedisCache(url, config['CACHE_TTL']))
+    return ResponseCache(MemoryCache(config['CACHE_MAX_ENTRIES'], config['CACHE_TTL']))
@@ -0,0 +1,102 @@
+import itertools
+import json
+import queue
+import threading
+import time
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+class EventBroker:
+    """In-process publish/subscribe hub feeding the /events stream"""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        """Register a new subscriber and return its queue"""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        """Remove a subscriber queue"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber without blocking the writer"""
+        message = format_sse(event, data, next(self._ids))
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Slow client: drop its backlog and ask it to reload the full board
+                self._reset(q)
+
+    def _reset(self, q):
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(format_sse('reload', {}))
+
+    def stream(self, q, heartbeat=HEARTBEAT_INTERVAL):
+        """Yield SSE messages for a subscriber until the client disconnects"""
+        try:
+            # Tell EventSource to retry quickly after a dropped connection
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    yield q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(q)
+
+    def watch(self, fetch_version, interval):
+        """Publish 'reload' whenever fetch_version() changes
+
+        Deltas are only published by the process that made the write; with
+        several worker processes this background check lets every worker's
+        subscribers notice writes made elsewhere.
+        """
+        def run():
+            last = None
+            while True:
+                time.sleep(interval)
+                if not self._subscribers:
+                    last = None
+                    continue
+                try:
+                    version = fetch_version()
+                except Exception:
+                    continue
+                if last is not None and version != last:
+                    self.publish('reload', {})
+                last = version
+
+        threading.Thread(target=run, name='event-version-watch', daemon=True).start()
+
+def format_sse(event, data, event_id=None):
+    """Encode a single Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+broker = EventBroker()
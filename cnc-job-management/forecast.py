@@ -0,0 +1,293 @@
+"""Shift-aware ETA projection for the machine queues (NumPy)
+
+Three parts, none of them touching the database:
+
+ShiftCalendar   the hours machines run (shifts on working weekdays). Times
+                are mapped onto a "work clock" that only advances during
+                shifts, so adding N hours of work is an addition, and the
+                sum is mapped back to a wall-clock time.
+OverrunFactors  actual/target duration ratios of finished jobs per MODEL+PART,
+                MODEL and operator, shrunk towards the wider group when a
+                group has few jobs.
+project_queues  start and finish of every queued job of many machines in a
+                handful of vectorised passes: the current job finishes at its
+                START plus its expected hours (or now, when it has overrun),
+                each next job starts when the one before finishes.
+
+Times are naive local datetimes, like start_at/finish_at.
+"""
+import math
+import re
+
+import numpy as np
+
+# Seconds per day / hour
+DAY = 86400
+HOUR = 3600
+
+# Weekday names accepted in FORECAST_WORKDAYS (Monday = 0, as datetime.weekday())
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Days of calendar laid out per try; doubled until the queues fit, up to the horizon
+CALENDAR_DAYS = 32
+MAX_HORIZON_DAYS = 3660
+
+# Finished jobs a group needs before its own ratio counts as much as its parent group's
+PRIOR_JOBS = 5
+
+# Per-job ratios (and the resulting factors) are clamped to this range, so one job left
+# running over a weekend does not skew a whole model
+MIN_FACTOR = 0.25
+MAX_FACTOR = 4.0
+
+_SHIFT = re.compile(r'^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$')
+
+class ShiftCalendar:
+    """Working hours: shifts (minutes from midnight) on some weekdays
+
+    A shift ending at or before its start runs past midnight and belongs to
+    the day it starts on. The default is around the clock, every day.
+    """
+
+    def __init__(self, shifts=((0, 24 * 60),), workdays=range(7)):
+        shifts = sorted((int(start), int(end)) for start, end in shifts)
+        workdays = sorted(set(workdays))
+        if not shifts or not workdays:
+            raise ValueError('a shift calendar needs at least one shift and one working day')
+        for (start, end), (next_start, _) in zip(shifts, shifts[1:] + [(shifts[0][0] + 24 * 60, None)]):
+            if not 0 <= start < 24 * 60 or not start < end <= start + 24 * 60 or end > next_start:
+                raise ValueError(f'overlapping or invalid shift {start // 60:02d}:{start % 60:02d}')
+        self.shifts = shifts
+        self.workdays = workdays
+        self._begin = np.array([start * 60 for start, _ in shifts], dtype=np.int64)
+        self._end = np.array([end * 60 for _, end in shifts], dtype=np.int64)
+
+    @classmethod
+    def parse(cls, shifts='', workdays=''):
+        """Calendar from "07:00-15:00,15:00-23:00" and "mon-fri,sat" (empty: around the clock / every day)"""
+        parsed = []
+        for spec in filter(None, (part.strip() for part in (shifts or '').split(','))):
+            match = _SHIFT.match(spec)
+            if not match:
+                raise ValueError(f'invalid shift {spec!r} (expected HH:MM-HH:MM)')
+            start_h, start_m, end_h, end_m = map(int, match.groups())
+            start, end = start_h * 60 + start_m, end_h * 60 + end_m
+            if start >= 24 * 60 or end > 24 * 60 or start_m >= 60 or end_m >= 60:
+                raise ValueError(f'invalid shift {spec!r}')
+            parsed.append((start, end if end > start else end + 24 * 60))
+
+        days = set()
+        for spec in filter(None, (part.strip().lower() for part in (workdays or '').split(','))):
+            first, _, last = spec.partition('-')
+            if first not in WEEKDAYS or (last and last not in WEEKDAYS):
+                raise ValueError(f'invalid working days {spec!r} (expected e.g. mon-fri,sat)')
+            first, last = WEEKDAYS.index(first), WEEKDAYS.index(last or first)
+            days.update(day % 7 for day in range(first, last + (7 if last < first else 0) + 1))
+        return cls(parsed or ((0, 24 * 60),), days or range(7))
+
+    def to_dict(self):
+        def clock_time(minutes):
+            return f'{minutes // 60:02d}:{minutes % 60:02d}'
+        return {
+            'shifts': [f'{clock_time(start)}-{clock_time(end if end == 24 * 60 else end % (24 * 60))}' for start, end in self.shifts],
+            'workdays': [WEEKDAYS[day] for day in self.workdays],
+        }
+
+    def clock(self, first_day, days):
+        """WorkClock over ``days`` days from ``first_day`` (days since 1970-01-01)"""
+        day = first_day + np.arange(days, dtype=np.int64)
+        # 1970-01-01 was a Thursday
+        day = day[np.isin((day + 3) % 7, self.workdays)]
+        begin = (day[:, None] * DAY + self._begin).ravel()
+        end = (day[:, None] * DAY + self._end).ravel()
+        return WorkClock(begin, end)
+
+class WorkClock:
+    """Working seconds elapsed since the first shift of a laid-out calendar
+
+    ``begin``/``end`` are the shifts in seconds since 1970-01-01 (sorted, not
+    overlapping).
+    """
+
+    def __init__(self, begin, end):
+        self.begin = begin
+        self.end = end
+        self.after = np.cumsum(end - begin)
+        self.before = self.after - (end - begin)
+
+    @property
+    def capacity(self):
+        return self.after[-1] if len(self.after) else 0
+
+    def to_work(self, seconds):
+        """Work-clock positions of wall-clock times (seconds since 1970-01-01)"""
+        index = np.clip(np.searchsorted(self.begin, seconds, side='right') - 1, 0, None)
+        return self.before[index] + np.clip(seconds - self.begin[index], 0, self.end[index] - self.begin[index])
+
+    def to_time(self, work, start=False):
+        """Wall-clock times (seconds, NaN past the calendar) of work-clock positions
+
+        A position at the end of a shift is that shift's end for a finish,
+        and the next shift's begin for a ``start``.
+        """
+        index = np.searchsorted(self.after, work, side='right' if start else 'left')
+        inside = index < len(self.after)
+        index = np.minimum(index, len(self.after) - 1)
+        return np.where(inside, self.begin[index] + (work - self.before[index]), np.nan)
+
+class OverrunFactors:
+    """Expected hours of a job from the finished jobs of its MODEL+PART, MODEL and operator
+
+    Fed with sums per (MODEL, PART, OPERATOR); add() can be called again with
+    the sums of newer jobs only.
+    """
+
+    def __init__(self):
+        self._sums = {}
+        self._levels = None
+        self._factors = {}
+        self.jobs = 0
+
+    def copy(self):
+        """Independent copy (add() to it while this one is being read)"""
+        copied = OverrunFactors()
+        copied._sums = {key: list(sums) for key, sums in self._sums.items()}
+        copied.jobs = self.jobs
+        return copied
+
+    def add(self, rows):
+        """Add rows of (MODEL, PART, OPERATOR, measured jobs, actual hours, target hours, timed jobs, timed hours)
+
+        Measured jobs have a duration and a target (actual hours clamped to
+        MAX_FACTOR x target); timed jobs have a duration.
+        """
+        for model, part, operator, *values in rows:
+            sums = self._sums.setdefault((model, part, operator), [0, 0.0, 0.0, 0, 0.0])
+            for index, value in enumerate(values):
+                sums[index] += value or 0
+            self.jobs += values[3] or 0
+        self._levels = None
+        self._factors = {}
+
+    def _build(self):
+        levels = {'model_part': {}, 'model': {}, 'operator': {}, 'all': {}}
+        for (model, part, operator), sums in self._sums.items():
+            for level, key in (('model_part', (model, part)), ('model', model), ('operator', operator), ('all', None)):
+                total = levels[level].setdefault(key, [0, 0.0, 0.0, 0, 0.0])
+                for index, value in enumerate(sums):
+                    total[index] += value
+        self._levels = levels
+        return levels
+
+    def _lookup(self, level, key):
+        levels = self._levels or self._build()
+        return levels[level].get(key) or [0, 0.0, 0.0, 0, 0.0]
+
+    @staticmethod
+    def _shrink(ratio, jobs, prior):
+        return (jobs * ratio + PRIOR_JOBS * prior) / (jobs + PRIOR_JOBS)
+
+    def factor(self, model, part, operator):
+        """Actual/target ratio expected for a job (1.0 without history)"""
+        key = (model, part, operator)
+        if key not in self._factors:
+            self._factors[key] = self._factor(model, part, operator)
+        return self._factors[key]
+
+    def _factor(self, model, part, operator):
+        overall = self._lookup('all', None)
+        base = overall[1] / overall[2] if overall[2] else 1.0
+        factor = base
+        for level, key in (('model', model), ('model_part', (model, part))):
+            measured, actual, target = self._lookup(level, key)[:3]
+            if target:
+                factor = self._shrink(actual / target, measured, factor)
+        measured, actual, target = self._lookup('operator', operator)[:3]
+        if target and base:
+            factor *= self._shrink(actual / target / base, measured, 1.0)
+        return min(max(factor, MIN_FACTOR), MAX_FACTOR)
+
+    def expected(self, model, part, operator, target_h):
+        """(expected hours, factor) of a job; without a target the mean duration of its group (None if unknown)"""
+        if target_h is not None and target_h > 0:
+            factor = self.factor(model, part, operator)
+            return target_h * factor, factor
+        for level, key in (('model_part', (model, part)), ('model', model), ('all', None)):
+            timed, hours = self._lookup(level, key)[3:]
+            if timed:
+                return hours / timed, None
+        return None, None
+
+def to_seconds(values):
+    """Seconds since 1970-01-01 of naive datetimes (NaN for None)"""
+    stamps = np.array(values, dtype='datetime64[us]')
+    seconds = stamps.astype(np.int64) / 1e6
+    seconds[np.isnat(stamps)] = np.nan
+    return seconds
+
+def to_datetimes(seconds):
+    """Naive datetimes (None for NaN) of seconds since 1970-01-01, to the second"""
+    seconds = np.asarray(seconds, dtype=float)
+    missing = np.isnan(seconds)
+    stamps = np.where(missing, 0, np.round(seconds)).astype(np.int64).astype('datetime64[s]')
+    stamps[missing] = np.datetime64('NaT')
+    return stamps.tolist()
+
+def project_queues(calendar, now, machine, current, started, hours):
+    """Projected start, finish and remaining work hours of queued jobs
+
+    Jobs are grouped by ``machine`` (any integer code) in queue order, a
+    machine's current job (``current``) first. ``started`` is the START of
+    current jobs as seconds since 1970-01-01 (NaN if unknown: it starts
+    now), ``hours`` the expected hours (NaN counts as 0). Returns arrays of
+    start and finish (seconds, NaN past MAX_HORIZON_DAYS), work hours from
+    now until each finish, and whether a current job has already overrun.
+    """
+    machine = np.asarray(machine)
+    current = np.asarray(current, dtype=bool)
+    started = np.asarray(started, dtype=float)
+    duration = np.nan_to_num(np.asarray(hours, dtype=float)) * HOUR
+    now = float(now)
+    count = len(machine)
+    if not count:
+        empty = np.empty(0)
+        return empty, empty, empty, np.empty(0, dtype=bool)
+
+    known = current & ~np.isnan(started)
+    earliest = min(now, started[known].min()) if known.any() else now
+    first_day = math.floor(earliest / DAY) - 1
+    days = CALENDAR_DAYS
+    while True:
+        clock = calendar.clock(first_day, days)
+        now_work = clock.to_work(now)
+        needed = max(now_work, clock.to_work(started[known]).max() if known.any() else 0) + duration.sum()
+        if clock.capacity > needed or days >= MAX_HORIZON_DAYS:
+            break
+        days = min(days * 2, MAX_HORIZON_DAYS)
+
+    # Machines in order of appearance: group[i] is the machine of job i as 0..n-1
+    first = np.r_[True, machine[1:] != machine[:-1]]
+    group = np.cumsum(first) - 1
+    starts = np.flatnonzero(first)
+
+    # Current jobs: from their START (or now) for their expected hours, but not before now
+    start_work = np.full(count, now_work)
+    start_work[known] = clock.to_work(started[known])
+    finish_work = start_work + duration
+    overdue = current & known & (finish_work < now_work)
+    finish_work = np.where(current, np.maximum(finish_work, now_work), finish_work)
+
+    # Next jobs: one after the other from the machine's current finish (or now)
+    base = np.full(len(starts), now_work)
+    base[group[current]] = finish_work[current]
+    queued = np.where(current, 0.0, duration)
+    before = np.cumsum(queued) - queued
+    before -= before[starts][group]
+    start_work = np.where(current, start_work, base[group] + before)
+    finish_work = np.where(current, finish_work, start_work + queued)
+
+    start = clock.to_time(start_work, start=True)
+    start[known] = started[known]
+    finish = clock.to_time(finish_work)
+    remaining = (finish_work - now_work) / HOUR
+    return start, finish, remaining, overdue
@@ -1,9 +1,26 @@
+"""Dummy data generator
+
+Fills the database with a seeded, reproducible data set: registered machines
+spread over halls and lines, a queue of jobs on every machine and days (or
+years) of finished history. Rows are written with bulk INSERTs in batches, so
+millions of history rows take seconds rather than minutes.
+
+    python generate_dummy.py                     # small demo set on the registered machines
+    python generate_dummy.py --seed 1 --machines 200 --halls 4 --queue-depth 20 --years 3 --jobs-per-day 4
+
+Dates are relative to --now; with --seed it defaults to SEEDED_NOW, so a seed
+gives the same data set on any day.
+"""
+import argparse
 import random
+import time
 from datetime import datetime, timedelta
-from app import app, db, Job, History
+from sqlalchemy import delete, func, select
+from app import (create_app, db, Job, History, Machine, DailyStats, bump_version, bump_jobs_version,
+                 bump_history_version, clear_archive, job_hours, log_job_changes, rebuild_daily_stats,
+                 remove_archive_files, reset_job_changes)
 
 # Sample data
-MACHINES = ['CNC1', 'CNC2', 'CNC3', 'CNC4', 'CNC5']
 OPERATORS = ['JONI', 'DONI', 'NANI', 'SARI', 'BUDI', 'ANDI', 'RINI', 'TONO']
 MODELS = ['MODEL-A1', 'MODEL-B2', 'MODEL-C3', 'MODEL-D4', 'MODEL-E5', 'MODEL-F6']
 PARTS = ['SHAFT', 'GEAR', 'HOUSING', 'BRACKET', 'PLATE', 'COVER', 'BASE', 'FLANGE']
@@ -20,11 +37,20 @@ REMARKS = [
     ''
 ]
 
-def generate_random_datetime(days_offset=0, hour_range=(6, 22)):
+# Run times of finished jobs: 2 to 10 hours in quarter-hour steps
+DURATIONS = [timedelta(minutes=minutes) for minutes in range(120, 601, 15)]
+
+# Rows per bulk INSERT (and per commit)
+INSERT_BATCH_SIZE = 50000
+
+# "Now" of a seeded data set unless --now is given
+SEEDED_NOW = datetime(2025, 1, 1, 12, 0)
+
+def generate_random_datetime(rng, now, days_offset=0, hour_range=(6, 22)):
     """Generate random datetime within specified range"""
-    base_date = datetime.now() + timedelta(days=days_offset)
-    random_hour = random.randint(hour_range[0], hour_range[1])
-    random_minute = random.randint(0, 59)
+    base_date = now + timedelta(days=days_offset)
+    random_hour = rng.randint(hour_range[0], hour_range[1])
+    random_minute = rng.randint(0, 59)
     
     return base_date.replace(hour=random_hour, minute=random_minute, second=0, microsecond=0)
 
@@ -32,154 +58,243 @@ def format_datetime(dt):
     """Format datetime to DD/MM - HH:MM"""
     return dt.strftime("%d/%m - %H:%M")
 
-def calculate_achievement(start_dt, finish_dt, etc_h):
-    """Calculate achievement percentage"""
-    if not start_dt or not finish_dt:
-        return 0.0
+def register_machines(count, halls=1, lines=1):
+    """Make sure CNC1..CNC<count> are registered; returns the machine names to fill
     
-    duration_hours = (finish_dt - start_dt).total_seconds() / 3600
-    target_hours = float(etc_h.replace(' H', ''))
+    Without a count the current registry is used as it is. With more than one
+    hall (or line) new machines are spread round-robin over HALL-n / Ln.
+    """
+    registered = {machine.name: machine for machine in Machine.query.order_by(Machine.id)}
+    if not count:
+        return list(registered)
     
-    if duration_hours <= target_hours:
-        return 100.0
-    else:
-        return max(0.0, 100.0 - ((duration_hours - target_hours) / target_hours * 100))
+    names = [f'CNC{i}' for i in range(1, count + 1)]
+    grouped = halls > 1 or lines > 1
+    missing = [
+        {'name': name,
+         'hall': f'HALL-{i % halls + 1}' if grouped else None,
+         'line': f'L{i // halls % lines + 1}' if grouped else None}
+        for i, name in enumerate(names) if name not in registered
+    ]
+    for offset in range(0, len(missing), INSERT_BATCH_SIZE):
+        db.session.execute(Machine.__table__.insert(), missing[offset:offset + INSERT_BATCH_SIZE])
+    bump_version('machines')
+    db.session.commit()
+    return names
 
-def generate_dummy_jobs():
-    """Generate dummy job data"""
-    print("🔄 Generating dummy job data...")
-    
-    with app.app_context():
-        # Clear existing data
-        print("🗑️  Clearing existing data...")
-        Job.query.delete()
-        History.query.delete()
+def insert_rows(table, rows, batch_size=INSERT_BATCH_SIZE):
+    """Bulk insert an iterable of row dicts in committed batches; returns the row count"""
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            written += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
         db.session.commit()
-        
-        jobs_created = 0
-        history_created = 0
-        
-        # Generate jobs for each machine
-        for machine in MACHINES:
-            # Generate 1 current job (50% chance)
-            if random.choice([True, False]):
-                start_dt = generate_random_datetime(days_offset=-1)
-                
-                # 70% chance to have finish time for current jobs
-                finish_dt = None
-                if random.random() < 0.7:
-                    finish_dt = start_dt + timedelta(hours=random.randint(2, 8))
-                
-                etc_h = random.choice(ETC_H_OPTIONS)
-                achievement = calculate_achievement(start_dt, finish_dt, etc_h) if finish_dt else 0.0
-                
-                current_job = Job(
-                    mesin=machine,
-                    job_type='current',
-                    MODEL=random.choice(MODELS),
-                    PART=random.choice(PARTS),
-                    SIZE=random.choice(SIZES),
-                    START=format_datetime(start_dt),
-                    FINISH=format_datetime(finish_dt) if finish_dt else None,
-                    ETC_H=etc_h,
-                    OPERATOR=random.choice(OPERATORS),
-                    ACHIEVEMENT=achievement,
-                    REMARK=random.choice(REMARKS)
-                )
-                
-                db.session.add(current_job)
-                jobs_created += 1
-                print(f"✅ Created current job for {machine}")
+        written += len(batch)
+    return written
+
+def queue_rows(rng, machines, queue_depth, now, tails=None, busy=()):
+    """Jobs on the board: a current job plus queued 'next' jobs per machine
+    
+    With --keep, ``tails`` (machine -> last queue_pos) and ``busy`` (machines
+    that have a current job) describe the kept jobs: new jobs join the end of
+    each queue, and a machine with a current job does not get a second one.
+    """
+    tails = tails or {}
+    for machine in machines:
+        tail = tails.get(machine, 0)
+        for position in range(queue_depth):
+            if position == 0 and machine in busy:
+                continue
+            start_dt = None
+            finish_dt = None
+            etc_h = rng.choice(ETC_H_OPTIONS)
             
-            # Generate 1-3 next jobs
-            next_job_count = random.randint(1, 3)
-            for i in range(next_job_count):
-                # Next jobs usually don't have start/finish times yet
-                start_dt = None
-                finish_dt = None
-                
+            if position == 0:
+                start_dt = generate_random_datetime(rng, now, days_offset=-1)
+                # 70% chance to have finish time for current jobs
+                if rng.random() < 0.7:
+                    finish_dt = start_dt + timedelta(hours=rng.randint(2, 8))
+            elif rng.random() < 0.2:
                 # 20% chance to have scheduled start time
-                if random.random() < 0.2:
-                    start_dt = generate_random_datetime(days_offset=random.randint(0, 2))
-                
-                etc_h = random.choice(ETC_H_OPTIONS)
-                
-                next_job = Job(
-                    mesin=machine,
-                    job_type='next',
-                    MODEL=random.choice(MODELS),
-                    PART=random.choice(PARTS),
-                    SIZE=random.choice(SIZES),
-                    START=format_datetime(start_dt) if start_dt else None,
-                    FINISH=format_datetime(finish_dt) if finish_dt else None,
-                    ETC_H=etc_h,
-                    OPERATOR=random.choice(OPERATORS),
-                    ACHIEVEMENT=0.0,
-                    REMARK=random.choice(REMARKS)
-                )
-                
-                db.session.add(next_job)
-                jobs_created += 1
-                print(f"✅ Created next job {i+1} for {machine}")
-        
-        # Generate some history data (completed jobs)
-        print("📚 Generating history data...")
-        for _ in range(random.randint(10, 20)):
-            start_dt = generate_random_datetime(days_offset=random.randint(-7, -1))
-            duration_hours = random.randint(2, 10)
-            finish_dt = start_dt + timedelta(hours=duration_hours)
-            etc_h = random.choice(ETC_H_OPTIONS)
-            achievement = calculate_achievement(start_dt, finish_dt, etc_h)
-            
-            history_job = History(
-                mesin=random.choice(MACHINES),
-                job_type=random.choice(['current', 'next']),
-                MODEL=random.choice(MODELS),
-                PART=random.choice(PARTS),
-                SIZE=random.choice(SIZES),
-                START=format_datetime(start_dt),
-                FINISH=format_datetime(finish_dt),
-                ETC_H=etc_h,
-                OPERATOR=random.choice(OPERATORS),
-                ACHIEVEMENT=achievement,
-                REMARK=random.choice(REMARKS)
-            )
-            
-            db.session.add(history_job)
-            history_created += 1
-        
-        # Commit all changes
-        try:
-            db.session.commit()
-            print(f"✅ Successfully created {jobs_created} jobs and {history_created} history records")
-            print("🎉 Dummy data generation completed!")
+                start_dt = generate_random_datetime(rng, now, days_offset=rng.randint(0, 2))
             
-            # Print summary
-            print("\n📊 SUMMARY:")
-            print(f"   • Active Jobs: {jobs_created}")
-            print(f"   • History Records: {history_created}")
-            print(f"   • Total Records: {jobs_created + history_created}")
-            
-            # Print machine status
-            print("\n🏭 MACHINE STATUS:")
-            for machine in MACHINES:
-                current_count = Job.query.filter_by(mesin=machine, job_type='current').count()
-                next_count = Job.query.filter_by(mesin=machine, job_type='next').count()
-                total = current_count + next_count
-                print(f"   • {machine}: {total} jobs (Current: {current_count}, Next: {next_count})")
-            
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ Error creating dummy data: {str(e)}")
-            raise
+            yield {
+                'mesin': machine,
+                'job_type': 'current' if position == 0 else 'next',
+                'queue_pos': tail + position if position else 0,
+                'MODEL': rng.choice(MODELS),
+                'PART': rng.choice(PARTS),
+                'SIZE': rng.choice(SIZES),
+                'START': format_datetime(start_dt) if start_dt else None,
+                'FINISH': format_datetime(finish_dt) if finish_dt else None,
+                'ETC_H': etc_h,
+                'OPERATOR': rng.choice(OPERATORS),
+                'REMARK': rng.choice(REMARKS),
+                'start_at': start_dt,
+                'finish_at': finish_dt,
+                **job_hours(start_dt, finish_dt, etc_h),
+            }
+
+def history_rows(rng, machines, days, jobs_per_day, now):
+    """Finished jobs, spread evenly over the `days` days before `now` on every machine"""
+    end = now.replace(second=0, microsecond=0)
+    per_machine = round(days * jobs_per_day)
+    if not per_machine:
+        return
+    slot = timedelta(days=days) / per_machine
+    
+    for machine in machines:
+        window_start = end - timedelta(days=days)
+        # Draw each column for the whole machine at once: rng.choices() is much cheaper per value
+        models = rng.choices(MODELS, k=per_machine)
+        parts = rng.choices(PARTS, k=per_machine)
+        sizes = rng.choices(SIZES, k=per_machine)
+        targets = rng.choices(ETC_H_OPTIONS, k=per_machine)
+        operators = rng.choices(OPERATORS, k=per_machine)
+        remarks = rng.choices(REMARKS, k=per_machine)
+        job_types = rng.choices(('current', 'next'), k=per_machine)
+        durations = rng.choices(DURATIONS, k=per_machine)
+        for i in range(per_machine):
+            finish_dt = (window_start + slot * (i + rng.random())).replace(second=0, microsecond=0)
+            start_dt = finish_dt - durations[i]
+            yield {
+                'mesin': machine,
+                'job_type': job_types[i],
+                'MODEL': models[i],
+                'PART': parts[i],
+                'SIZE': sizes[i],
+                'START': format_datetime(start_dt),
+                'FINISH': format_datetime(finish_dt),
+                'ETC_H': targets[i],
+                'OPERATOR': operators[i],
+                'REMARK': remarks[i],
+                'start_at': start_dt,
+                'finish_at': finish_dt,
+                **job_hours(start_dt, finish_dt, targets[i]),
+            }
+
+def generate_dummy_jobs(seed=None, machines=None, halls=1, lines=1, queue_depth=3,
+                        days=7, jobs_per_day=0.5, keep=False, batch_size=INSERT_BATCH_SIZE, now=None):
+    """Generate dummy job data (inside an app context); returns (jobs, history rows) created"""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    
+    if not keep:
+        # Clear existing data
+        print("🗑️  Clearing existing data...")
+        db.session.execute(delete(Job))
+        db.session.execute(delete(History))
+        db.session.execute(delete(DailyStats))
+        months = clear_archive()
+        # The change log cannot express the deletes: /changes consumers resync
+        bump_jobs_version()
+        reset_job_changes()
+        db.session.commit()
+        remove_archive_files(months)
+    
+    names = register_machines(machines, halls, lines)
+    print(f"🏭 {len(names)} machines")
+    
+    tails, busy = {}, set()
+    if keep:
+        # New jobs go after the kept queues, without a second current job
+        tails = dict(db.session.execute(
+            select(Job.mesin, func.max(Job.queue_pos)).where(Job.job_type == 'next').group_by(Job.mesin)
+        ).all())
+        busy = set(db.session.execute(select(Job.mesin).where(Job.job_type == 'current')).scalars())
+    
+    last_id = db.session.execute(select(func.max(Job.id))).scalar() or 0
+    started = time.perf_counter()
+    jobs_created = insert_rows(Job.__table__, queue_rows(rng, names, queue_depth, now, tails, busy), batch_size)
+    print(f"✅ Created {jobs_created:,} jobs in {time.perf_counter() - started:.1f}s")
+    
+    print("📚 Generating history data...")
+    started = time.perf_counter()
+    history_created = insert_rows(History.__table__, history_rows(rng, names, days, jobs_per_day, now), batch_size)
+    elapsed = time.perf_counter() - started
+    rate = f" ({history_created / elapsed:,.0f} rows/s)" if elapsed and history_created else ""
+    print(f"✅ Created {history_created:,} history records in {elapsed:.1f}s{rate}")
+    
+    bump_jobs_version()
+    # New jobs got ids past the kept ones; log them for /changes consumers
+    log_job_changes(
+        ('insert', row.id, dict(zip(Job.SERIALIZED_FIELDS, row)))
+        for row in db.session.execute(select(*Job.serialized_columns()).where(Job.id > last_id).order_by(Job.id))
+    )
+    bump_history_version()
+    db.session.commit()
+    
+    print("📈 Rebuilding daily rollups...")
+    started = time.perf_counter()
+    rollups = rebuild_daily_stats()
+    print(f"✅ {rollups:,} rollup rows in {time.perf_counter() - started:.1f}s")
+    return jobs_created, history_created
+
+def print_summary(jobs_created, history_created, limit=10):
+    """Print totals and the board of the first machines"""
+    print("\n📊 SUMMARY:")
+    print(f"   • Active Jobs: {jobs_created:,}")
+    print(f"   • History Records: {history_created:,}")
+    print(f"   • Total Records: {jobs_created + history_created:,}")
+    
+    counts = {}
+    for mesin, job_type, count in db.session.execute(
+        select(Job.mesin, Job.job_type, func.count()).group_by(Job.mesin, Job.job_type)
+    ):
+        counts.setdefault(mesin, {})[job_type] = count
+    
+    print("\n🏭 MACHINE STATUS:")
+    machines = [machine.name for machine in Machine.query.order_by(Machine.id).limit(limit)]
+    for machine in machines:
+        current_count = counts.get(machine, {}).get('current', 0)
+        next_count = counts.get(machine, {}).get('next', 0)
+        total = current_count + next_count
+        print(f"   • {machine}: {total} jobs (Current: {current_count}, Next: {next_count})")
+    remaining = Machine.query.count() - len(machines)
+    if remaining > 0:
+        print(f"   • ... and {remaining:,} more machines")
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, help='random seed, for a reproducible data set')
+    parser.add_argument('--machines', type=int, help='register and fill CNC1..CNCn (default: the current registry)')
+    parser.add_argument('--halls', type=int, default=1, help='halls to spread new machines over')
+    parser.add_argument('--lines', type=int, default=1, help='lines per hall')
+    parser.add_argument('--queue-depth', type=int, default=3, help='jobs per machine (1 current + n-1 next)')
+    parser.add_argument('--days', type=float, default=7, help='days of history')
+    parser.add_argument('--years', type=float, help='years of history (overrides --days)')
+    parser.add_argument('--jobs-per-day', type=float, default=0.5, help='finished jobs per machine per day')
+    parser.add_argument('--batch-size', type=int, default=INSERT_BATCH_SIZE)
+    parser.add_argument('--keep', action='store_true', help='append instead of clearing jobs and history')
+    parser.add_argument('--now', type=datetime.fromisoformat,
+                        help='date the data is generated around, YYYY-MM-DD[THH:MM] (default: today, SEEDED_NOW with --seed)')
+    args = parser.parse_args()
+    days = args.years * 365 if args.years is not None else args.days
+    now = args.now or (SEEDED_NOW if args.seed is not None else None)
+    
     print("🚀 CNC Job Management - Dummy Data Generator")
     print("=" * 50)
     
     try:
-        generate_dummy_jobs()
+        print("🔄 Generating dummy job data...")
+        app = create_app()
+        with app.app_context():
+            jobs_created, history_created = generate_dummy_jobs(
+                seed=args.seed, machines=args.machines, halls=args.halls, lines=args.lines,
+                queue_depth=args.queue_depth, days=days, jobs_per_day=args.jobs_per_day,
+                keep=args.keep, batch_size=args.batch_size, now=now,
+            )
+            print("🎉 Dummy data generation completed!")
+            print_summary(jobs_created, history_created)
+        
         print("\n✨ Ready to test the application!")
         print("   Run: python app.py")
         print("   Then visit: http://localhost:5000")
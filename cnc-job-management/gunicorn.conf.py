@@ -0,0 +1,36 @@
+"""Gunicorn settings, overridable through environment variables
+
+    WEB_CONCURRENCY   worker processes (default: 2 x CPU cores + 1)
+    WEB_THREADS       threads per worker (default 4)
+    WORKER_CLASS      gthread (default) or gevent for many /events streams
+    PORT              listen port (default 5000)
+
+Every open dashboard holds one /events stream, and a gthread worker gives each
+stream a thread for as long as it is open. The default config therefore serves
+at most WEB_CONCURRENCY x WEB_THREADS dashboards (and nothing else once they
+are all taken). To serve live dashboards, set WORKER_CLASS=gevent: a greenlet per stream, up to worker_connections (1000) per
+worker.
+"""
+import importlib.util
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = os.environ.get('WORKER_CLASS', 'gthread')
+if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+    raise SystemExit('WORKER_CLASS=gevent but gevent is not installed: pip install -r requirements.txt')
+
+# /events streams stay open; don't let the worker timeout kill idle ones
+timeout = 0 if worker_class == 'gevent' else 120
+keepalive = 5
+
+# Each worker builds its own app (and connection pool) after the fork
+preload_app = False
+
+# Live updates are published per process, so workers watch the shared version counter
+if workers > 1:
+    os.environ.setdefault('EVENT_SYNC_INTERVAL', '1')
+
+accesslog = '-'
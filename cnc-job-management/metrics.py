@@ -0,0 +1,266 @@
+"""Request and SQL instrumentation, exposed in Prometheus text format
+
+Every request records its latency (histogram per route), its status and the
+number and total time of the SQL statements it ran (SQLAlchemy cursor
+events). Statements slower than SLOW_QUERY_MS are logged. The registry is
+in-process: each gunicorn worker reports its own counters.
+"""
+import bisect
+import cProfile
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event
+from flask import g, has_request_context, request
+
+# Request latency buckets in seconds (+Inf is implied)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# SQL statements per request buckets, to spot N+1 query patterns
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Route label for requests that matched no URL rule (keeps label cardinality bounded)
+UNMATCHED_ROUTE = '<unmatched>'
+
+# Route label for SQL run outside a request (startup, background threads)
+BACKGROUND_ROUTE = '<background>'
+
+slow_query_log = logging.getLogger('cnc.slow_query')
+
+class Histogram:
+    """Cumulative-on-render bucket counts plus sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """(le, cumulative count) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            yield bound, total
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+class Metrics:
+    """Thread-safe registry of the request and SQL metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}        # (method, route) -> Histogram
+        self._requests = {}       # (method, route, status) -> count
+        self._query_counts = {}   # route -> Histogram of statements per request
+        self._queries = {}        # route -> statements
+        self._query_seconds = {}  # route -> seconds spent in SQL
+        self._slow_queries = {}   # route -> statements over the threshold
+
+    def observe_request(self, method, route, status, seconds, stats):
+        """Record a finished request and the SQL it ran (a RequestStats)"""
+        with self._lock:
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._query_counts.get(route)
+            if histogram is None:
+                histogram = self._query_counts[route] = Histogram(QUERY_COUNT_BUCKETS)
+            histogram.observe(stats.queries)
+            self._add_queries(route, stats.queries, stats.query_seconds, stats.slow_queries)
+
+    def observe_query(self, route, seconds, slow):
+        """Record one statement run outside a request"""
+        with self._lock:
+            self._add_queries(route, 1, seconds, int(slow))
+
+    def _add_queries(self, route, count, seconds, slow):
+        if count:
+            self._queries[route] = self._queries.get(route, 0) + count
+            self._query_seconds[route] = self._query_seconds.get(route, 0.0) + seconds
+        if slow:
+            self._slow_queries[route] = self._slow_queries.get(route, 0) + slow
+
+    def render(self, counters=()):
+        """All metrics in Prometheus text exposition format
+
+        ``counters`` adds counters kept elsewhere, as (name, help, [(labels, value)]).
+        """
+        with self._lock:
+            latency = {key: (list(h.samples()), h.sum) for key, h in self._latency.items()}
+            query_counts = {key: (list(h.samples()), h.sum) for key, h in self._query_counts.items()}
+            requests = dict(self._requests)
+            queries = dict(self._queries)
+            query_seconds = dict(self._query_seconds)
+            slow_queries = dict(self._slow_queries)
+
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, values, **labels):
+            samples, total = values
+            for bound, count in samples:
+                lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {count}')
+            lines.append(f'{name}_sum{_labels(**labels)} {total}')
+            lines.append(f'{name}_count{_labels(**labels)} {samples[-1][1]}')
+
+        header('cnc_http_request_duration_seconds', 'histogram', 'Request latency by route')
+        for (method, route), values in sorted(latency.items()):
+            histogram('cnc_http_request_duration_seconds', values, method=method, route=route)
+
+        header('cnc_http_requests_total', 'counter', 'Requests by route and status')
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'cnc_http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        header('cnc_db_queries_per_request', 'histogram', 'SQL statements run by one request')
+        for route, values in sorted(query_counts.items()):
+            histogram('cnc_db_queries_per_request', values, route=route)
+
+        header('cnc_db_queries_total', 'counter', 'SQL statements by route')
+        for route, count in sorted(queries.items()):
+            lines.append(f'cnc_db_queries_total{_labels(route=route)} {count}')
+
+        header('cnc_db_query_seconds_total', 'counter', 'Time spent in SQL statements by route')
+        for route, seconds in sorted(query_seconds.items()):
+            lines.append(f'cnc_db_query_seconds_total{_labels(route=route)} {seconds}')
+
+        header('cnc_db_slow_queries_total', 'counter', 'SQL statements slower than SLOW_QUERY_MS by route')
+        for route, count in sorted(slow_queries.items()):
+            lines.append(f'cnc_db_slow_queries_total{_labels(route=route)} {count}')
+
+        for name, text, samples in counters:
+            header(name, 'counter', text)
+            for labels, value in samples:
+                lines.append(f'{name}{_labels(**labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+class RequestStats:
+    """Timings of the request being served, kept in flask.g"""
+    __slots__ = ('started', 'route', 'queries', 'query_seconds', 'slow_queries')
+
+    def __init__(self, route):
+        self.started = time.perf_counter()
+        self.route = route
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries = 0
+
+def current_route():
+    """URL rule of the current request (e.g. /finish_job/<int:job_id>)"""
+    return request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE
+
+def instrument_engine(engine, slow_query_ms):
+    """Count and time every SQL statement of an engine, logging the slow ones"""
+    slow_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else float('inf')
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        slow = elapsed >= slow_seconds
+        stats = g.get('metrics_request') if has_request_context() else None
+        if stats is not None:
+            # Added to the registry once, when the request is recorded
+            stats.queries += 1
+            stats.query_seconds += elapsed
+            stats.slow_queries += slow
+            route = stats.route
+        else:
+            route = current_route() if has_request_context() else BACKGROUND_ROUTE
+            metrics.observe_query(route, elapsed, slow)
+        if slow:
+            slow_query_log.warning('Slow query (%.0f ms) in %s: %s', elapsed * 1000, route, ' '.join(statement.split())[:1000])
+
+def instrument_app(app, engine):
+    """Record request metrics for an app and the SQL of its engine
+
+    Settings: METRICS_ENABLED, SLOW_QUERY_MS, PROFILE_REQUESTS and PROFILE_DIR.
+    With PROFILE_REQUESTS on, a request with ?profile=1 runs under cProfile
+    and its stats are dumped to PROFILE_DIR (named in the X-Profile header).
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+    instrument_engine(engine, app.config['SLOW_QUERY_MS'])
+    profiling = app.config['PROFILE_REQUESTS']
+
+    @app.before_request
+    def start_request():
+        g.metrics_request = RequestStats(current_route())
+        if profiling and request.args.get('profile') == '1':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active (e.g. a concurrent profiled request)
+                return
+            g.metrics_profiler = profiler
+
+    @app.after_request
+    def finish_request(response):
+        stats = g.get('metrics_request')
+        if stats is None:
+            return response
+        # Shows up in the browser's network timing panel
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.query_seconds * 1000:.1f};desc="{stats.queries} queries", '
+            f'app;dur={(time.perf_counter() - stats.started) * 1000:.1f}'
+        )
+        profiler = g.pop('metrics_profiler', None)
+        if profiler:
+            profiler.disable()
+            os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+            path = os.path.join(
+                app.config['PROFILE_DIR'],
+                f"{request.endpoint or 'unmatched'}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof",
+            )
+            profiler.dump_stats(path)
+            response.headers['X-Profile'] = path
+
+        status = str(response.status_code)
+        if response.is_streamed and response.mimetype != 'text/event-stream':
+            # Exports: record once the body has been sent, with the SQL run while streaming
+            # (/events never finishes and is recorded at connect time instead)
+            response.response = _record_when_sent(response.response, request.method, status, stats)
+        else:
+            g.metrics_status = status
+        return response
+
+    @app.teardown_request
+    def record_request(error=None):
+        stats = g.get('metrics_request')
+        if stats is None or ('metrics_status' not in g and not error):
+            return
+        # Only once: stream_with_context bodies tear the request down a second time
+        g.pop('metrics_request')
+        status = '500' if error else g.metrics_status
+        metrics.observe_request(request.method, stats.route, status, time.perf_counter() - stats.started, stats)
+
+def _record_when_sent(body, method, status, stats):
+    """Pass a streamed body through, recording the request when it is done"""
+    try:
+        yield from body
+    finally:
+        metrics.observe_request(method, stats.route, status, time.perf_counter() - stats.started, stats)
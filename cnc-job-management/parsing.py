@@ -0,0 +1,146 @@
+"""Parsers for the legacy job strings: "DD/MM - HH:MM" times and "N H" targets
+
+The scalar parsers take the canonical 13 character layout apart by position
+(no strptime per call) and only hand other spellings ("1/2 - 3:04") to
+strptime. The batch parsers take sequences and return NumPy arrays: the
+canonical strings are decoded from their character codes in a few vectorised
+passes, so a batch costs about the same as one Python loop over it.
+
+29/02 is accepted: the year is only known once it has been inferred.
+"""
+import math
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+# Layout of the START/FINISH strings
+LEGACY_DATETIME_FORMAT = "%d/%m - %H:%M"
+
+# Last valid day per month (index 1-12) when the year is not known
+MAX_DAY = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# "DD/MM - HH:MM": positions of the digits (day, month, hour, minute pairs) and separators
+DIGIT_POSITIONS = [0, 1, 3, 4, 8, 9, 11, 12]
+SEPARATOR_POSITIONS = [2, 5, 6, 7, 10]
+SEPARATOR_CODES = [ord(char) for char in '/ - :']
+
+_NAT = np.datetime64('NaT', 'us')
+_INT64_MIN = np.iinfo(np.int64).min
+_INT64_MAX = np.iinfo(np.int64).max
+
+@lru_cache(maxsize=8192)
+def parse_day_time(value):
+    """(day, month, hour, minute) of a "DD/MM - HH:MM" string, or None if it is not one"""
+    if not isinstance(value, str) or not value:
+        return None
+    if len(value) == 13 and value[2] == '/' and value[5:8] == ' - ' and value[10] == ':':
+        digits = value[0:2] + value[3:5] + value[8:10] + value[11:13]
+        if not (digits.isascii() and digits.isdigit()):
+            return None
+        day, month, hour, minute = int(value[0:2]), int(value[3:5]), int(value[8:10]), int(value[11:13])
+        if 1 <= month <= 12 and 1 <= day <= MAX_DAY[month] and hour < 24 and minute < 60:
+            return day, month, hour, minute
+        return None
+    try:
+        # A leap year, so that 29/02 parses as it does above
+        parsed = datetime.strptime(f'2000 {value}', f'%Y {LEGACY_DATETIME_FORMAT}')
+    except ValueError:
+        return None
+    return parsed.day, parsed.month, parsed.hour, parsed.minute
+
+@lru_cache(maxsize=1024)
+def parse_hours(value):
+    """ETC_H to hours ("4 H", "4H" or 4 -> 4.0), or None if it is not a finite number"""
+    if value is None:
+        return None
+    try:
+        hours = float(str(value).replace('H', ''))
+    except ValueError:
+        return None
+    return hours if math.isfinite(hours) else None
+
+def parse_hours_array(values):
+    """Vectorised parse_hours(); values that do not parse become NaN
+
+    Only the distinct strings are parsed in Python, so the cost follows the
+    number of different ETC_H values rather than the number of rows.
+    """
+    values = np.asarray([value or '' for value in values], dtype=str)
+    if not values.size:
+        return np.empty(0)
+    unique, inverse = np.unique(values, return_inverse=True)
+    parsed = np.array([parse_hours(value) for value in unique], dtype=float)
+    return parsed[inverse]
+
+def parse_day_time_array(values):
+    """(n, 4) int array of (day, month, hour, minute) per string; -1 where it does not parse"""
+    text = np.asarray([value or '' for value in values], dtype=str)
+    parts = np.full((len(text), 4), -1, dtype=np.int64)
+    if not len(text):
+        return parts
+
+    lengths = np.char.str_len(text)
+    width = text.dtype.itemsize // 4
+    canonical = np.zeros(len(text), dtype=bool)
+    if width >= 13:
+        # Unicode arrays are UCS-4: one uint32 code per character
+        codes = text.view(np.uint32).reshape(len(text), width)[:, :13].astype(np.int64)
+        digits = codes[:, DIGIT_POSITIONS] - ord('0')
+        canonical = (
+            (lengths == 13)
+            & (codes[:, SEPARATOR_POSITIONS] == SEPARATOR_CODES).all(axis=1)
+            & ((digits >= 0) & (digits <= 9)).all(axis=1)
+        )
+        pairs = digits[:, 0::2] * 10 + digits[:, 1::2]
+        day, month, hour, minute = pairs.T
+        valid = (
+            canonical & (month >= 1) & (month <= 12) & (day >= 1)
+            & (day <= np.take(MAX_DAY, np.clip(month, 0, 12))) & (hour < 24) & (minute < 60)
+        )
+        parts[valid] = pairs[valid]
+
+    # Other spellings go through the scalar parser (and strptime)
+    for index in np.flatnonzero(~canonical & (lengths > 0)):
+        parsed = parse_day_time(str(text[index]))
+        if parsed:
+            parts[index] = parsed
+    return parts
+
+def resolve_legacy_array(values, reference, past=False):
+    """Vectorised year inference for "DD/MM - HH:MM" strings (datetime64[us] array, NaT if unparseable)
+
+    Same rule as app.parse_legacy_datetime: of the candidates in the year
+    before, of and after ``reference``, the nearest one; with ``past`` the
+    latest one not after ``reference`` (else the earliest). ``reference`` and
+    ``past`` may be scalars or one value per string.
+    """
+    day, month, hour, minute = parse_day_time_array(values).T
+    shape = day.shape
+    reference = np.broadcast_to(np.asarray(reference, dtype='datetime64[us]'), shape)
+    past = np.broadcast_to(np.asarray(past, dtype=bool), shape)
+    year = reference.astype('datetime64[Y]').astype(np.int64)  # years since 1970
+    offset = (hour * 60 + minute) * 60 * 10 ** 6
+
+    candidates = []
+    for delta in (-1, 0, 1):
+        month_start = ((year + delta) * 12 + month - 1).astype('datetime64[M]')
+        date = month_start.astype('datetime64[D]') + (day - 1)
+        # 29/02 rolls over into March outside a leap year
+        exists = (day > 0) & (date.astype('datetime64[M]') == month_start)
+        stamp = date.astype('datetime64[us]').astype(np.int64) + offset
+        candidates.append(np.where(exists, stamp, _INT64_MIN))
+    candidates = np.stack(candidates, axis=1)
+    missing = candidates == _INT64_MIN
+    reference = reference.astype(np.int64)[:, None]
+
+    distance = np.where(missing, _INT64_MAX, np.abs(candidates - reference))
+    nearest = np.take_along_axis(candidates, distance.argmin(axis=1)[:, None], axis=1)[:, 0]
+    earlier = ~missing & (candidates <= reference)
+    latest_earlier = np.where(earlier, candidates, _INT64_MIN).max(axis=1)
+    earliest = np.where(missing, _INT64_MAX, candidates).min(axis=1)
+    chosen = np.where(past, np.where(earlier.any(axis=1), latest_earlier, earliest), nearest)
+
+    result = chosen.astype('datetime64[us]')
+    result[missing.all(axis=1)] = _NAT
+    return result
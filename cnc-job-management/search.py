@@ -0,0 +1,98 @@
+"""SQLite FTS5 index over the free-text columns of jobs and history
+
+Each indexed table gets an external-content FTS5 table, <table>_fts, that
+stores only the inverted index (the text stays in the table itself) and is
+kept in sync by AFTER INSERT/UPDATE/DELETE triggers, so every write path
+(routes, bulk endpoints, tasks, CLI commands, generate_dummy) updates it in
+the same transaction. Terms are indexed with 2 and 3 character prefixes so
+"ge" or "sha" (as typed into a search box) are answered from the index.
+
+Only SQLite builds with FTS5 get the index; elsewhere (PostgreSQL, an SQLite
+without FTS5) callers fall back to ILIKE matching.
+"""
+import re
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, bindparam, text
+
+# Indexed columns, in FTS5 column order
+SEARCH_FIELDS = ('REMARK', 'MODEL', 'PART', 'OPERATOR')
+
+# Runs of letters/digits; everything else separates terms (as FTS5's unicode61 tokenizer does)
+_TERM = re.compile(r'[^\W_]+')
+
+_metadata = MetaData()
+
+def search_terms(query):
+    """Terms of a user query ("Tool-wear  PN_123" -> ['Tool', 'wear', 'PN', '123'])"""
+    return _TERM.findall(query or '')
+
+def match_expression(terms, field=None):
+    """FTS5 MATCH expression: all terms, the last one as a prefix (still being
+    typed), optionally within one column
+
+    Terms are quoted, so FTS5 operators typed by a user (AND, NEAR, ``*``,
+    ``:``) are searched as text instead of being interpreted. Only the last
+    term is a prefix: a prefix query reads the whole list of every matching
+    term, where a full term is streamed.
+    """
+    expression = ' '.join(f'"{term}"' for term in terms) + '*'
+    if field:
+        expression = f'{field} : ({expression})'
+    return expression
+
+def fts5_available(connection):
+    """Whether the SQLite library behind a connection was compiled with FTS5"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    return bool(connection.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+
+def index_table(table):
+    """Table construct for the FTS5 index of ``table`` (rowid, rank and the MATCH column)"""
+    name = f'{table}_fts'
+    if name not in _metadata.tables:
+        Table(name, _metadata, Column('rowid', Integer), Column('rank', Float), Column(name, Text))
+    return _metadata.tables[name]
+
+def create_index(connection, table):
+    """Create the FTS5 table and sync triggers of ``table`` where missing
+
+    An index that was created (or lost a trigger, and so may have missed
+    writes) is rebuilt from the table. Returns True in that case.
+    """
+    name = f'{table}_fts'
+    objects = [name, f'{name}_ai', f'{name}_ad', f'{name}_au']
+    existing = connection.execute(text("SELECT name FROM sqlite_master WHERE name IN :names")
+                                  .bindparams(bindparam('names', expanding=True)), {'names': objects}).scalars().all()
+    if len(existing) == len(objects):
+        return False
+
+    columns = ', '.join(SEARCH_FIELDS)
+    new = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({columns}, content='{table}', content_rowid='id', "
+        f"prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    # External content: a row is removed from the index with the 'delete' command and its old values
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old}); END"
+    ))
+    # Only changes to the indexed columns touch the index (queue moves, finish times don't)
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new}); END"
+    ))
+    rebuild_index(connection, table)
+    return True
+
+def rebuild_index(connection, table):
+    """Re-read every row of ``table`` into its index and merge the index segments"""
+    name = f'{table}_fts'
+    connection.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+    connection.execute(text(f"INSERT INTO {name}({name}) VALUES ('optimize')"))
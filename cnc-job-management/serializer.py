@@ -0,0 +1,51 @@
+"""Column-projection serialization for the job and history views
+
+List views select only the serialized columns as row tuples (no ORM objects,
+no per-row to_dict) and encode the payload in a single pass, with orjson when
+it is installed (pip install orjson) and the json module otherwise. Both
+encoders write datetimes as ISO 8601, the same text to_dict() produces.
+
+Rows are sent in one of two formats (?format=):
+records   a list of {column: value} objects, as returned by to_dict() (default)
+columnar  {"columns": [...], "rows": [[...], ...]}: the column names are sent
+          once, which makes long lists about half the size
+"""
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Row formats accepted by ?format=
+RECORDS = 'records'
+COLUMNAR = 'columnar'
+FORMATS = (RECORDS, COLUMNAR)
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(payload):
+    """Compact UTF-8 JSON bytes of payload (datetimes as ISO 8601)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def loads(data):
+    """Parse JSON text or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def script_safe(data):
+    """JSON bytes that can be placed inside a <script> element (<, > and & as \\u escapes)"""
+    return data.replace(b'<', b'\\u003c').replace(b'>', b'\\u003e').replace(b'&', b'\\u0026')
+
+def serialize_rows(columns, rows, fmt=RECORDS):
+    """Row tuples in the requested format"""
+    if fmt == COLUMNAR:
+        return {'columns': list(columns), 'rows': list(rows)}
+    return [dict(zip(columns, row)) for row in rows]
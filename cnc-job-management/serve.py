@@ -0,0 +1,23 @@
+"""Serve the app with gevent so idle /events streams cost a greenlet, not a thread
+
+    python serve.py [port]
+"""
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    from gevent.pywsgi import WSGIServer
+except ImportError:
+    raise SystemExit('gevent is not installed: pip install -r requirements.txt')
+
+import sys
+
+from app import create_app
+
+def main():
+    """Main function"""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"🚀 Serving CNC Job Management on http://0.0.0.0:{port} (gevent)")
+    WSGIServer(('0.0.0.0', port), create_app()).serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Streaming CSV and XLSX writers, plus simple readers for imports
+
+Both writers take an iterable of rows and yield encoded chunks, so an export
+can be sent to the client while rows are still being read from the database.
+"""
+import csv
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+# Rows written between yielded chunks
+FLUSH_ROWS = 1000
+
+# Characters that are not allowed in XML 1.0 documents
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def iter_csv(header, rows, flush_rows=FLUSH_ROWS):
+    """Yield a UTF-8 CSV document (with BOM, so Excel detects the encoding)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('﻿')
+    writer.writerow(header)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(['' if value is None else value for value in row])
+        if count % flush_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that collects bytes until drained"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+def _column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _xlsx_row(row_number, values, columns):
+    cells = []
+    for column, value in zip(columns, values):
+        ref = f'{column}{row_number}'
+        if value is None or value == '':
+            continue
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+def iter_xlsx(header, rows, sheet_name='Sheet1', flush_rows=FLUSH_ROWS):
+    """Yield an XLSX workbook with a single sheet, row by row
+
+    Strings are written inline (no shared string table) and the zip is written
+    with data descriptors, so nothing but the current chunk is held in memory
+    and there is no row limit other than Excel's own 1,048,576.
+    """
+    columns = [_column_letter(i) for i in range(len(header))]
+    buffer = _ChunkBuffer()
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', _ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield buffer.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD.encode('utf-8'))
+            sheet.write(_xlsx_row(1, header, columns).encode('utf-8'))
+
+            for row_number, row in enumerate(rows, 2):
+                sheet.write(_xlsx_row(row_number, row, columns).encode('utf-8'))
+                if row_number % flush_rows == 0:
+                    yield buffer.drain()
+
+            sheet.write(_SHEET_TAIL.encode('utf-8'))
+
+    yield buffer.drain()
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+def _column_index(ref):
+    """'A1' -> 0, 'AB7' -> 27"""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+def _cell_text(element):
+    """Concatenated text of all <t> runs below an element"""
+    return ''.join(node.text or '' for node in element.iter(f'{_MAIN_NS}t'))
+
+def read_xlsx(stream):
+    """Yield the rows of the first worksheet of an XLSX file as lists of strings
+
+    Only cell values are read (shared strings, inline strings and numbers);
+    formatting is ignored. Empty cells come back as ''.
+    """
+    with zipfile.ZipFile(stream) as workbook:
+        names = workbook.namelist()
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            root = ET.fromstring(workbook.read('xl/sharedStrings.xml'))
+            shared = [_cell_text(item) for item in root.iter(f'{_MAIN_NS}si')]
+
+        sheets = sorted(name for name in names if name.startswith('xl/worksheets/') and name.endswith('.xml'))
+        if not sheets:
+            return
+
+        with workbook.open(sheets[0]) as sheet:
+            for _, element in ET.iterparse(sheet):
+                if element.tag != f'{_MAIN_NS}row':
+                    continue
+
+                row = []
+                for cell in element.iter(f'{_MAIN_NS}c'):
+                    ref = cell.get('r')
+                    if ref:
+                        row.extend([''] * (_column_index(ref) - len(row)))
+
+                    cell_type = cell.get('t')
+                    value = cell.find(f'{_MAIN_NS}v')
+                    if cell_type == 'inlineStr':
+                        row.append(_cell_text(cell))
+                    elif value is None:
+                        row.append('')
+                    elif cell_type == 's':
+                        row.append(shared[int(value.text)])
+                    else:
+                        row.append(value.text or '')
+
+                element.clear()
+                yield row
+
+def read_csv(stream):
+    """Yield the rows of a UTF-8 (optionally BOM-prefixed) CSV file"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    yield from csv.reader(text)
@@ -1,6 +1,17 @@
 let currentEditingJobId = null;
 let dashboardData = {};
 let nextJobIndices = {}; // Track current index of next job per machine
+let dashboardEtag = null; // ETag of the last rendered dashboard snapshot
+
+// Hall/line scope of this board, taken from the page URL (e.g. /?hall=A&line=2)
+const scopeParams = new URLSearchParams(window.location.search);
+const dashboardScope = new URLSearchParams();
+['hall', 'line'].forEach(key => {
+    if (scopeParams.get(key)) {
+        dashboardScope.set(key, scopeParams.get(key));
+    }
+});
+const scopeQuery = dashboardScope.toString() ? `?${dashboardScope}` : '';
 
 // Digital Clock
 function updateClock() {
@@ -18,30 +29,81 @@ function updateClock() {
 setInterval(updateClock, 1000);
 updateClock();
 
+// Show a dashboard snapshot
+function applyDashboardData(data, etag) {
+    dashboardData = data;
+    dashboardEtag = etag;
+
+    // Initialize nextJobIndices for machines if not set
+    for (const machine in dashboardData) {
+        if (!(machine in nextJobIndices)) {
+            nextJobIndices[machine] = 0;
+        }
+    }
+
+    renderDashboard();
+}
+
+// Render the snapshot embedded in the page (no /dashboard_data round trip before the first paint)
+function loadInitialDashboard() {
+    const element = document.getElementById('dashboard-initial');
+    if (!element) {
+        return false;
+    }
+    applyDashboardData(JSON.parse(element.textContent), element.dataset.etag || null);
+    return true;
+}
+
 // Load dashboard data
 async function loadDashboardData() {
     try {
-        const response = await fetch('/dashboard_data');
-        dashboardData = await response.json();
+        // Revalidate against the rendered snapshot: an unchanged dashboard is a 304
+        const headers = dashboardEtag ? { 'If-None-Match': dashboardEtag } : {};
+        const response = await fetch(`/dashboard_data${scopeQuery}`, { headers });
+        const etag = response.headers.get('ETag');
 
-        // Initialize nextJobIndices for machines if not set
-        for (const machine in dashboardData) {
-            if (!(machine in nextJobIndices)) {
-                nextJobIndices[machine] = 0;
-            }
+        // Nothing changed since the last render
+        if (response.status === 304 || (etag && etag === dashboardEtag)) {
+            return;
         }
 
-        renderDashboard();
+        applyDashboardData(await response.json(), etag);
     } catch (error) {
         console.error('Error loading dashboard data:', error);
         showAlert('Error loading dashboard data', 'error');
     }
 }
 
+// Fill the machine dropdown from the registry, grouped by hall
+async function loadMachines() {
+    try {
+        const response = await fetch(`/machines${scopeQuery}`);
+        const result = await response.json();
+        const select = document.getElementById('mesin');
+        const selected = select.value;
+
+        const groups = {};
+        result.machines.forEach(machine => {
+            const hall = machine.hall || '';
+            (groups[hall] = groups[hall] || []).push(machine);
+        });
+        const options = machines => machines.map(machine =>
+            `<option value="${machine.name}">${machine.name}${machine.line ? ` (${machine.line})` : ''}</option>`
+        ).join('');
+
+        select.innerHTML = '<option value="">Pilih Mesin</option>' + Object.keys(groups).map(hall =>
+            hall ? `<optgroup label="${hall}">${options(groups[hall])}</optgroup>` : options(groups[hall])
+        ).join('');
+        select.value = selected;
+    } catch (error) {
+        console.error('Error loading machines:', error);
+    }
+}
+
 // Render dashboard
 function renderDashboard() {
     const grid = document.getElementById('dashboard-grid');
-    const machines = ['CNC1', 'CNC2', 'CNC3', 'CNC4', 'CNC5'];
+    const machines = Object.keys(dashboardData);
     
     grid.innerHTML = machines.map(machine => {
         const machineData = dashboardData[machine] || { current: null, next_jobs: [], total_jobs: 0 };
@@ -218,12 +280,12 @@ async function editJob(jobId) {
         document.getElementById('OPERATOR').value = jobData.OPERATOR;
         document.getElementById('REMARK').value = jobData.REMARK || '';
         
-        // Convert datetime format for input fields
+        // Convert datetime format for input fields (prefer the server-resolved year)
         if (jobData.START) {
-            document.getElementById('START').value = convertToDatetimeLocal(jobData.START);
+            document.getElementById('START').value = jobData.start_at ? jobData.start_at.slice(0, 16) : convertToDatetimeLocal(jobData.START);
         }
         if (jobData.FINISH) {
-            document.getElementById('FINISH').value = convertToDatetimeLocal(jobData.FINISH);
+            document.getElementById('FINISH').value = jobData.finish_at ? jobData.finish_at.slice(0, 16) : convertToDatetimeLocal(jobData.FINISH);
         }
         
         currentEditingJobId = jobId;
@@ -405,9 +467,80 @@ document.getElementById('job-modal').addEventListener('click', (e) => {
     }
 });
 
+// Remove a job from whichever machine currently shows it
+function removeJobFromDashboard(jobId) {
+    for (const machine in dashboardData) {
+        const machineData = dashboardData[machine];
+        if (machineData.current && machineData.current.id === jobId) {
+            machineData.current = null;
+        }
+        machineData.next_jobs = (machineData.next_jobs || []).filter(job => job.id !== jobId);
+        machineData.total_jobs = machineData.next_jobs.length + (machineData.current ? 1 : 0);
+    }
+}
+
+// Insert or replace a job pushed by the server
+function upsertJobInDashboard(job) {
+    removeJobFromDashboard(job.id);
+
+    if (!(job.mesin in dashboardData)) {
+        // A scoped board only shows its own machines
+        if (scopeQuery) {
+            return;
+        }
+        dashboardData[job.mesin] = { current: null, next_jobs: [], total_jobs: 0 };
+        nextJobIndices[job.mesin] = 0;
+    }
+    const machineData = dashboardData[job.mesin];
+
+    if (job.job_type === 'current') {
+        machineData.current = job;
+    } else {
+        machineData.next_jobs.push(job);
+        machineData.next_jobs.sort((a, b) => (a.queue_pos - b.queue_pos) || (a.id - b.id));
+    }
+    machineData.total_jobs = machineData.next_jobs.length + (machineData.current ? 1 : 0);
+}
+
+// Subscribe to live job deltas
+function connectEvents() {
+    const source = new EventSource('/events');
+
+    // (Re)connected: resync in case deltas were missed while offline
+    source.addEventListener('open', () => {
+        loadDashboardData();
+    });
+
+    source.addEventListener('job', (e) => {
+        upsertJobInDashboard(JSON.parse(e.data));
+        dashboardEtag = null;
+        renderDashboard();
+    });
+
+    source.addEventListener('job_removed', (e) => {
+        removeJobFromDashboard(JSON.parse(e.data).id);
+        dashboardEtag = null;
+        renderDashboard();
+    });
+
+    source.addEventListener('reload', () => {
+        dashboardEtag = null;
+        loadDashboardData();
+        loadMachines();
+    });
+}
+
 // Load dashboard data on page load
 document.addEventListener('DOMContentLoaded', () => {
-    loadDashboardData();
-    // Refresh data every 30 seconds
-    setInterval(loadDashboardData, 30000);
+    if (!loadInitialDashboard()) {
+        loadDashboardData();
+    }
+    loadMachines();
+
+    if (window.EventSource) {
+        connectEvents();
+    } else {
+        // Refresh data every 30 seconds
+        setInterval(loadDashboardData, 30000);
+    }
 });
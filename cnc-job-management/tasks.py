@@ -0,0 +1,35 @@
+"""Thread pool for long admin operations (clear, archive, rollups, exports)
+
+The runner only executes callables inside an app context; the task rows,
+their status and the operations themselves live in app.py. With workers=0
+a task runs inline, in the request that started it (tests, single-threaded
+setups).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+task_log = logging.getLogger('cnc.tasks')
+
+class TaskRunner:
+    """Runs submitted callables on a small thread pool, each in its own app context"""
+
+    def __init__(self, app, workers=1):
+        self.app = app
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cnc-task') if workers > 0 else None
+
+    def submit(self, function, *args):
+        if self._executor is None:
+            function(*args)
+        else:
+            self._executor.submit(self._run, function, args)
+
+    def _run(self, function, args):
+        with self.app.app_context():
+            try:
+                function(*args)
+            except Exception:
+                task_log.exception('Background task %s failed', getattr(function, '__name__', function))
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)